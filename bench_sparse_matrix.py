@@ -0,0 +1,461 @@
+"""
+Замеры производительности SparseMatrix.
+Запуск:
+    python bench_sparse_matrix.py [multiply | parallel] [число строк]
+    python bench_sparse_matrix.py suite --output results.json [--sizes 1e3 1e4 1e5 1e6 1e7]
+    python bench_sparse_matrix.py compare baseline.json results.json [--threshold 0.1]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sparse_matrix.core import SparseMatrix, np
+
+
+def random_sparse(rows, cols, nnz_per_row, seed=0):
+    """
+    Случайная CSR-матрица с фиксированным числом ненулевых элементов в строке.
+    """
+    rng = random.Random(seed)
+    data = []
+    col_indices = []
+    row_ptr = [0]
+    for _ in range(rows):
+        row_cols = sorted(rng.sample(range(cols), nnz_per_row))
+        col_indices.extend(row_cols)
+        data.extend(rng.uniform(-1.0, 1.0) for _ in row_cols)
+        row_ptr.append(len(data))
+    return SparseMatrix(rows, cols, (data, col_indices, row_ptr))
+
+
+def multiply_matrix_dict(a, b):
+    """
+    Прежняя реализация умножения: словарь на каждую строку и сортировка ключей.
+    """
+    result_data = []
+    result_col_indices = []
+    result_row_ptr = [0]
+    for i in range(a.rows):
+        row_result = {}
+        for k in range(a.row_ptr[i], a.row_ptr[i + 1]):
+            col_a = a.col_indices[k]
+            val_a = a.data[k]
+            for j in range(b.row_ptr[col_a], b.row_ptr[col_a + 1]):
+                col_b = b.col_indices[j]
+                if col_b not in row_result:
+                    row_result[col_b] = 0
+                row_result[col_b] += val_a * b.data[j]
+        for col in sorted(row_result.keys()):
+            if row_result[col] != 0:
+                result_data.append(row_result[col])
+                result_col_indices.append(col)
+        result_row_ptr.append(len(result_data))
+    return SparseMatrix(a.rows, b.cols, (result_data, result_col_indices, result_row_ptr))
+
+
+def timed(function, *args, **kwargs):
+    """
+    Время выполнения функции в секундах и ее результат.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_multiply_matrix(rows, repeat=5):
+    """
+    Сравнение умножения со словарем и алгоритма Густавсона на случайных матрицах.
+    Варианты запускаются поочередно repeat раз, берется лучшее время каждого (меньше влияние шума).
+    """
+    a = random_sparse(rows, rows, 5, seed=1)
+    b = random_sparse(rows, rows, 5, seed=2)
+    a_array, b_array = a.convert_storage("array"), b.convert_storage("array")
+    variants = {
+        "dict": lambda: multiply_matrix_dict(a, b),
+        "sorted": lambda: a.multiply_matrix(b),
+        "unsorted": lambda: a.multiply_matrix(b, sort_indices=False),
+        "array": lambda: a_array.multiply_matrix(b_array),
+    }
+    best = {name: None for name in variants}
+    results = {}
+    for _ in range(repeat):
+        for name, variant in variants.items():
+            elapsed, results[name] = timed(variant)
+            best[name] = elapsed if best[name] is None else min(best[name], elapsed)
+    expected, result = results["dict"], results["sorted"]
+    assert result.row_ptr == expected.row_ptr and result.col_indices == expected.col_indices
+    t_dict = best["dict"]
+
+    print(f"multiply_matrix, {rows} строк, nnz результата {len(result.data)}, лучшее из {repeat}")
+    print(f"  словарь + sorted:           {t_dict:.3f} с")
+    print(f"  Густавсон (с сортировкой):  {best['sorted']:.3f} с  (x{t_dict / best['sorted']:.2f})")
+    print(f"  Густавсон (без сортировки): {best['unsorted']:.3f} с  (x{t_dict / best['unsorted']:.2f})")
+    if a_array.storage == "array":
+        print(f"  массивы NumPy:              {best['array']:.3f} с  (x{t_dict / best['array']:.2f})")
+
+
+def bench_parallel(rows, max_workers=None):
+    """
+    Кривая масштабирования параллельных операций: время и ускорение для 1, 2, 4, ... исполнителей.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    a = random_sparse(rows, rows, 5, seed=1)
+    b = random_sparse(rows, rows, 5, seed=2)
+    variants = [("списки", a, b)]
+    a_array, b_array = a.convert_storage("array"), b.convert_storage("array")
+    if a_array.storage == "array":
+        variants.append(("массивы", a_array, b_array))
+
+    x = [1.0] * rows
+    operations = [
+        ("multiply_matrix", lambda m, o, w: m.multiply_matrix(o, workers=w)),
+        ("add", lambda m, o, w: m.add(o, workers=w)),
+        ("multiply_scalar", lambda m, o, w: m.multiply_scalar(2.0, workers=w)),
+        ("matvec", lambda m, o, w: m.matvec(x, workers=w)),
+    ]
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+
+    print(f"Масштабирование, {rows} строк, ядер: {os.cpu_count()}")
+    for storage, m, o in variants:
+        for name, operation in operations:
+            base = None
+            line = []
+            for workers in counts:
+                elapsed, _ = timed(operation, m, o, workers)
+                base = base or elapsed
+                line.append(f"{workers}: {elapsed:.3f} с (x{base / elapsed:.2f})")
+            print(f"  {storage:8} {name:16} " + ", ".join(line))
+
+
+# Генераторы тестовых матриц для набора замеров. Все матрицы квадратные, с упорядоченными индексами
+# и диагональным преобладанием (диагональ всегда хранится), чтобы разложения были невырожденными.
+
+def _build(n, row_columns, rng, storage):
+    """
+    Собирает CSR-матрицу по спискам столбцов строк: внедиагональные значения из [-1, 1],
+    на диагонали - число элементов строки плюс один.
+    """
+    data = []
+    col_indices = []
+    row_ptr = [0]
+    for i, columns in enumerate(row_columns):
+        columns = sorted(set(columns) | {i})
+        weight = float(len(columns) + 1)
+        col_indices.extend(columns)
+        data.extend(weight if j == i else rng.uniform(-1.0, 1.0) for j in columns)
+        row_ptr.append(len(data))
+    return SparseMatrix(n, n, (data, col_indices, row_ptr), storage=storage, sorted_indices=True)
+
+
+def generate_uniform(nnz, seed=0, storage="list", per_row=10):
+    """
+    Равномерное заполнение: в каждой строке per_row случайных столбцов.
+    """
+    rng = random.Random(seed)
+    n = max(nnz // per_row, per_row)
+    return _build(n, (rng.sample(range(n), per_row - 1) for _ in range(n)), rng, storage)
+
+
+def generate_power_law(nnz, seed=0, storage="list", per_row=10, exponent=2.5):
+    """
+    Степенное распределение числа элементов в строках (распределение Парето), столбцы случайны.
+    """
+    rng = random.Random(seed)
+    n = max(nnz // per_row, per_row)
+    weights = [rng.paretovariate(exponent - 1) for _ in range(n)]
+    scale = (nnz - n) / sum(weights)
+    degrees = [min(n - 1, int(weight * scale)) for weight in weights]
+    return _build(n, (rng.sample(range(n), degree) for degree in degrees), rng, storage)
+
+
+def generate_banded(nnz, seed=0, storage="list", per_row=10):
+    """
+    Ленточная матрица шириной per_row вокруг главной диагонали.
+    """
+    rng = random.Random(seed)
+    n = max(nnz // per_row, per_row)
+    half = per_row // 2
+    return _build(n, (range(max(0, i - half), min(n, i + per_row - half)) for i in range(n)), rng, storage)
+
+
+def generate_block_diagonal(nnz, seed=0, storage="list", per_row=10):
+    """
+    Блочно-диагональная матрица с плотными блоками размера per_row.
+    """
+    rng = random.Random(seed)
+    n = max(nnz // per_row, per_row)
+    return _build(n, (range(i - i % per_row, min(n, i - i % per_row + per_row)) for i in range(n)), rng, storage)
+
+
+GENERATORS = {
+    "uniform": generate_uniform,
+    "power_law": generate_power_law,
+    "banded": generate_banded,
+    "block_diagonal": generate_block_diagonal,
+}
+
+
+class _Case:
+    """
+    Входные данные одного замера: матрица, второй операнд того же вида, векторы и индексы.
+    """
+
+    def __init__(self, generator, nnz, seed, storage):
+        self.matrix = GENERATORS[generator](nnz, seed, storage)
+        self.other = GENERATORS[generator](nnz, seed + 1, storage)
+        n = self.matrix.rows
+        rng = random.Random(seed)
+        self.x = [rng.uniform(-1.0, 1.0) for _ in range(n)]
+        self.block = [[rng.uniform(-1.0, 1.0) for _ in range(4)] for _ in range(n)]
+        self.lookup_rows = [rng.randint(1, n) for _ in range(1000)]
+        self.lookup_cols = [rng.randint(1, n) for _ in range(1000)]
+        self.coo = ([i for i in range(n) for _ in range(self.matrix.row_ptr[i], self.matrix.row_ptr[i + 1])],
+                    list(self.matrix.col_indices), list(self.matrix.data))
+        self.path = os.path.join(tempfile.gettempdir(), f"bench_sparse_{os.getpid()}.spmx")
+
+
+def _copy(case):
+    return case.matrix.multiply_scalar(1)
+
+
+def _unsorted_copy(case):
+    matrix = case.matrix.multiply_scalar(1)
+    matrix._sorted = None  # Проверка упорядоченности выполняется заново
+    return matrix
+
+
+def _save_and_load(case):
+    case.matrix.save(case.path)
+    return SparseMatrix.load(case.path, mmap=False, storage=case.matrix.storage)
+
+
+# Операции на основе LU ограничены по nnz: на случайных матрицах заполнение при исключении почти плотное,
+# а на ленточных и блочных остается линейным.
+_LU_LIMITS = {"uniform": 10 ** 3, "power_law": 3 * 10 ** 3, "banded": 10 ** 5, "block_diagonal": 10 ** 5}
+
+# Операции: имя, функция замера, подготовка (не входит во время), предельный nnz (None - без предела,
+# словарь - предел для каждого генератора). Определитель разложением по строке (method="cofactor")
+# экспоненциален и в набор не входит.
+OPERATIONS = [
+    ("trace", lambda m, c: m.trace(), _copy, None),
+    ("diagonal", lambda m, c: m.diagonal(), _copy, None),
+    ("get_element", lambda m, c: [m.get_element(i, j) for i, j in zip(c.lookup_rows, c.lookup_cols)], None, None),
+    ("get_elements", lambda m, c: m.get_elements(c.lookup_rows, c.lookup_cols), None, None),
+    ("getitem_rows", lambda m, c: m[::2], None, None),
+    ("getitem_columns", lambda m, c: m[:, ::2], None, None),
+    ("row_slice", lambda m, c: m.row_slice(0, m.rows // 2), None, None),
+    ("from_coo", lambda m, c: SparseMatrix.from_coo(m.rows, m.cols, *c.coo, storage=m.storage), None, None),
+    ("from_triplets", lambda m, c: SparseMatrix.from_triplets(zip(*c.coo), m.rows, m.cols, storage=m.storage),
+     None, None),
+    ("sort_indices", lambda m, c: m.sort_indices(), _unsorted_copy, None),
+    ("transpose", lambda m, c: m.transpose(), _copy, None),
+    ("to_csc", lambda m, c: m.to_csc(), _copy, None),
+    ("add", lambda m, c: m.add(c.other), None, None),
+    ("axpby", lambda m, c: m.axpby(2.0, c.other, -1.0), None, None),
+    ("linear_combination", lambda m, c: SparseMatrix.linear_combination([(1.0, m), (2.0, c.other), (-1.0, m)]),
+     None, None),
+    ("multiply_scalar", lambda m, c: m.multiply_scalar(2.0), None, None),
+    ("multiply_matrix", lambda m, c: m.multiply_matrix(c.other), None, 10 ** 6),
+    ("matvec", lambda m, c: m.matvec(c.x), None, None),
+    ("rmatvec", lambda m, c: m.rmatvec(c.x), None, None),
+    ("matmat", lambda m, c: m.matmat(c.block), None, None),
+    ("set_element", lambda m, c: [m.set_element(i, j, 1.0) for i, j in zip(c.lookup_rows, c.lookup_cols)],
+     _copy, None),
+    ("update_many_compact", lambda m, c: (m.update_many(c.lookup_rows, c.lookup_cols, [1.0] * 1000), m.compact()),
+     _copy, None),
+    ("convert_storage", lambda m, c: m.convert_storage("array" if m.storage == "list" else "list"), None, None),
+    ("memory_usage", lambda m, c: m.memory_usage(), None, None),
+    ("save_load", lambda m, c: _save_and_load(c), None, None),
+    ("structural_rank", lambda m, c: m.structural_rank(), None, 10 ** 6),
+    ("determinant", lambda m, c: m.determinant(), _copy, _LU_LIMITS),
+    ("rank", lambda m, c: m.rank(), None, _LU_LIMITS),
+    ("is_invertible", lambda m, c: m.is_invertible(), _copy, _LU_LIMITS),
+    ("condition_estimate", lambda m, c: m.condition_estimate(), _copy, _LU_LIMITS),
+    ("factorize_solve", lambda m, c: m.factorize().solve(c.x), _copy, _LU_LIMITS),
+]
+
+
+def measure(function, setup, case, repeat):
+    """
+    Лучшее время из repeat запусков и пиковая память (tracemalloc, отдельный запуск,
+    чтобы трассировка не искажала время).
+    :return: (время в секундах, пиковая память в байтах).
+    """
+    best = None
+    for _ in range(repeat):
+        matrix = setup(case) if setup else case.matrix
+        elapsed, _ = timed(function, matrix, case)
+        best = elapsed if best is None else min(best, elapsed)
+    matrix = setup(case) if setup else case.matrix
+    tracemalloc.start()
+    try:
+        function(matrix, case)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_suite(sizes=(10 ** 3, 10 ** 4, 10 ** 5), generators=None, operations=None, storages=("list",),
+              repeat=3, seed=0, log=print):
+    """
+    Набор замеров: каждая операция на каждом генераторе, размере (nnz) и способе хранения.
+    :return: Словарь с метаданными окружения и списком результатов (время, пиковая память,
+             пропускная способность в ненулевых элементах в секунду).
+    """
+    generators = generators or list(GENERATORS)
+    selected = [operation for operation in OPERATIONS if not operations or operation[0] in operations]
+    results = []
+    for storage in storages:
+        if storage == "array" and np is None:
+            log("NumPy не установлен, замеры для storage=\"array\" пропущены")
+            continue
+        for generator in generators:
+            for nnz in sizes:
+                case = _Case(generator, int(nnz), seed, storage)
+                actual_nnz = len(case.matrix.data)
+                for name, function, setup, limit in selected:
+                    if isinstance(limit, dict):
+                        limit = limit.get(generator)
+                    if limit is not None and nnz > limit:
+                        continue
+                    elapsed, peak = measure(function, setup, case, repeat)
+                    results.append({
+                        "operation": name,
+                        "generator": generator,
+                        "storage": storage,
+                        "size": int(nnz),
+                        "rows": case.matrix.rows,
+                        "nnz": actual_nnz,
+                        "time": elapsed,
+                        "peak_memory": peak,
+                        "throughput": actual_nnz / elapsed if elapsed > 0 else None,
+                    })
+                    log(f"  {storage:5} {generator:14} {int(nnz):>9} {name:20} {elapsed:10.6f} с {peak / 2 ** 20:9.2f} МБ")
+                if os.path.exists(case.path):
+                    os.remove(case.path)
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__ if np is not None else None,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _result_key(result):
+    return result["operation"], result["generator"], result["storage"], result["size"]
+
+
+def compare(baseline, current, threshold=0.1, min_time=1e-3):
+    """
+    Сравнение результатов с сохраненной базовой линией.
+    :param baseline: Результаты run_suite (словарь) базовой версии.
+    :param current: Результаты run_suite текущей версии.
+    :param threshold: Допустимое относительное ухудшение (0.1 - на 10%).
+    :param min_time: Замеры быстрее этого порога (в секундах) по времени не сравниваются - это шум.
+    :return: Список регрессий: словари с ключом замера, метрикой, старым и новым значениями.
+    """
+    previous = {_result_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(_result_key(result))
+        if old is None:
+            continue
+        checks = [("peak_memory", old["peak_memory"], result["peak_memory"])]
+        if max(old["time"], result["time"]) >= min_time:
+            checks.append(("time", old["time"], result["time"]))
+        for metric, old_value, new_value in checks:
+            if new_value > old_value * (1 + threshold):
+                regressions.append({
+                    "operation": result["operation"],
+                    "generator": result["generator"],
+                    "storage": result["storage"],
+                    "size": result["size"],
+                    "metric": metric,
+                    "baseline": old_value,
+                    "current": new_value,
+                    "ratio": new_value / old_value if old_value else float("inf"),
+                })
+    return regressions
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _report_regressions(regressions, threshold):
+    if not regressions:
+        print(f"Регрессий нет (порог {threshold:.0%})")
+        return 0
+    print(f"Регрессии (порог {threshold:.0%}):")
+    for item in regressions:
+        print(f"  {item['storage']:5} {item['generator']:14} {item['size']:>9} {item['operation']:20} "
+              f"{item['metric']:11} {item['baseline']:.6g} -> {item['current']:.6g} (x{item['ratio']:.2f})")
+    return 1
+
+
+def main(argv=None):
+    """
+    Точка входа командной строки.
+    :return: Код возврата (1, если найдены регрессии).
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0].isdigit():
+        argv.insert(0, "multiply")  # Прежний вызов: python bench_sparse_matrix.py [число строк]
+    parser = argparse.ArgumentParser(description="Замеры производительности SparseMatrix.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("multiply", "parallel"):
+        command = commands.add_parser(name)
+        command.add_argument("rows", nargs="?", type=int, default=10 ** 5)
+    suite = commands.add_parser("suite", help="Набор замеров всех операций с записью в JSON.")
+    suite.add_argument("--output", help="Файл для результатов (JSON).")
+    suite.add_argument("--sizes", nargs="+", type=float, default=[1e3, 1e4, 1e5],
+                       help="Размеры по числу ненулевых элементов (до 1e7).")
+    suite.add_argument("--generators", nargs="+", choices=list(GENERATORS))
+    suite.add_argument("--operations", nargs="+", choices=[operation[0] for operation in OPERATIONS])
+    suite.add_argument("--storage", nargs="+", choices=["list", "array"], default=["list"])
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--baseline", help="Сравнить с сохраненными результатами.")
+    suite.add_argument("--threshold", type=float, default=0.1)
+    comparison = commands.add_parser("compare", help="Сравнение двух файлов результатов.")
+    comparison.add_argument("baseline")
+    comparison.add_argument("current")
+    comparison.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.command in ("multiply", "parallel"):
+        {"multiply": bench_multiply_matrix, "parallel": bench_parallel}[args.command](args.rows)
+        return 0
+    if args.command == "compare":
+        regressions = compare(_read_json(args.baseline), _read_json(args.current), args.threshold)
+        return _report_regressions(regressions, args.threshold)
+
+    results = run_suite([int(size) for size in args.sizes], args.generators, args.operations, args.storage,
+                        args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=1)
+    if args.baseline:
+        return _report_regressions(compare(_read_json(args.baseline), results, args.threshold), args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+Совместимость: модуль перенесен в пакет sparse_matrix (sparse_matrix.expression).
+"""
+import sys
+
+from sparse_matrix import expression
+
+sys.modules[__name__] = expression
@@ -0,0 +1,8 @@
+"""
+Совместимость: модуль перенесен в пакет sparse_matrix (sparse_matrix.formats).
+"""
+import sys
+
+from sparse_matrix import formats
+
+sys.modules[__name__] = formats
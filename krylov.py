@@ -0,0 +1,8 @@
+"""
+Совместимость: модуль перенесен в пакет sparse_matrix (sparse_matrix.krylov).
+"""
+import sys
+
+from sparse_matrix import krylov
+
+sys.modules[__name__] = krylov
@@ -0,0 +1,8 @@
+"""
+Совместимость: модуль перенесен в пакет sparse_matrix (sparse_matrix.parallel).
+"""
+import sys
+
+from sparse_matrix import parallel
+
+sys.modules[__name__] = parallel
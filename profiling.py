@@ -0,0 +1,8 @@
+"""
+Совместимость: модуль перенесен в пакет sparse_matrix (sparse_matrix.profiling).
+"""
+import sys
+
+from sparse_matrix import profiling
+
+sys.modules[__name__] = profiling
@@ -0,0 +1,8 @@
+"""
+Совместимость: модуль перенесен в пакет sparse_matrix (sparse_matrix.sparse_io).
+"""
+import sys
+
+from sparse_matrix import sparse_io
+
+sys.modules[__name__] = sparse_io
@@ -0,0 +1,49 @@
+"""
+Разреженные матрицы в формате CSR.
+
+Импорт пакета легкий: модули с тяжелыми ядрами (NumPy, ввод-вывод, параллельное выполнение,
+итерационные методы, альтернативные форматы) загружаются при первом обращении к ним.
+
+    core        - SparseMatrix и разложения;
+    sparse_io   - Matrix Market, SVMLight и двоичный формат;
+    parallel    - выполнение по блокам строк;
+    krylov      - итерационные методы (cg, bicgstab, gmres);
+    expression  - ленивые выражения (операторы +, -, *, @, .T);
+    formats     - форматы DIA, BSR, SELL и optimize_format;
+    profiling   - профилирование операций;
+    cli         - командная строка (python -m sparse_matrix).
+"""
+import importlib
+
+_SUBMODULES = ("core", "sparse_io", "parallel", "krylov", "expression", "formats", "profiling", "cli")
+
+_EXPORTS = {
+    "SparseMatrix": "core",
+    "SparseFactorization": "core",
+    "read_matrix": "sparse_io",
+    "write_matrix": "sparse_io",
+    "cg": "krylov",
+    "bicgstab": "krylov",
+    "gmres": "krylov",
+    "DIAMatrix": "formats",
+    "BSRMatrix": "formats",
+    "SELLMatrix": "formats",
+    "optimize_format": "formats",
+    "profile": "profiling",
+}
+
+__all__ = list(_EXPORTS) + list(_SUBMODULES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
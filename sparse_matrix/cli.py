@@ -0,0 +1,363 @@
+"""
+Командная строка пакета sparse_matrix.
+
+    python -m sparse_matrix                                  - интерактивное меню (задачи 1-3);
+    python -m sparse_matrix --input a.mtx --op trace         - одна операция над матрицами из файлов;
+    python -m sparse_matrix batch jobs.jsonl [--workers 4]   - пакет заданий в одном процессе.
+
+Файл заданий для batch - JSON Lines, по заданию в строке (пустые строки и строки с # пропускаются):
+    {"id": 1, "op": "trace", "input": "a.mtx"}
+    {"id": 2, "op": "multiply", "input": "a.mtx", "other": "b.mtx", "output": "ab.mtx"}
+Поля: op (show, trace, get, add, scalar, multiply, determinant, is_invertible, rank, matvec),
+input, other (для add и multiply), row и col (для get, с 1), scalar, x (вектор для matvec),
+output (файл для результирующей матрицы). Результаты печатаются по мере готовности в порядке заданий,
+по строке JSON на задание: {"id", "op", "ok", "result" или "error", "time"}. Матрицы, прочитанные
+из файлов, кешируются, поэтому много заданий над одной матрицей читают ее один раз; ключ кеша
+включает время изменения и размер файла, так что файл, перезаписанный заданием через output,
+читается заново.
+"""
+import argparse
+import functools
+import json
+import numbers
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+
+from .core import SparseMatrix, np
+
+
+def run_file_mode(argv):
+    """
+    Неинтерактивный режим: операция над матрицами из файлов (.mtx, .svm или двоичный формат).
+    Пример: python -m sparse_matrix --input a.mtx --op trace
+    :param argv: Аргументы командной строки.
+    """
+    from . import sparse_io
+
+    parser = argparse.ArgumentParser(description="Операции над разреженными матрицами из файлов.")
+    parser.add_argument("--input", required=True, help="Файл с матрицей")
+    parser.add_argument("--op", required=True,
+                        choices=["show", "trace", "get", "add", "scalar", "multiply", "determinant", "is_invertible"])
+    parser.add_argument("--other", help="Файл со второй матрицей (для add и multiply)")
+    parser.add_argument("--row", type=int, help="Номер строки для get (с 1)")
+    parser.add_argument("--col", type=int, help="Номер столбца для get (с 1)")
+    parser.add_argument("--scalar", type=float, help="Скаляр для scalar")
+    parser.add_argument("--output", help="Файл для результирующей матрицы (.mtx или двоичный формат)")
+    args = parser.parse_args(argv)
+
+    matrix = sparse_io.read_matrix(args.input)
+    if args.op in ("add", "multiply") and not args.other:
+        parser.error("для операции " + args.op + " нужен --other")
+
+    if args.op == "trace":
+        print(matrix.trace())
+        return 0
+    if args.op == "get":
+        if args.row is None or args.col is None:
+            parser.error("для операции get нужны --row и --col")
+        print(matrix.get_element(args.row, args.col))
+        return 0
+    if args.op == "determinant":
+        print(matrix.determinant())
+        return 0
+    if args.op == "is_invertible":
+        print(matrix.is_invertible())
+        return 0
+
+    if args.op == "show":
+        result = matrix
+    elif args.op == "add":
+        result = matrix.add(sparse_io.read_matrix(args.other))
+    elif args.op == "multiply":
+        result = matrix.multiply_matrix(sparse_io.read_matrix(args.other))
+    else:
+        if args.scalar is None:
+            parser.error("для операции scalar нужен --scalar")
+        result = matrix.multiply_scalar(args.scalar)
+
+    if args.output:
+        sparse_io.write_matrix(result, args.output)
+    else:
+        print("Values:", list(result.data))
+        print("Col_index:", list(result.col_indices))
+        print("Row_pointers:", list(result.row_ptr))
+    return 0
+
+
+_BATCH_OPERATIONS = ("show", "trace", "get", "add", "scalar", "multiply", "determinant", "is_invertible",
+                     "rank", "matvec")
+
+
+def _json_value(value):
+    """
+    Приводит результат операции к типам JSON.
+    """
+    if isinstance(value, Fraction):
+        return int(value) if value.denominator == 1 else float(value)
+    if np is not None and isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if isinstance(value, numbers.Number) and not isinstance(value, (bool, int, float)):
+        return float(value)
+    return value
+
+
+def _run_job(job, load):
+    """
+    Выполняет одно задание пакета.
+    :param job: Словарь с описанием задания (см. описание модуля).
+    :param load: Функция чтения матрицы по пути (с кешем).
+    :return: Результат: число, список или описание матрицы (rows, cols, nnz и output).
+    """
+    from . import sparse_io
+
+    op = job.get("op")
+    if op not in _BATCH_OPERATIONS:
+        raise ValueError(f"Неизвестная операция: {op}.")
+    if "input" not in job:
+        raise ValueError("В задании нет поля input.")
+    matrix = load(job["input"])
+    if op in ("add", "multiply") and "other" not in job:
+        raise ValueError(f"Для операции {op} нужно поле other.")
+
+    if op == "trace":
+        return matrix.trace()
+    if op == "get":
+        return matrix.get_element(job["row"], job["col"])
+    if op == "determinant":
+        return matrix.determinant()
+    if op == "is_invertible":
+        return matrix.is_invertible()
+    if op == "rank":
+        return matrix.rank()
+    if op == "matvec":
+        return matrix.matvec(job["x"])
+
+    if op == "show":
+        result = matrix
+    elif op == "add":
+        result = matrix.add(load(job["other"]))
+    elif op == "multiply":
+        result = matrix.multiply_matrix(load(job["other"]))
+    else:
+        result = matrix.multiply_scalar(job["scalar"])
+    summary = {"rows": result.rows, "cols": result.cols, "nnz": len(result.data)}
+    if "output" in job:
+        sparse_io.write_matrix(result, job["output"])
+        summary["output"] = job["output"]
+    return summary
+
+
+def _read_jobs(lines):
+    """
+    Задания из строк файла JSON Lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield json.loads(line)
+
+
+def run_batch(jobs, workers=1, out=None, cache_size=128):
+    """
+    Выполняет пакет заданий в одном процессе пулом потоков и печатает результаты строками JSON.
+    :param jobs: Итерируемый набор заданий (словарей).
+    :param workers: Число потоков.
+    :param out: Поток вывода (по умолчанию sys.stdout).
+    :param cache_size: Сколько прочитанных матриц хранить в кеше.
+    :return: Число заданий, завершившихся ошибкой.
+    """
+    from . import sparse_io
+
+    out = out or sys.stdout
+    read = functools.lru_cache(maxsize=cache_size)(lambda path, mtime, size: sparse_io.read_matrix(path))
+
+    def load(path):
+        # Файл мог быть перезаписан предыдущим заданием (поле output): ключ меняется вместе с ним
+        stat = os.stat(path)
+        return read(path, stat.st_mtime_ns, stat.st_size)
+
+    def execute(job):
+        start = time.perf_counter()
+        record = {"id": job.get("id"), "op": job.get("op")}
+        try:
+            result = _json_value(_run_job(job, load))
+            record.update(ok=True, result=result)
+        except Exception as error:  # Ошибка одного задания не прерывает пакет
+            record.update(ok=False, error=f"{type(error).__name__}: {error}")
+        record["time"] = time.perf_counter() - start
+        return record
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for record in executor.map(execute, jobs):
+            failures += not record["ok"]
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    return failures
+
+
+def run_batch_mode(argv):
+    """
+    Разбор аргументов команды batch.
+    :return: Код возврата (1, если хотя бы одно задание завершилось ошибкой).
+    """
+    parser = argparse.ArgumentParser(prog="python -m sparse_matrix batch",
+                                     description="Пакетное выполнение заданий над матрицами.")
+    parser.add_argument("jobs", help="Файл заданий JSON Lines (- для стандартного ввода)")
+    parser.add_argument("--workers", type=int, default=1, help="Число потоков")
+    parser.add_argument("--output", help="Файл для результатов (по умолчанию стандартный вывод)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.jobs == "-" else open(args.jobs, encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        return 1 if run_batch(_read_jobs(source), args.workers, out) else 0
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+def interactive():
+    """
+    Интерактивное меню (задачи 1-3), ввод с клавиатуры.
+    """
+    task = int(input("Введите номер задачи: "))
+
+    if task == 1:
+        num_rows = int(input("Введите количество строк: "))
+        num_cols = int(input("Введите количество столбцов: "))
+
+        matrix = []
+        print("Введите элементы матрицы построчно, через пробел:")
+        for _ in range(num_rows):
+            row = list(map(float, input().split()))
+            if len(row) != num_cols:
+                raise ValueError("Неверное количество элементов")
+            matrix.append(row)
+
+        sparse_matrix = SparseMatrix(num_rows, num_cols, matrix)
+
+        while True:
+            print("Что вы хотите сделать с матрицей:")
+            print("1. Вывести матрицу")
+            print("2. Найти и вывести след матрицы")
+            print("3. Найти и вывести элемент матрицы по индексу")
+            print("4. Выход")
+
+            choice = int(input("Введите номер действия: "))
+            if choice == 1:
+                print("Ваша матрица:")
+                for row in matrix:
+                    print(" ".join(map(str, row)))
+
+            elif choice == 2:
+                print("След матрицы:", sparse_matrix.trace())
+
+            elif choice == 3:
+                row = int(input("Введите индекс строки: "))
+                col = int(input("Введите индекс столбца: "))
+                print(sparse_matrix.get_element(row, col))
+
+            elif choice == 4:
+                break
+
+            else:
+                print("Неверное значение")
+
+    elif task == 2:
+        num_rows1 = int(input("Введите количество строк матрицы №1: "))
+        num_cols1 = int(input("Введите количество столбцов матрицы №1: "))
+
+        num_rows2 = int(input("Введите количество строк матрицы №2: "))
+        num_cols2 = int(input("Введите количество столбцов матрицы №2: "))
+
+        matrix1 = []
+        matrix2 = []
+        print("Введите элементы матрицы №1 построчно, через пробел:")
+        for _ in range(num_rows1):
+            row = list(map(float, input().split()))
+            if len(row) != num_cols1:
+                raise ValueError("Неверное количество элементов")
+            matrix1.append(row)
+
+        sparse_matrix1 = SparseMatrix(num_rows1, num_cols1, matrix1)
+
+        print("Введите элементы матрицы №2 построчно, через пробел:")
+        for _ in range(num_rows2):
+            row = list(map(float, input().split()))
+            if len(row) != num_cols2:
+                raise ValueError("Неверное количество элементов")
+            matrix2.append(row)
+
+        sparse_matrix2 = SparseMatrix(num_rows2, num_cols2, matrix2)
+
+        while True:
+            print("Что вы хотите сделать с матрицами")
+            print("1. Сложить матрицы")
+            print("2. Умножить матрицу на скаляр")
+            print("3. Перемножить матрицы")
+
+            choice = int(input("Введите номер действия: "))
+            if choice == 1:
+                result = sparse_matrix1.add(sparse_matrix2)
+                print("Результат сложения матриц:")
+                print("Values:", result.data)
+                print("Col_index:", result.col_indices)
+                print("Row_pointers:", result.row_ptr)
+            elif choice == 2:
+                scalar = float(input("Введите скаляр: "))
+                result = sparse_matrix1.multiply_scalar(scalar)
+                print("Результат умножения матрицы на скаляр:")
+                print("Values:", result.data)
+                print("Col_index:", result.col_indices)
+                print("Row_pointers:", result.row_ptr)
+            elif choice == 3:
+                result = sparse_matrix1.multiply_matrix(sparse_matrix2)
+                print("Результат перемножения матриц:")
+                print("Values:", result.data)
+                print("Col_index:", result.col_indices)
+                print("Row_pointers:", result.row_ptr)
+            else:
+                print("Неверное значение")
+
+    elif task == 3:
+        num_rows = int(input("Введите количество строк: "))
+        num_cols = int(input("Введите количество столбцов: "))
+
+        matrix = []
+        print("Введите элементы матрицы построчно, через пробел:")
+        for _ in range(num_rows):
+            row = list(map(float, input().split()))
+            if len(row) != num_cols:
+                raise ValueError("Неверное количество элементов")
+            matrix.append(row)
+
+        sparse_matrix = SparseMatrix(num_rows, num_cols, matrix)
+
+        det = sparse_matrix.determinant()
+        print(f"Определитель матрицы: {det}")
+        if sparse_matrix.is_invertible():
+            print("Обратная матрица: да")
+        else:
+            print("Обратная матрица: нет")
+
+
+def main(argv=None):
+    """
+    Точка входа: batch, операция над файлами (--input ...) или интерактивное меню без аргументов.
+    :return: Код возврата.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == "batch":
+        return run_batch_mode(argv[1:])
+    if argv:
+        return run_file_mode(argv)
+    interactive()
+    return 0
@@ -0,0 +1,2266 @@
+import bisect
+import heapq
+import importlib
+import importlib.util
+import itertools
+import math
+import operator
+import sys
+import types
+from fractions import Fraction
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Модуль, загружаемый при первом обращении к атрибуту: импорт пакета не платит за импорт NumPy,
+    пока он не нужен. После загрузки атрибуты копируются, и дальнейшие обращения идут напрямую.
+    """
+
+    def __getattr__(self, name):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+# NumPy необязателен: без него матрица хранится в списках
+np = _LazyModule("numpy") if importlib.util.find_spec("numpy") is not None else None
+
+
+def _is_ndarray(value):
+    """
+    Является ли значение массивом NumPy. Пока NumPy не импортирован, массивов быть не может,
+    поэтому проверка не загружает ленивый модуль np (списочное хранение обходится без NumPy).
+    """
+    return np is not None and "numpy" in sys.modules and isinstance(value, np.ndarray)
+
+
+def _permutation_sign(perm):
+    """
+    Знак перестановки (+1 или -1), вычисляется по числу циклов.
+    :param perm: Перестановка чисел 0..n-1 в виде списка.
+    """
+    visited = [False] * len(perm)
+    sign = 1
+    for start in range(len(perm)):
+        if visited[start]:
+            continue
+        length = 0
+        k = start
+        while not visited[k]:
+            visited[k] = True
+            k = perm[k]
+            length += 1
+        if length % 2 == 0:
+            sign = -sign
+    return sign
+
+
+def _sparse_lu(matrix, exact=False, pivot_threshold=0.1):
+    """
+    Разреженное LU-разложение квадратной матрицы с выбором ведущего элемента.
+    На каждом шаге берется активный столбец с наименьшим числом ненулевых элементов
+    (приближенный минимум степени, уменьшает заполнение), а в нем - строка с частичным
+    выбором ведущего элемента: среди строк с |a| >= pivot_threshold * max|a| выбирается самая короткая.
+    При pivot_threshold=1 получаем классический частичный выбор по модулю.
+    :param matrix: Квадратная матрица (SparseMatrix).
+    :param exact: Если True, вычисления ведутся в дробях (fractions.Fraction) без округлений.
+    :param pivot_threshold: Порог частичного выбора ведущего элемента (0 < pivot_threshold <= 1).
+    :return: (row_order, col_order, l_entries, u_rows) или None, если матрица вырождена.
+             row_order[k], col_order[k] - строка и столбец ведущего элемента на шаге k,
+             l_entries[r] - список (шаг, множитель) для исходной строки r,
+             u_rows[k] - словарь {столбец: значение} строки U на шаге k.
+    """
+    n = matrix.rows
+    # Без exact целые элементы сразу переводятся в float: иначе нетронутые исключением строки U
+    # остались бы целыми, и произведение ведущих элементов в determinant() росло бы как int
+    convert = Fraction if exact else float
+
+    # Активная часть матрицы: строки в виде словарей и множества строк для каждого столбца
+    rows = []
+    col_rows = [set() for _ in range(n)]
+    for i in range(n):
+        row = {}
+        for k in range(matrix.row_ptr[i], matrix.row_ptr[i + 1]):
+            if matrix.data[k] != 0:
+                row[matrix.col_indices[k]] = convert(matrix.data[k])
+                col_rows[matrix.col_indices[k]].add(i)
+        rows.append(row)
+
+    # Куча (число ненулевых, столбец) с ленивым удалением устаревших записей
+    heap = [(len(col_rows[j]), j) for j in range(n)]
+    heapq.heapify(heap)
+    col_done = [False] * n
+
+    row_order = []
+    col_order = []
+    l_entries = [[] for _ in range(n)]
+    u_rows = []
+
+    for step in range(n):
+        while True:
+            count, col = heapq.heappop(heap)
+            if not col_done[col] and count == len(col_rows[col]):
+                break
+        candidates = list(col_rows[col])
+        if not candidates:
+            return None  # Пустой столбец - матрица вырождена
+
+        # Частичный выбор ведущего элемента с учетом разреженности строки
+        if exact:
+            pivot_row = min(candidates, key=lambda r: (len(rows[r]), r))
+        else:
+            largest = max(abs(rows[r][col]) for r in candidates)
+            if largest == 0:
+                return None
+            allowed = [r for r in candidates if abs(rows[r][col]) >= pivot_threshold * largest]
+            pivot_row = min(allowed, key=lambda r: (len(rows[r]), -abs(rows[r][col]), r))
+
+        prow = rows[pivot_row]
+        pivot = prow[col]
+        col_done[col] = True
+        for j in prow:
+            col_rows[j].discard(pivot_row)
+
+        # Исключение столбца col из остальных строк
+        for r in candidates:
+            if r == pivot_row:
+                continue
+            row = rows[r]
+            factor = row.pop(col) / pivot
+            l_entries[r].append((step, factor))
+            for j, value in prow.items():
+                if j == col:
+                    continue
+                new_value = row.get(j, 0) - factor * value
+                if new_value != 0:
+                    if j not in row:
+                        col_rows[j].add(r)
+                        heapq.heappush(heap, (len(col_rows[j]), j))
+                    row[j] = new_value
+                elif j in row:
+                    del row[j]
+                    col_rows[j].discard(r)
+                    heapq.heappush(heap, (len(col_rows[j]), j))
+        col_rows[col].clear()
+
+        # Длины столбцов из ведущей строки уменьшились
+        for j in prow:
+            if not col_done[j]:
+                heapq.heappush(heap, (len(col_rows[j]), j))
+
+        row_order.append(pivot_row)
+        col_order.append(col)
+        u_rows.append(prow)
+        rows[pivot_row] = None
+
+    return row_order, col_order, l_entries, u_rows
+
+
+def _sparse_ldlt(matrix, exact=False):
+    """
+    Разреженное разложение P*A*P^T = L*D*L^T симметричной положительно определенной матрицы
+    (разложение Холецкого без квадратных корней). Активная часть хранится одним верхним
+    треугольником, и исключение обновляет каждую симметричную пару элементов один раз.
+    На каждом шаге исключается узел с наименьшим числом соседей (приближенный минимум степени).
+    :param matrix: Симметричная квадратная матрица (SparseMatrix).
+    :param exact: Если True, вычисления ведутся в дробях (fractions.Fraction) без округлений.
+    :return: (order, l_entries, diagonal) или None, если ведущий элемент не положителен
+             (матрица не является положительно определенной).
+             order[k] - строка и столбец ведущего элемента на шаге k,
+             l_entries[r] - список (шаг, множитель) строго нижнего треугольника L для исходной строки r,
+             diagonal[k] - элемент D на шаге k.
+    """
+    n = matrix.rows
+    convert = Fraction if exact else float
+
+    # upper[i] - элементы a_ij с j >= i, lower[i] - номера j < i, для которых a_ji != 0
+    upper = [{} for _ in range(n)]
+    lower = [set() for _ in range(n)]
+    for i in range(n):
+        for k in range(matrix.row_ptr[i], matrix.row_ptr[i + 1]):
+            j = matrix.col_indices[k]
+            if j >= i and matrix.data[k] != 0:
+                upper[i][j] = convert(matrix.data[k])
+                if j > i:
+                    lower[j].add(i)
+
+    def degree(i):
+        return len(upper[i]) + len(lower[i]) - (i in upper[i])
+
+    # Куча (число соседей, узел) с ленивым удалением устаревших записей
+    heap = [(degree(i), i) for i in range(n)]
+    heapq.heapify(heap)
+    done = [False] * n
+
+    order = []
+    diagonal = []
+    l_entries = [[] for _ in range(n)]
+
+    for step in range(n):
+        while True:
+            count, node = heapq.heappop(heap)
+            if not done[node] and count == degree(node):
+                break
+        pivot = upper[node].pop(node, 0)
+        if pivot <= 0:
+            return None
+        done[node] = True
+
+        # Столбец ведущего элемента: (r, a_r,node) для всех соседей, по возрастанию r
+        column = [(r, upper[r].pop(node)) for r in lower[node]]
+        for j in upper[node]:
+            lower[j].discard(node)
+        column.extend(upper[node].items())
+        column.sort()
+        upper[node] = lower[node] = None
+
+        # Обновление a_rj -= a_r,node * a_j,node / pivot только для пар r <= j
+        for position, (r, value_r) in enumerate(column):
+            factor = value_r / pivot
+            l_entries[r].append((step, factor))
+            row = upper[r]
+            for j, value_j in column[position:]:
+                new_value = row.get(j, 0) - factor * value_j
+                if new_value != 0:
+                    if j not in row and j != r:
+                        lower[j].add(r)
+                    row[j] = new_value
+                elif j in row:
+                    del row[j]
+                    if j != r:
+                        lower[j].discard(r)
+        for r, _ in column:
+            heapq.heappush(heap, (degree(r), r))
+
+        order.append(node)
+        diagonal.append(pivot)
+
+    return order, l_entries, diagonal
+
+
+class SparseFactorization:
+    """
+    Разложение квадратной матрицы (LU или Холецкого в форме L*D*L^T), которое можно переиспользовать:
+    определитель кешируется, а solve() и inverse() не требуют повторного разложения.
+    """
+
+    def __init__(self, size, factors, exact=False, kind="lu"):
+        """
+        :param size: Порядок матрицы.
+        :param factors: Результат _sparse_lu ("lu"), _sparse_ldlt ("cholesky") или None для вырожденной матрицы.
+        :param exact: Разложение выполнено в дробях Fraction.
+        :param kind: "lu" или "cholesky".
+        """
+        self.size = size
+        self.exact = exact
+        self.kind = kind
+        self.singular = factors is None
+        if not self.singular and kind == "cholesky":
+            self.order, self.l_entries, self.diagonal = factors
+        elif not self.singular:
+            self.row_order, self.col_order, self.l_entries, self.u_rows = factors
+        self._determinant = None
+
+    def determinant(self):
+        """
+        Определитель разложенной матрицы (вычисляется один раз).
+        """
+        if self._determinant is None:
+            if self.singular:
+                self._determinant = 0
+            else:
+                if self.kind == "cholesky":
+                    det = math.prod(self.diagonal)  # Симметричная перестановка не меняет знак
+                else:
+                    det = _permutation_sign(self.row_order) * _permutation_sign(self.col_order)
+                    for step, col in enumerate(self.col_order):
+                        det *= self.u_rows[step][col]
+                # Для целочисленной матрицы возвращаем целое число
+                if isinstance(det, Fraction) and det.denominator == 1:
+                    det = int(det)
+                self._determinant = det
+        return self._determinant
+
+    def _solve_vector(self, b):
+        """
+        Решение A*x = b для одного вектора b (прямой и обратный ход).
+        """
+        n = self.size
+        if len(b) != n:
+            raise ValueError("Длина правой части должна совпадать с порядком матрицы.")
+        if self.exact:
+            b = [Fraction(value) for value in b]
+        if self.kind == "cholesky":
+            return self._solve_ldlt(b)
+
+        # Прямой ход: L*z = P*b
+        z = [0] * n
+        for step in range(n):
+            value = b[self.row_order[step]]
+            for j, factor in self.l_entries[self.row_order[step]]:
+                value -= factor * z[j]
+            z[step] = value
+
+        # Обратный ход: U*y = z, x[col_order[k]] = y[k]
+        x = [0] * n
+        for step in range(n - 1, -1, -1):
+            prow = self.u_rows[step]
+            col = self.col_order[step]
+            value = z[step]
+            for j, u_value in prow.items():
+                if j != col:
+                    value -= u_value * x[j]
+            x[col] = value / prow[col]
+        return x
+
+    def _solve_ldlt(self, b):
+        """
+        Решение A*x = b по разложению P*A*P^T = L*D*L^T: L*z = P*b, y = D^-1*z, L^T*w = y, x = P^T*w.
+        """
+        n = self.size
+        y = [0] * n
+        for step in range(n):
+            value = b[self.order[step]]
+            for j, factor in self.l_entries[self.order[step]]:
+                value -= factor * y[j]
+            y[step] = value
+        for step in range(n):
+            y[step] = y[step] / self.diagonal[step]
+
+        x = [0] * n
+        for step in range(n - 1, -1, -1):
+            row = self.order[step]
+            x[row] = y[step]
+            for j, factor in self.l_entries[row]:
+                y[j] -= factor * y[step]
+        return x
+
+    def solve(self, b):
+        """
+        Решение системы A*x = b.
+        :param b: Вектор (список чисел), набор правых частей (список векторов),
+                  матрица правых частей (SparseMatrix или двумерный массив NumPy; правые части - столбцы).
+        :return: Вектор решения, список решений или матрица X того же вида, что и B, для которой A*X = B.
+        """
+        if self.singular:
+            raise ValueError("Матрица вырождена, система не имеет единственного решения.")
+
+        if isinstance(b, SparseMatrix):
+            if b.rows != self.size:
+                raise ValueError("Число строк правой части должно совпадать с порядком матрицы.")
+            rhs_columns = [[0] * self.size for _ in range(b.cols)]
+            for i in range(b.rows):
+                for k in range(b.row_ptr[i], b.row_ptr[i + 1]):
+                    rhs_columns[b.col_indices[k]][i] = b.data[k]
+            columns = [self._solve_vector(rhs) for rhs in rhs_columns]
+            return _columns_to_sparse(columns, self.size)
+
+        if _is_ndarray(b) and b.ndim == 2:
+            if b.shape[0] != self.size:
+                raise ValueError("Число строк правой части должно совпадать с порядком матрицы.")
+            columns = [self._solve_vector(rhs) for rhs in b.T.tolist()]
+            return np.array(columns).reshape(b.shape[1], self.size).T
+        if _is_ndarray(b):
+            b = b.tolist()
+        if len(b) and isinstance(b[0], (list, tuple)):
+            return [self._solve_vector(rhs) for rhs in b]
+        return self._solve_vector(b)
+
+    def _solve_transposed_vector(self, c):
+        """
+        Решение A^T*y = c: U^T*v = Q^T*c (прямой ход), затем L^T*w = v (обратный ход), y = P^T*w.
+        """
+        if self.kind == "cholesky":
+            return self._solve_vector(c)  # Матрица симметрична: A^T = A
+        n = self.size
+        if self.exact:
+            c = [Fraction(value) for value in c]
+        step_of_col = [0] * n
+        for step, col in enumerate(self.col_order):
+            step_of_col[col] = step
+
+        rhs = [c[col] for col in self.col_order]
+        v = [0] * n
+        for step in range(n):
+            prow = self.u_rows[step]
+            col = self.col_order[step]
+            v[step] = rhs[step] / prow[col]
+            for j, u_value in prow.items():
+                if j != col:
+                    rhs[step_of_col[j]] -= u_value * v[step]
+
+        y = [0] * n
+        for step in range(n - 1, -1, -1):
+            row = self.row_order[step]
+            y[row] = v[step]
+            for j, factor in self.l_entries[row]:
+                v[j] -= factor * v[step]
+        return y
+
+    def inverse_norm_estimate(self, max_iterations=5):
+        """
+        Оценка ||A^-1||_1 алгоритмом Хагера (как в LAPACK): несколько решений систем с A и A^T
+        вместо построения обратной матрицы.
+        """
+        if self.singular:
+            return math.inf
+        n = self.size
+        x = [1.0 / n] * n
+        estimate = 0.0
+        for _ in range(max_iterations):
+            y = self._solve_vector(x)
+            estimate = float(sum(abs(value) for value in y))
+            signs = [1.0 if value >= 0 else -1.0 for value in y]
+            z = [float(value) for value in self._solve_transposed_vector(signs)]
+            j = max(range(n), key=lambda k: abs(z[k]))
+            if abs(z[j]) <= sum(zk * xk for zk, xk in zip(z, x)):
+                break
+            x = [0.0] * n
+            x[j] = 1.0
+        return estimate
+
+    def inverse(self):
+        """
+        Обратная матрица в формате CSR.
+        :return: Новая матрица (SparseMatrix).
+        """
+        if self.singular:
+            raise ValueError("Матрица вырождена, обратной матрицы не существует.")
+        columns = []
+        for j in range(self.size):
+            unit = [0] * self.size
+            unit[j] = 1
+            columns.append(self._solve_vector(unit))
+        return _columns_to_sparse(columns, self.size)
+
+
+def _structural_rank(matrix):
+    """
+    Структурный ранг: размер наибольшего паросочетания в двудольном графе строк и столбцов
+    (алгоритм Хопкрофта-Карпа).
+    """
+    m = matrix.rows
+    adjacency = []
+    for i in range(m):
+        start, end = matrix.row_ptr[i], matrix.row_ptr[i + 1]
+        adjacency.append([int(j) for j, value in zip(matrix.col_indices[start:end], matrix.data[start:end]) if value != 0])
+    match_row = [-1] * m
+    match_col = [-1] * matrix.cols
+
+    # Жадное начальное паросочетание
+    for i in range(m):
+        for j in adjacency[i]:
+            if match_col[j] == -1:
+                match_row[i] = j
+                match_col[j] = i
+                break
+
+    infinity = m + 1
+    while True:
+        # Поиск в ширину: слои от свободных строк
+        dist = [infinity] * m
+        queue = [i for i in range(m) if match_row[i] == -1]
+        for i in queue:
+            dist[i] = 0
+        found = False
+        for i in queue:
+            for j in adjacency[i]:
+                w = match_col[j]
+                if w == -1:
+                    found = True
+                elif dist[w] == infinity:
+                    dist[w] = dist[i] + 1
+                    queue.append(w)
+        if not found:
+            break
+
+        # Поиск в глубину (без рекурсии) по слоям и увеличение паросочетания
+        position = [0] * m
+        for root in range(m):
+            if match_row[root] != -1:
+                continue
+            stack = [root]
+            chosen = []
+            while stack:
+                i = stack[-1]
+                if position[i] < len(adjacency[i]):
+                    j = adjacency[i][position[i]]
+                    position[i] += 1
+                    w = match_col[j]
+                    if w == -1:
+                        chosen.append(j)
+                        for row, col in zip(stack, chosen):
+                            match_row[row] = col
+                            match_col[col] = row
+                        break
+                    if dist[w] == dist[i] + 1:
+                        chosen.append(j)
+                        stack.append(w)
+                else:
+                    dist[i] = infinity
+                    stack.pop()
+                    if stack:
+                        chosen.pop()
+
+    return sum(1 for j in match_row if j != -1)
+
+
+def _numeric_rank(matrix, tol, exact, stop_early=False, limit=None):
+    """
+    Ранг по разреженному исключению Гаусса с частичным выбором ведущего элемента.
+    Элементы с модулем не больше tol считаются нулями.
+    :param stop_early: Прекратить при первом столбце без ведущего элемента (для проверки обратимости).
+    :param limit: Известная верхняя граница ранга (например, структурный ранг): исключение
+                  прекращается, как только найдено столько ведущих элементов.
+    :return: Ранг (при stop_early - число найденных ведущих элементов до остановки).
+    """
+    convert = Fraction if exact else (lambda value: value)
+    rows = []
+    col_rows = [set() for _ in range(matrix.cols)]
+    for i in range(matrix.rows):
+        row = {}
+        for k in range(matrix.row_ptr[i], matrix.row_ptr[i + 1]):
+            if abs(matrix.data[k]) > tol:
+                row[int(matrix.col_indices[k])] = convert(matrix.data[k])
+                col_rows[matrix.col_indices[k]].add(i)
+        rows.append(row)
+
+    heap = [(len(col_rows[j]), j) for j in range(matrix.cols)]
+    heapq.heapify(heap)
+    col_done = [False] * matrix.cols
+    rank = 0
+    limit = min(matrix.rows, matrix.cols) if limit is None else min(limit, matrix.rows, matrix.cols)
+    while heap and rank < limit:
+        count, col = heapq.heappop(heap)
+        if col_done[col] or count != len(col_rows[col]):
+            continue
+        col_done[col] = True
+        candidates = list(col_rows[col])
+        if not candidates:
+            if stop_early:
+                return rank
+            continue
+        pivot_row = max(candidates, key=lambda r: (abs(rows[r][col]), -len(rows[r])))
+        prow = rows[pivot_row]
+        pivot = prow[col]
+        for j in prow:
+            col_rows[j].discard(pivot_row)
+        for r in candidates:
+            if r == pivot_row:
+                continue
+            row = rows[r]
+            factor = row.pop(col) / pivot
+            for j, value in prow.items():
+                if j == col:
+                    continue
+                new_value = row.get(j, 0) - factor * value
+                if abs(new_value) > tol:
+                    if j not in row:
+                        col_rows[j].add(r)
+                        heapq.heappush(heap, (len(col_rows[j]), j))
+                    row[j] = new_value
+                elif j in row:
+                    del row[j]
+                    col_rows[j].discard(r)
+                    heapq.heappush(heap, (len(col_rows[j]), j))
+        col_rows[col].clear()
+        for j in prow:
+            if not col_done[j]:
+                heapq.heappush(heap, (len(col_rows[j]), j))
+        rows[pivot_row] = {}
+        rank += 1
+    return rank
+
+
+def _index_dtype(max_value):
+    """
+    Тип индексов для массивов CSR: int32, если значения помещаются, иначе int64.
+    """
+    return np.int32 if max_value <= np.iinfo(np.int32).max else np.int64
+
+
+def _store(result, out):
+    """
+    Результат векторизованного ядра: сам массив или его копия в переданный буфер out
+    (массив NumPy или список Python).
+    """
+    if out is None:
+        return result
+    if isinstance(out, np.ndarray):
+        out[...] = result
+    elif result.ndim == 2:
+        for row_out, row in zip(out, result.tolist()):
+            row_out[:] = row
+    else:
+        out[:] = result.tolist()
+    return out
+
+
+def _index_array(values):
+    """
+    Индексы CSR как целочисленный массив NumPy: массивы хранения "array" используются как есть,
+    списки приводятся к np.intp (пустой список иначе дал бы float64).
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        return values
+    return np.asarray(values, dtype=np.intp)
+
+
+def _counting_order(keys, size):
+    """
+    Устойчивая перестановка, упорядочивающая целые ключи из [0, size), за O(nnz) на разряд.
+    Ключи разбиваются на 16-битные разряды от младшего к старшему; устойчивая сортировка
+    NumPy для uint16 - поразрядная (подсчетом), поэтому сравнений элементов не выполняется.
+    :param keys: Целочисленный массив NumPy неотрицательных ключей.
+    :param size: Верхняя граница ключей (не включая).
+    :return: Массив позиций (np.intp).
+    """
+    order = None
+    shift = 0
+    while True:
+        digits = (keys if order is None else keys[order]) >> shift
+        step = np.argsort(digits.astype(np.uint16), kind="stable")
+        order = step if order is None else order[step]
+        shift += 16
+        if size <= 1 << shift:
+            return order
+
+
+def _csr_from_coo_arrays(rows, cols, row_idx, col_idx, values):
+    """
+    Собирает CSR из COO-массивов NumPy: элементы сортируются по (строка, столбец),
+    повторы суммируются, нули отбрасываются.
+    :return: Новая матрица (SparseMatrix) с хранением в массивах.
+    """
+    keys = row_idx.astype(np.int64) * cols + col_idx.astype(np.int64)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=values, minlength=len(unique_keys))
+    nonzero = sums != 0
+    unique_keys = unique_keys[nonzero]
+    result_data = sums[nonzero].astype(np.float64)
+    index_dtype = _index_dtype(max(cols, len(result_data)))
+    result_col_indices = (unique_keys % cols).astype(index_dtype)
+    counts = np.bincount(unique_keys // cols, minlength=rows)
+    result_row_ptr = np.zeros(rows + 1, dtype=index_dtype)
+    np.cumsum(counts, out=result_row_ptr[1:])
+    return SparseMatrix(rows, cols, (result_data, result_col_indices, result_row_ptr), storage="array", sorted_indices=True)
+
+
+def _merge_sorted_arrays(rows, cols, terms):
+    """
+    Линейная комбинация c1*A1 + c2*A2 + ... матриц с упорядоченными индексами столбцов: ключи
+    row*cols + col каждой такой матрицы не убывают, и их объединение состоит из уже упорядоченных
+    серий. Устойчивая сортировка NumPy для целых (timsort) находит серии и сливает их за линейное
+    время, после чего совпадающие позиции стоят рядом и суммируются без общей сортировки.
+    :param terms: Пары (коэффициент, SparseMatrix).
+    :return: Новая матрица (SparseMatrix) с хранением в массивах.
+    """
+    keys = np.concatenate([matrix._row_indices().astype(np.int64) * cols + _index_array(matrix.col_indices)
+                           for _, matrix in terms])
+    values = np.concatenate([coefficient * np.asarray(matrix.data, dtype=np.float64) for coefficient, matrix in terms])
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    if len(keys) > 1:
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        if len(starts) < len(keys):
+            keys, values = keys[starts], np.add.reduceat(values, starts)
+    nonzero = values != 0
+    keys, values = keys[nonzero], values[nonzero]
+    index_dtype = _index_dtype(max(cols, len(values)))
+    row_ptr = np.zeros(rows + 1, dtype=index_dtype)
+    np.cumsum(np.bincount(keys // cols, minlength=rows), out=row_ptr[1:])
+    return SparseMatrix(rows, cols, (values, (keys % cols).astype(index_dtype), row_ptr), storage="array",
+                        sorted_indices=True)
+
+
+def _columns_to_sparse(columns, rows):
+    """
+    Собирает CSR-матрицу из списка плотных столбцов, пропуская нулевые элементы.
+    """
+    result_data = []
+    result_col_indices = []
+    result_row_ptr = [0]
+    for i in range(rows):
+        for j, column in enumerate(columns):
+            if column[i] != 0:
+                result_data.append(column[i])
+                result_col_indices.append(j)
+        result_row_ptr.append(len(result_data))
+    return SparseMatrix(rows, len(columns), (result_data, result_col_indices, result_row_ptr))
+
+
+class SparseMatrix:
+
+    # Задача №1
+    
+    def __init__(self, rows, cols, data, storage="list", sorted_indices=None):
+        """
+        Инициализация матрицы.
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param data: Либо список списков (обычная матрица), либо CSR-структура (data, col_indices, row_ptr).
+        :param storage: "list" - CSR в списках Python, "array" - в непрерывных массивах NumPy
+                        (float64 и int32/int64). Без NumPy всегда используются списки.
+        :param sorted_indices: Известно ли, что индексы столбцов в строках упорядочены
+                               (None - проверяется при первой необходимости).
+        """
+        if not (isinstance(rows, int) and rows > 0 and isinstance(cols, int) and cols > 0):
+            raise ValueError("Количество строк и столбцов должно быть положительными целыми числами.")
+        if storage not in ("list", "array"):
+            raise ValueError("storage должно быть \"list\" или \"array\".")
+        if np is None:
+            storage = "list"
+        
+        # Если передана обычная матрица в виде двумерного массива NumPy
+        if _is_ndarray(data) and data.ndim == 2:
+            if data.shape != (rows, cols):
+                raise ValueError("Размер массива должен совпадать с (rows, cols).")
+            row_idx, col_idx = np.nonzero(data)
+            self.rows = rows
+            self.cols = cols
+            self.data = data[row_idx, col_idx]
+            self.col_indices = col_idx
+            self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(row_idx, minlength=rows))))
+            if storage == "list":
+                self.data = self.data.tolist()
+                self.col_indices = self.col_indices.tolist()
+                self.row_ptr = self.row_ptr.tolist()
+
+        # Если передана обычная матрица
+        elif isinstance(data, list) and all(isinstance(row, list) for row in data):
+            if not all(len(row) == cols for row in data):
+                raise ValueError("Все строки должны иметь одинаковую длину (cols).")
+
+            self.rows = rows
+            self.cols = cols
+            self.data = []        # Значения ненулевых элементов
+            self.col_indices = [] # Индексы столбцов ненулевых элементов
+            self.row_ptr = [0]    # Указатели на начало строки в data и col_indices
+
+            for i in range(rows):
+                for j in range(cols):
+                    if data[i][j] != 0:
+                        self.data.append(data[i][j])
+                        self.col_indices.append(j)
+                self.row_ptr.append(len(self.data))
+
+        # Если передана CSR-структура
+        elif isinstance(data, tuple) and len(data) == 3:
+            self.data, self.col_indices, self.row_ptr = data
+            # Проверка корректности размеров row_ptr для CSR представления
+            if len(self.row_ptr) != rows + 1:
+                raise ValueError("Некорректная CSR-структура: row_ptr должен содержать rows + 1 элементов.")
+            self.rows = rows
+            self.cols = cols
+            if storage == "list" and _is_ndarray(self.data):
+                self.data = self.data.tolist()
+                self.col_indices = np.asarray(self.col_indices).tolist()
+                self.row_ptr = np.asarray(self.row_ptr).tolist()
+
+        else:
+            raise ValueError("data должно быть либо списком списков, либо CSR-структурой.")
+
+        self.storage = storage
+        if storage == "array":
+            index_dtype = _index_dtype(max(cols, len(self.data)))
+            self.data = np.ascontiguousarray(self.data, dtype=np.float64)
+            self.col_indices = np.ascontiguousarray(self.col_indices, dtype=index_dtype)
+            self.row_ptr = np.ascontiguousarray(self.row_ptr, dtype=index_dtype)
+
+        # Упорядоченность индексов столбцов: для обычной матрицы она гарантирована построением
+        self._sorted = True if not isinstance(data, tuple) else sorted_indices
+        self._invalidate_caches()
+
+        # Буфер точечных изменений (row, col) -> значение (нумерация с 0), см. set_element
+        self._delta = {}
+        self._base = None              # CSR-массивы, к которым относится непустой буфер
+        self.compact_threshold = None  # Размер буфера для слияния (None - автоматически от nnz)
+
+    def __getattr__(self, name):
+        # Вызывается только для отсутствующих атрибутов: пока в буфере есть изменения,
+        # CSR-массивы убраны из экземпляра, и любое обращение к ним сначала сливает буфер
+        if name in ("data", "col_indices", "row_ptr") and self.__dict__.get("_base") is not None:
+            self.compact()
+            return self.__dict__[name]
+        raise AttributeError(f"'SparseMatrix' object has no attribute '{name}'")
+
+    def __getstate__(self):
+        """
+        Состояние для pickle (в том числе для параллельного выполнения в процессах).
+        Представления memoryview над отображенным файлом (см. load) не сериализуются,
+        поэтому передаются как списки; сама матрица не меняется.
+        """
+        materialize = lambda value: value.tolist() if isinstance(value, memoryview) else value
+        state = self.__dict__.copy()
+        for name, value in state.items():
+            if isinstance(value, tuple):
+                state[name] = tuple(map(materialize, value))
+            else:
+                state[name] = materialize(value)
+        return state
+
+    def row_slice(self, start, end):
+        """
+        Строки [start, end) (нумерация с 0) как отдельная матрица. Для массивов NumPy и матриц,
+        отображенных из файла, data и col_indices - представления общих буферов без копирования;
+        заново создается только row_ptr. Списки Python при срезе копируются.
+        """
+        if not 0 <= start < end <= self.rows:
+            raise IndexError("Некорректный диапазон строк.")
+        offset = self.row_ptr[start]
+        stop = self.row_ptr[end]
+        if self.storage == "array":
+            row_ptr = self.row_ptr[start:end + 1] - offset
+        else:
+            row_ptr = [p - offset for p in self.row_ptr[start:end + 1]]
+        return SparseMatrix(end - start, self.cols, (self.data[offset:stop], self.col_indices[offset:stop], row_ptr),
+                            storage=self.storage, sorted_indices=self._sorted)
+
+    @staticmethod
+    def _normalize_index(key, size):
+        """
+        Приводит индекс (число, срез, список номеров или булеву маску) к срезу с шагом 1
+        или к списку номеров (с 0).
+        :return: ("slice", start, stop) или ("list", номера).
+        """
+        if isinstance(key, slice):
+            start, stop, step = key.indices(size)
+            if step == 1:
+                return "slice", start, max(start, stop)
+            return "list", list(range(start, stop, step))
+        if isinstance(key, int) or (np is not None and isinstance(key, np.integer)):
+            index = int(key)
+            if not -size <= index < size:
+                raise IndexError("Индекс вне допустимого диапазона.")
+            return "list", [index % size]
+        if _is_ndarray(key):
+            key = key.tolist()
+        key = list(key)
+        if key and all(isinstance(value, bool) or (np is not None and isinstance(value, np.bool_)) for value in key):
+            if len(key) != size:
+                raise IndexError("Длина булевой маски должна совпадать с размером оси.")
+            return "list", [i for i, flag in enumerate(key) if flag]
+        indices = []
+        for value in key:
+            if not -size <= value < size:
+                raise IndexError("Индекс вне допустимого диапазона.")
+            indices.append(int(value) % size)
+        return "list", indices
+
+    def __getitem__(self, key):
+        """
+        Индексация в стиле NumPy (нумерация с 0): A[i, j] - элемент; A[строки], A[строки, столбцы] -
+        подматрица, где строки и столбцы - числа, срезы, списки номеров или булевы маски.
+        Срез строк с шагом 1 не копирует data и col_indices (см. row_slice),
+        выбор столбцов выполняется за O(nnz выбранных строк).
+        """
+        row_key, col_key = key if isinstance(key, tuple) else (key, slice(None))
+        is_int = lambda value: isinstance(value, int) or (np is not None and isinstance(value, np.integer))
+        if is_int(row_key) and is_int(col_key):
+            (_, [row]), (_, [col]) = self._normalize_index(row_key, self.rows), self._normalize_index(col_key, self.cols)
+            return self.get_element(row + 1, col + 1)
+
+        rows = self._normalize_index(row_key, self.rows)
+        cols = self._normalize_index(col_key, self.cols)
+        if (rows[0] == "slice" and rows[1] == rows[2]) or (rows[0] == "list" and not rows[1]) \
+                or (cols[0] == "slice" and cols[1] == cols[2]) or (cols[0] == "list" and not cols[1]):
+            raise ValueError("Выборка не содержит ни одной строки или столбца.")
+
+        result = self.row_slice(rows[1], rows[2]) if rows[0] == "slice" else self._take_rows(rows[1])
+        if cols[0] == "slice" and cols[1] == 0 and cols[2] == self.cols:
+            return result
+        selection = list(range(cols[1], cols[2])) if cols[0] == "slice" else cols[1]
+        return result._take_cols(selection)
+
+    def _take_rows(self, indices):
+        """
+        Подматрица из строк с заданными номерами (в указанном порядке, повторы допускаются).
+        """
+        if self.storage == "array":
+            indices = np.asarray(indices, dtype=np.int64)
+            starts = self.row_ptr[indices].astype(np.int64)
+            lengths = self.row_ptr[indices + 1].astype(np.int64) - starts
+            row_ptr = np.zeros(len(indices) + 1, dtype=self.row_ptr.dtype)
+            np.cumsum(lengths, out=row_ptr[1:])
+            total = int(row_ptr[-1])
+            positions = np.repeat(starts - row_ptr[:-1], lengths) + np.arange(total, dtype=np.int64)
+            return SparseMatrix(len(indices), self.cols, (self.data[positions], self.col_indices[positions], row_ptr),
+                                storage="array", sorted_indices=self._sorted)
+
+        data, col_indices, row_ptr = [], [], [0]
+        for i in indices:
+            start, end = self.row_ptr[i], self.row_ptr[i + 1]
+            data.extend(self.data[start:end])
+            col_indices.extend(self.col_indices[start:end])
+            row_ptr.append(len(data))
+        return SparseMatrix(len(indices), self.cols, (data, col_indices, row_ptr), sorted_indices=self._sorted)
+
+    def _take_cols(self, selection):
+        """
+        Подматрица из столбцов selection (в указанном порядке, повторы допускаются).
+        Каждый хранимый элемент просматривается один раз.
+        """
+        increasing = all(a < b for a, b in zip(selection, selection[1:]))
+        if self.storage == "array":
+            selection = np.asarray(selection, dtype=np.int64)
+            order = np.argsort(selection, kind="stable")
+            sorted_cols = selection[order]
+            cols = self.col_indices.astype(np.int64)
+            low = np.searchsorted(sorted_cols, cols, side="left")
+            counts = np.searchsorted(sorted_cols, cols, side="right") - low
+            total = int(counts.sum())
+            offsets = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+            new_cols = order[np.repeat(low, counts) + offsets]
+            new_rows = np.repeat(self._row_indices(), counts)
+            data = np.repeat(self.data, counts)
+            if not increasing:
+                resort = np.lexsort((new_cols, new_rows))
+                new_rows, new_cols, data = new_rows[resort], new_cols[resort], data[resort]
+            row_ptr = np.zeros(self.rows + 1, dtype=self.row_ptr.dtype)
+            np.cumsum(np.bincount(new_rows, minlength=self.rows), out=row_ptr[1:])
+            return SparseMatrix(self.rows, len(selection), (data, new_cols, row_ptr), storage="array",
+                                sorted_indices=True if not increasing else self._sorted)
+
+        targets = {}
+        for new_col, old_col in enumerate(selection):
+            targets.setdefault(old_col, []).append(new_col)
+        data, col_indices, row_ptr = [], [], [0]
+        for i in range(self.rows):
+            start, end = self.row_ptr[i], self.row_ptr[i + 1]
+            row = []
+            for j, value in zip(self.col_indices[start:end], self.data[start:end]):
+                for new_col in targets.get(j, ()):
+                    row.append((new_col, value))
+            if not increasing:
+                row.sort(key=lambda entry: entry[0])
+            for new_col, value in row:
+                col_indices.append(new_col)
+                data.append(value)
+            row_ptr.append(len(data))
+        return SparseMatrix(self.rows, len(selection), (data, col_indices, row_ptr),
+                            sorted_indices=True if not increasing else self._sorted)
+
+    # Операторы строят ленивые выражения (см. модуль expression), вычисление - evaluate()
+
+    def __add__(self, other):
+        from .expression import Leaf
+        return Leaf(self) + other
+
+    def __radd__(self, other):
+        from .expression import Leaf
+        return other + Leaf(self)
+
+    def __sub__(self, other):
+        from .expression import Leaf
+        return Leaf(self) - other
+
+    def __rsub__(self, other):
+        from .expression import Leaf
+        return other - Leaf(self)
+
+    def __neg__(self):
+        from .expression import Leaf
+        return -Leaf(self)
+
+    def __mul__(self, scalar):
+        from .expression import Leaf
+        return Leaf(self) * scalar
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        from .expression import Leaf
+        return Leaf(self) / scalar
+
+    def __matmul__(self, other):
+        from .expression import Leaf
+        return Leaf(self) @ other
+
+    def __rmatmul__(self, other):
+        from .expression import Leaf
+        return other @ Leaf(self)
+
+    @property
+    def T(self):
+        from .expression import Leaf
+        return Leaf(self).T
+
+    def to_csc(self):
+        """
+        Представление матрицы по столбцам (CSC). Вычисляется при первом обращении за O(nnz + cols)
+        и кешируется; кеш сбрасывается при изменении данных матрицы.
+        :return: (data, row_indices, col_ptr) - значения, номера строк и указатели на начала столбцов.
+        """
+        if self._csc is None:
+            if self.storage == "array":
+                order = _counting_order(self.col_indices, self.cols)
+                col_ptr = np.zeros(self.cols + 1, dtype=self.row_ptr.dtype)
+                np.cumsum(np.bincount(self.col_indices, minlength=self.cols), out=col_ptr[1:])
+                self._csc = (self.data[order], self._row_indices()[order].astype(self.col_indices.dtype), col_ptr)
+            else:
+                # Сортировка подсчетом по столбцам; строки обходятся по порядку, поэтому внутри столбца они упорядочены
+                col_ptr = [0] * (self.cols + 1)
+                for j in self.col_indices:
+                    col_ptr[j + 1] += 1
+                for j in range(self.cols):
+                    col_ptr[j + 1] += col_ptr[j]
+                next_pos = col_ptr[:-1]
+                csc_data = [0] * len(self.data)
+                row_indices = [0] * len(self.data)
+                for i in range(self.rows):
+                    start, end = self.row_ptr[i], self.row_ptr[i + 1]
+                    for j, value in zip(self.col_indices[start:end], self.data[start:end]):
+                        pos = next_pos[j]
+                        csc_data[pos] = value
+                        row_indices[pos] = i
+                        next_pos[j] = pos + 1
+                self._csc = (csc_data, row_indices, col_ptr)
+        return self._csc
+
+    def transpose(self):
+        """
+        Транспонированная матрица. Ее CSR-массивы - это CSC-представление исходной матрицы
+        (строки внутри столбца всегда упорядочены). Если индексы исходной матрицы упорядочены,
+        ее CSR становится CSC-представлением транспонированной, и повторное транспонирование
+        не пересчитывается; иначе CSC будет построено заново при первом обращении.
+        :return: Новая матрица (SparseMatrix).
+        """
+        result = SparseMatrix(self.cols, self.rows, self.to_csc(), storage=self.storage, sorted_indices=True)
+        if self.has_sorted_indices:
+            result._csc = (self.data, self.col_indices, self.row_ptr)
+        return result
+
+    def _invalidate_caches(self):
+        """
+        Сбрасывает кешированные производные данные (после изменения CSR-массивов).
+        """
+        self._factorizations = {}      # Кеш разложений: (метод, exact) -> SparseFactorization
+        self._diagonal_positions = None  # Позиции диагональных элементов в data (-1, если элемента нет)
+        self._entry_keys = None        # Ключи row*cols + col для пакетного поиска (NumPy)
+        self._csc = None               # Кеш CSC-представления (data, row_indices, col_ptr)
+        self._workspaces = {}          # Буферы умножения на вектор/блок с out (см. _product_workspace)
+
+    @property
+    def has_sorted_indices(self):
+        """
+        Упорядочены ли индексы столбцов внутри каждой строки (результат проверки кешируется).
+        """
+        if self._sorted is None:
+            if self.storage == "array":
+                steps = np.diff(self.col_indices.astype(np.int64))
+                row_starts = np.asarray(self.row_ptr[1:-1])
+                row_starts = row_starts[(row_starts > 0) & (row_starts < len(self.col_indices))]
+                steps_ok = steps >= 0
+                steps_ok[row_starts - 1] = True  # Переход между строками не учитываем
+                self._sorted = bool(steps_ok.all())
+            else:
+                cols = self.col_indices
+                self._sorted = all(
+                    cols[k] <= cols[k + 1]
+                    for i in range(self.rows)
+                    for k in range(self.row_ptr[i], self.row_ptr[i + 1] - 1)
+                )
+        return self._sorted
+
+    def sort_indices(self):
+        """
+        Приводит матрицу к каноническому виду: индексы столбцов внутри строк упорядочены.
+        Массивы заменяются новыми, поэтому работает и для матриц, отображенных из файла.
+        """
+        if self.has_sorted_indices:
+            return
+        if self.storage == "array":
+            order = np.lexsort((self.col_indices, self._row_indices()))
+            self.data = self.data[order]
+            self.col_indices = self.col_indices[order]
+        else:
+            data = list(self.data)
+            col_indices = list(self.col_indices)
+            for i in range(self.rows):
+                start, end = self.row_ptr[i], self.row_ptr[i + 1]
+                row = sorted(zip(col_indices[start:end], data[start:end]), key=lambda entry: entry[0])
+                col_indices[start:end] = [col for col, _ in row]
+                data[start:end] = [value for _, value in row]
+            self.data, self.col_indices = data, col_indices
+        self._sorted = True
+        self._invalidate_caches()
+
+    @classmethod
+    def from_coo(cls, rows, cols, row_idx, col_idx, values, storage="list"):
+        """
+        Построение матрицы из координатного формата (COO) за O(nnz + rows + cols) без плотной матрицы.
+        Повторяющиеся позиции суммируются, нулевые суммы отбрасываются.
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param row_idx: Номера строк элементов (с 0, как в CSR).
+        :param col_idx: Номера столбцов элементов (с 0).
+        :param values: Значения элементов.
+        :param storage: "list" или "array".
+        :return: Новая матрица (SparseMatrix) с упорядоченными индексами столбцов.
+        """
+        if not (isinstance(rows, int) and rows > 0 and isinstance(cols, int) and cols > 0):
+            raise ValueError("Количество строк и столбцов должно быть положительными целыми числами.")
+        if not (len(row_idx) == len(col_idx) == len(values)):
+            raise ValueError("row_idx, col_idx и values должны иметь одинаковую длину.")
+
+        if storage == "array" and np is not None:
+            row_idx = np.asarray(row_idx, dtype=np.int64)
+            col_idx = np.asarray(col_idx, dtype=np.int64)
+            if len(row_idx) and (row_idx.min() < 0 or row_idx.max() >= rows or col_idx.min() < 0 or col_idx.max() >= cols):
+                raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+            return _csr_from_coo_arrays(rows, cols, row_idx, col_idx, np.asarray(values, dtype=np.float64))
+
+        nnz = len(values)
+        for i, j in zip(row_idx, col_idx):
+            if not (0 <= i < rows and 0 <= j < cols):
+                raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+
+        # Поразрядная сортировка подсчетом: сначала по столбцам, затем устойчиво по строкам
+        col_ptr = [0] * (cols + 1)
+        for j in col_idx:
+            col_ptr[j + 1] += 1
+        for j in range(cols):
+            col_ptr[j + 1] += col_ptr[j]
+        by_col = [0] * nnz
+        for k in range(nnz):
+            j = col_idx[k]
+            by_col[col_ptr[j]] = k
+            col_ptr[j] += 1
+
+        row_start = [0] * (rows + 1)
+        for i in row_idx:
+            row_start[i + 1] += 1
+        for i in range(rows):
+            row_start[i + 1] += row_start[i]
+        order = [0] * nnz
+        next_pos = row_start[:-1]
+        for k in by_col:
+            i = row_idx[k]
+            order[next_pos[i]] = k
+            next_pos[i] += 1
+
+        # Суммирование повторов: внутри строки одинаковые столбцы идут подряд
+        result_data = []
+        result_col_indices = []
+        result_row_ptr = [0]
+        for i in range(rows):
+            row_cols = []
+            row_values = []
+            for p in range(row_start[i], row_start[i + 1]):
+                k = order[p]
+                if row_cols and row_cols[-1] == col_idx[k]:
+                    row_values[-1] += values[k]
+                else:
+                    row_cols.append(col_idx[k])
+                    row_values.append(values[k])
+            for col, value in zip(row_cols, row_values):
+                if value != 0:
+                    result_data.append(value)
+                    result_col_indices.append(col)
+            result_row_ptr.append(len(result_data))
+
+        return cls(rows, cols, (result_data, result_col_indices, result_row_ptr), storage=storage, sorted_indices=True)
+
+    @classmethod
+    def from_triplets(cls, triplets, rows=None, cols=None, chunk_size=65536, storage="list"):
+        """
+        Построение матрицы из итерируемого набора троек (строка, столбец, значение), например генератора.
+        Тройки читаются порциями по chunk_size и сразу раскладываются в плоские массивы,
+        поэтому список всех кортежей в памяти не создается.
+        :param triplets: Итерируемый объект с тройками (i, j, value), индексы с 0.
+        :param rows: Количество строк (по умолчанию - максимальный индекс строки + 1).
+        :param cols: Количество столбцов (по умолчанию - максимальный индекс столбца + 1).
+        :param chunk_size: Размер порции.
+        :param storage: "list" или "array".
+        :return: Новая матрица (SparseMatrix).
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size должен быть положительным.")
+        use_arrays = storage == "array" and np is not None
+        row_parts, col_parts, value_parts = [], [], []
+        row_idx, col_idx, values = [], [], []
+        iterator = iter(triplets)
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            chunk_rows, chunk_cols, chunk_values = zip(*chunk)
+            if use_arrays:
+                row_parts.append(np.array(chunk_rows, dtype=np.int64))
+                col_parts.append(np.array(chunk_cols, dtype=np.int64))
+                value_parts.append(np.array(chunk_values, dtype=np.float64))
+            else:
+                row_idx.extend(chunk_rows)
+                col_idx.extend(chunk_cols)
+                values.extend(chunk_values)
+
+        if use_arrays and row_parts:
+            row_idx = np.concatenate(row_parts)
+            col_idx = np.concatenate(col_parts)
+            values = np.concatenate(value_parts)
+        if rows is None:
+            rows = int(max(row_idx)) + 1 if len(row_idx) else 1
+        if cols is None:
+            cols = int(max(col_idx)) + 1 if len(col_idx) else 1
+        return cls.from_coo(rows, cols, row_idx, col_idx, values, storage=storage)
+
+    def save(self, path):
+        """
+        Сохраняет матрицу в двоичном формате (см. sparse_io).
+        :param path: Путь к файлу.
+        """
+        from . import sparse_io
+        sparse_io.save_binary(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True, storage=None):
+        """
+        Загружает матрицу, сохраненную методом save().
+        :param path: Путь к файлу.
+        :param mmap: Отобразить файл в память без копирования (только чтение).
+        :param storage: "array" или "list"; по умолчанию выбирается по типу значений в файле
+                        (см. sparse_io.load_binary).
+        :return: Матрица (SparseMatrix).
+        """
+        from . import sparse_io
+        return sparse_io.load_binary(path, mmap=mmap, storage=storage)
+
+    def convert_storage(self, storage):
+        """
+        Копия матрицы с другим способом хранения.
+        :param storage: "list" или "array".
+        :return: Новая матрица (SparseMatrix).
+        """
+        return SparseMatrix(self.rows, self.cols, (self.data, self.col_indices, self.row_ptr), storage=storage)
+
+    def optimize_format(self):
+        """
+        Матрица в формате, самом выгодном для умножения на вектор (см. formats.optimize_format):
+        DIA для ленточных, BSR для блочных, SELL для строк близкой длины, иначе сама матрица.
+        """
+        from . import formats
+        return formats.optimize_format(self)
+
+    def memory_usage(self):
+        """
+        Приблизительный объем памяти (в байтах), занимаемый массивами CSR.
+        """
+        if self.storage == "array":
+            return self.data.nbytes + self.col_indices.nbytes + self.row_ptr.nbytes
+        total = 0
+        for values in (self.data, self.col_indices, self.row_ptr):
+            total += sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+        return total
+
+    def _uses_arrays(self, other=None):
+        """
+        Нужно ли выполнять операцию векторизованным ядром NumPy.
+        """
+        return self.storage == "array" or (other is not None and other.storage == "array")
+
+    def _row_indices(self):
+        """
+        Номер строки для каждого хранимого элемента (массив NumPy длины nnz).
+        """
+        row_ptr = _index_array(self.row_ptr)
+        return np.repeat(np.arange(self.rows, dtype=row_ptr.dtype), np.diff(row_ptr))
+
+    def trace(self):
+        """
+        Подсчет следа матрицы (сумма элементов на главной диагонали).
+        """
+        if self.rows != self.cols:
+            raise ValueError("След можно считать только для квадратной матрицы.")
+
+        if self._delta:
+            return sum(self._pending_diagonal())
+
+        positions = self._diagonal()
+        if self.storage == "array":
+            return float(self.data[positions[positions >= 0]].sum())
+        
+        trace_sum = 0
+        for k in positions:
+            if k >= 0:
+                trace_sum += self.data[k]
+        return trace_sum
+
+    def _diagonal(self):
+        """
+        Позиции диагональных элементов в data, найденные бинарным поиском за O(n log k) и закешированные.
+        """
+        if self._diagonal_positions is None:
+            self.sort_indices()
+            count = min(self.rows, self.cols)
+            if self.storage == "array":
+                indices = np.arange(count, dtype=np.int64)
+                self._diagonal_positions = self._find_positions(indices, indices)
+            else:
+                positions = []
+                for i in range(count):
+                    k = bisect.bisect_left(self.col_indices, i, self.row_ptr[i], self.row_ptr[i + 1])
+                    positions.append(k if k < self.row_ptr[i + 1] and self.col_indices[k] == i else -1)
+                self._diagonal_positions = positions
+        return self._diagonal_positions
+
+    def diagonal(self):
+        """
+        Главная диагональ матрицы.
+        :return: Список (или массив NumPy) длины min(rows, cols).
+        """
+        if self._delta:
+            values = self._pending_diagonal()
+            return np.array(values, dtype=np.float64) if self.storage == "array" else values
+        positions = self._diagonal()
+        if self.storage == "array":
+            values = np.zeros(len(positions), dtype=self.data.dtype)
+            found = positions >= 0
+            values[found] = self.data[positions[found]]
+            return values
+        return [self.data[k] if k >= 0 else 0 for k in positions]
+
+    def _find_positions(self, rows, cols):
+        """
+        Векторизованный бинарный поиск элементов (rows[t], cols[t]) (нумерация с 0) в упорядоченной матрице.
+        Ключи row*cols + col упорядочены глобально, поэтому хватает одного searchsorted.
+        :return: Массив позиций в data (-1, если элемента нет).
+        """
+        if self._entry_keys is None:
+            self._entry_keys = self._row_indices().astype(np.int64) * self.cols + self.col_indices
+        keys = rows * self.cols + cols
+        positions = np.searchsorted(self._entry_keys, keys)
+        found = positions < len(self._entry_keys)
+        found[found] = self._entry_keys[positions[found]] == keys[found]
+        return np.where(found, positions, -1)
+
+    def get_element(self, row, col):
+        """
+        Получение элемента по строке и столбцу (нумерация с 1).
+        :param row: Номер строки (с 1).
+        :param col: Номер столбца (с 1).
+        :return: Значение элемента.
+        """
+        if not (1 <= row <= self.rows and 1 <= col <= self.cols):
+            raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+        
+        row -= 1
+        col -= 1
+        if self._delta:
+            value = self._delta.get((row, col))
+            if value is not None:
+                return value
+            data, col_indices, row_ptr = self._base
+        else:
+            self.sort_indices()
+            data, col_indices, row_ptr = self.data, self.col_indices, self.row_ptr
+        start = row_ptr[row]
+        end = row_ptr[row + 1]
+
+        # Бинарный поиск в упорядоченной строке
+        if self.storage == "array":
+            k = start + int(np.searchsorted(col_indices[start:end], col))
+        else:
+            k = bisect.bisect_left(col_indices, col, start, end)
+        if k < end and col_indices[k] == col:
+            return float(data[k]) if self.storage == "array" else data[k]
+        return 0
+
+    def get_elements(self, rows, cols):
+        """
+        Пакетное получение элементов (нумерация с 1, как в get_element).
+        :param rows: Номера строк (список или массив NumPy).
+        :param cols: Номера столбцов той же длины.
+        :return: Значения элементов (массив NumPy для хранения в массивах, иначе список).
+        """
+        if len(rows) != len(cols):
+            raise ValueError("rows и cols должны иметь одинаковую длину.")
+        self.sort_indices()
+
+        if self.storage == "array":
+            rows = np.asarray(rows, dtype=np.int64) - 1
+            cols = np.asarray(cols, dtype=np.int64) - 1
+            if len(rows) and (rows.min() < 0 or rows.max() >= self.rows or cols.min() < 0 or cols.max() >= self.cols):
+                raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+            positions = self._find_positions(rows, cols)
+            values = np.zeros(len(rows), dtype=self.data.dtype)
+            found = positions >= 0
+            values[found] = self.data[positions[found]]
+            return values
+
+        return [self.get_element(row, col) for row, col in zip(rows, cols)]
+    
+    def _pending_diagonal(self):
+        """
+        Диагональ с учетом буфера изменений (без слияния и без кеширования).
+        """
+        return [self.get_element(i, i) for i in range(1, min(self.rows, self.cols) + 1)]
+
+    def set_element(self, row, col, value):
+        """
+        Запись элемента (нумерация с 1). Значение попадает в буфер изменений и сливается с CSR
+        пакетно, когда буфер достигает порога; чтение видит изменения сразу.
+        :param row: Номер строки (с 1).
+        :param col: Номер столбца (с 1).
+        :param value: Новое значение (0 удаляет элемент).
+        """
+        if not (1 <= row <= self.rows and 1 <= col <= self.cols):
+            raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+        self._open_buffer()
+        self._delta[(row - 1, col - 1)] = value
+        if len(self._delta) >= self._buffer_limit():
+            self.compact()
+
+    def update_many(self, rows, cols, values):
+        """
+        Пакетная запись элементов (нумерация с 1, как в set_element).
+        :param rows: Номера строк.
+        :param cols: Номера столбцов той же длины.
+        :param values: Новые значения той же длины.
+        """
+        if not (len(rows) == len(cols) == len(values)):
+            raise ValueError("rows, cols и values должны иметь одинаковую длину.")
+        rows = [int(row) - 1 for row in rows]
+        cols = [int(col) - 1 for col in cols]
+        if rows and (min(rows) < 0 or max(rows) >= self.rows or min(cols) < 0 or max(cols) >= self.cols):
+            raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+        if _is_ndarray(values):
+            values = values.tolist()
+        self._open_buffer()
+        self._delta.update(zip(zip(rows, cols), values))
+        if len(self._delta) >= self._buffer_limit():
+            self.compact()
+
+    def _open_buffer(self):
+        """
+        Перед первой записью убирает CSR-массивы в _base (упорядочив их) и сбрасывает кеши.
+        """
+        if self._base is None:
+            self.sort_indices()
+            self._base = (self.__dict__.pop("data"), self.__dict__.pop("col_indices"),
+                          self.__dict__.pop("row_ptr"))
+            self._invalidate_caches()
+
+    def _buffer_limit(self):
+        """
+        Порог слияния: заданный compact_threshold или 1/8 от nnz (не меньше 1024), так что
+        слияние за O(nnz) в среднем стоит O(1) на запись.
+        """
+        if self.compact_threshold is not None:
+            return self.compact_threshold
+        return max(1024, len(self._base[0]) // 8)
+
+    def compact(self):
+        """
+        Сливает буфер изменений с CSR за один проход: нетронутые участки копируются срезами,
+        измененные строки сливаются двумя указателями с отсортированными записями буфера.
+        """
+        if self._base is None:
+            return
+        data, col_indices, row_ptr = self._base
+        arrays = self.storage == "array"
+        data_pieces, col_pieces = [], []
+        length_changes = {}
+        copied = 0
+        updates = sorted(self._delta.items())
+        for row, group in itertools.groupby(updates, key=lambda item: item[0][0]):
+            start, end = int(row_ptr[row]), int(row_ptr[row + 1])
+            data_pieces.append(data[copied:start])
+            col_pieces.append(col_indices[copied:start])
+            base_cols = col_indices[start:end]
+            base_values = data[start:end]
+            if arrays:
+                base_cols, base_values = base_cols.tolist(), base_values.tolist()
+            merged_cols, merged_values = [], []
+            k = 0
+            for (_, col), value in group:
+                while k < len(base_cols) and base_cols[k] < col:
+                    merged_cols.append(base_cols[k])
+                    merged_values.append(base_values[k])
+                    k += 1
+                if k < len(base_cols) and base_cols[k] == col:
+                    k += 1  # Старое значение заменяется записью из буфера
+                if value != 0:
+                    merged_cols.append(col)
+                    merged_values.append(value)
+            merged_cols.extend(base_cols[k:])
+            merged_values.extend(base_values[k:])
+            data_pieces.append(merged_values)
+            col_pieces.append(merged_cols)
+            length_changes[row] = len(merged_cols) - (end - start)
+            copied = end
+        data_pieces.append(data[copied:])
+        col_pieces.append(col_indices[copied:])
+
+        if arrays:
+            lengths = np.diff(np.asarray(row_ptr, dtype=np.int64))
+            changed_rows = np.fromiter(length_changes.keys(), dtype=np.int64, count=len(length_changes))
+            lengths[changed_rows] += np.fromiter(length_changes.values(), dtype=np.int64, count=len(length_changes))
+            self.data = np.concatenate([np.asarray(piece, dtype=np.float64) for piece in data_pieces])
+            index_dtype = _index_dtype(max(self.cols, len(self.data)))
+            self.col_indices = np.concatenate([np.asarray(piece, dtype=index_dtype) for piece in col_pieces])
+            self.row_ptr = np.concatenate(([0], np.cumsum(lengths))).astype(index_dtype)
+        else:
+            self.data = list(itertools.chain.from_iterable(data_pieces))
+            self.col_indices = list(itertools.chain.from_iterable(col_pieces))
+            new_row_ptr = [0] * (self.rows + 1)
+            shift = 0
+            for i in range(self.rows):
+                shift += length_changes.get(i, 0)
+                new_row_ptr[i + 1] = row_ptr[i + 1] + shift
+            self.row_ptr = new_row_ptr
+        self._delta = {}
+        self._base = None
+        self._sorted = True
+        self._invalidate_caches()
+
+    # Задача №2
+
+    def add(self, other, workers=1):
+        """
+        Сложение двух матриц.
+        :param other: Другая матрица (SparseMatrix).
+        :param workers: Число параллельных исполнителей по блокам строк (см. модуль parallel).
+        :return: Новая матрица (SparseMatrix), результат сложения.
+        """
+        return self.axpby(1, other, 1, workers=workers)
+
+    def _sorted_row(self, i):
+        """
+        Индексы столбцов и значения строки i, упорядоченные по столбцам.
+        """
+        start, end = self.row_ptr[i], self.row_ptr[i + 1]
+        cols = self.col_indices[start:end]
+        values = self.data[start:end]
+        if not self._sorted and any(cols[k] > cols[k + 1] for k in range(len(cols) - 1)):
+            order = sorted(range(len(cols)), key=cols.__getitem__)
+            cols = [cols[k] for k in order]
+            values = [values[k] for k in order]
+        return cols, values
+
+    def axpby(self, alpha, other, beta, workers=1):
+        """
+        Линейная комбинация двух матриц alpha*A + beta*B слиянием упорядоченных строк.
+        :param alpha: Коэффициент при этой матрице.
+        :param other: Другая матрица (SparseMatrix) того же размера.
+        :param beta: Коэффициент при другой матрице.
+        :param workers: Число параллельных исполнителей по блокам строк (см. модуль parallel).
+        :return: Новая матрица (SparseMatrix) с упорядоченными индексами столбцов.
+        """
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Матрицы должны иметь одинаковые размеры для сложения.")
+
+        if workers > 1:
+            from . import parallel
+            return parallel.axpby(self, alpha, other, beta, workers)
+
+        if self._uses_arrays(other):
+            if self.has_sorted_indices and other.has_sorted_indices:
+                return _merge_sorted_arrays(self.rows, self.cols, ((alpha, self), (beta, other)))
+            # Неупорядоченные строки: объединяем элементы обеих матриц как COO и суммируем совпадающие позиции
+            return _csr_from_coo_arrays(
+                self.rows, self.cols,
+                np.concatenate((self._row_indices(), other._row_indices())),
+                np.concatenate((np.asarray(self.col_indices), np.asarray(other.col_indices))),
+                np.concatenate((alpha * np.asarray(self.data, dtype=np.float64),
+                                beta * np.asarray(other.data, dtype=np.float64))),
+            )
+
+        result_data = []
+        result_col_indices = []
+        result_row_ptr = [0]
+
+        for i in range(self.rows):
+            cols_a, values_a = self._sorted_row(i)
+            cols_b, values_b = other._sorted_row(i)
+            p, q = 0, 0
+            len_a, len_b = len(cols_a), len(cols_b)
+
+            # Слияние двух упорядоченных строк двумя указателями
+            while p < len_a or q < len_b:
+                if q == len_b or (p < len_a and cols_a[p] < cols_b[q]):
+                    col, value = cols_a[p], alpha * values_a[p]
+                    p += 1
+                elif p == len_a or cols_b[q] < cols_a[p]:
+                    col, value = cols_b[q], beta * values_b[q]
+                    q += 1
+                else:
+                    col, value = cols_a[p], alpha * values_a[p] + beta * values_b[q]
+                    p += 1
+                    q += 1
+                if value != 0:  # Только ненулевые элементы
+                    result_data.append(value)
+                    result_col_indices.append(col)
+
+            result_row_ptr.append(len(result_data))
+
+        return SparseMatrix(self.rows, self.cols, (result_data, result_col_indices, result_row_ptr), sorted_indices=True)
+
+    @staticmethod
+    def linear_combination(terms):
+        """
+        Сумма c1*A1 + c2*A2 + ... за один проход без промежуточных матриц.
+        :param terms: Список пар (коэффициент, SparseMatrix) одинакового размера.
+        :return: Новая матрица (SparseMatrix) с упорядоченными индексами столбцов.
+        """
+        terms = list(terms)
+        if not terms:
+            raise ValueError("Нужна хотя бы одна матрица.")
+        rows, cols = terms[0][1].rows, terms[0][1].cols
+        if any(matrix.rows != rows or matrix.cols != cols for _, matrix in terms):
+            raise ValueError("Матрицы должны иметь одинаковые размеры для сложения.")
+
+        if any(matrix.storage == "array" for _, matrix in terms):
+            if all(matrix.has_sorted_indices for _, matrix in terms):
+                return _merge_sorted_arrays(rows, cols, terms)
+            return _csr_from_coo_arrays(
+                rows, cols,
+                np.concatenate([matrix._row_indices() for _, matrix in terms]),
+                np.concatenate([np.asarray(matrix.col_indices) for _, matrix in terms]),
+                np.concatenate([coefficient * np.asarray(matrix.data, dtype=np.float64) for coefficient, matrix in terms]),
+            )
+
+        # Плотный аккумулятор строки и массив меток, как в multiply_matrix
+        result_data = []
+        result_col_indices = []
+        result_row_ptr = [0]
+        accumulator = [0] * cols
+        marker = [-1] * cols
+        for i in range(rows):
+            row_cols = []
+            for coefficient, matrix in terms:
+                for k in range(matrix.row_ptr[i], matrix.row_ptr[i + 1]):
+                    col = matrix.col_indices[k]
+                    if marker[col] != i:
+                        marker[col] = i
+                        row_cols.append(col)
+                        accumulator[col] = coefficient * matrix.data[k]
+                    else:
+                        accumulator[col] += coefficient * matrix.data[k]
+            for col in sorted(row_cols):
+                if accumulator[col] != 0:
+                    result_data.append(accumulator[col])
+                    result_col_indices.append(col)
+            result_row_ptr.append(len(result_data))
+
+        return SparseMatrix(rows, cols, (result_data, result_col_indices, result_row_ptr), sorted_indices=True)
+
+    def multiply_scalar(self, scalar: float, workers=1):
+        """
+        Умножение матрицы на скаляр.
+        :param scalar: Число, на которое умножается матрица.
+        :param workers: Число параллельных исполнителей по блокам строк (см. модуль parallel).
+        :return: Новая матрица (SparseMatrix), результат умножения.
+        """
+        if workers > 1:
+            from . import parallel
+            return parallel.multiply_scalar(self, scalar, workers)
+
+        if self.storage == "array":
+            values = self.data * scalar
+            keep = values != 0
+            row_ptr = np.zeros(self.rows + 1, dtype=self.row_ptr.dtype)
+            np.cumsum(np.bincount(self._row_indices()[keep], minlength=self.rows), out=row_ptr[1:])
+            return SparseMatrix(self.rows, self.cols, (values[keep], self.col_indices[keep], row_ptr),
+                                storage="array", sorted_indices=self._sorted)
+
+        result_data = []
+        result_col_indices = []
+        result_row_ptr = [0]
+
+        for i in range(self.rows):
+            row_result = {}
+            start, end = self.row_ptr[i], self.row_ptr[i + 1]
+            for k in range(start, end):
+                col = self.col_indices[k]
+                value = self.data[k] * scalar
+                if value != 0:
+                    row_result[col] = value
+                    result_data.append(value)
+                    result_col_indices.append(col)
+
+            result_row_ptr.append(len(result_data))
+
+        return SparseMatrix(self.rows, self.cols, (result_data, result_col_indices, result_row_ptr),
+                            sorted_indices=self._sorted)
+
+    def multiply_matrix(self, other, sort_indices=True, workers=1):
+        """
+        Умножение двух разреженных матриц (CSR-формат) и возврат результата в CSR-формате.
+        Алгоритм Густавсона в два прохода: символьный проход с массивом меток вычисляет row_ptr
+        и шаблон результата, численный - заполняет массивы окончательного размера, накапливая
+        в плотном аккумуляторе только строки с совпадающими столбцами.
+        :param other: Другая матрица (SparseMatrix).
+        :param sort_indices: Упорядочивать ли индексы столбцов внутри строк результата.
+        :param workers: Число параллельных исполнителей по блокам строк (см. модуль parallel).
+        :return: Новая матрица (SparseMatrix), результат умножения.
+        """
+        if self.cols != other.rows:
+            raise ValueError("Число столбцов первой матрицы должно совпадать с числом строк второй.")
+
+        if workers > 1:
+            from . import parallel
+            return parallel.multiply_matrix(self, other, workers, sort_indices=sort_indices)
+
+        if self._uses_arrays(other):
+            return self._multiply_matrix_arrays(other, sort_indices)
+
+        if (self._csc is not None or other._csc is not None) and self._prefer_transposed_product(other):
+            # C^T = B^T * A^T: CSR-форма хотя бы одной транспонированной матрицы уже есть в кеше CSC
+            return other.transpose()._multiply_rows(self.transpose(), sort_indices).transpose()
+        return self._multiply_rows(other, sort_indices)
+
+    # Относительная стоимость одной итерации внешнего цикла по строкам и переноса одного элемента при транспонировании
+    _ROW_COST = 4
+    _ELEMENT_COST = 1
+
+    def _prefer_transposed_product(self, other):
+        """
+        Выгоднее ли считать A*B как (B^T * A^T)^T. Число умножений одинаково, но внешний цикл
+        идет по B.cols строкам вместо A.rows, зато результат нужно транспонировать обратно,
+        а операнд без кешированной CSC-формы - транспонировать заранее.
+        """
+        b_lengths = [other.row_ptr[j + 1] - other.row_ptr[j] for j in range(other.rows)]
+        flops = sum(b_lengths[j] for j in self.col_indices)
+        result_nnz = min(flops, self.rows * other.cols)
+        row_cost = self._ROW_COST * self.rows
+        transposed_cost = (self._ROW_COST * other.cols
+                           + self._ELEMENT_COST * (result_nnz + self.rows + other.cols))
+        for matrix in (self, other):
+            if matrix._csc is None:
+                transposed_cost += self._ELEMENT_COST * (len(matrix.col_indices) + matrix.rows + matrix.cols)
+        return transposed_cost < row_cost
+
+    def _multiply_rows(self, other, sort_indices):
+        """
+        Построчное умножение Густавсона (списки).
+        """
+        a_data, a_cols, a_ptr = self.data, self.col_indices, self.row_ptr
+        b_data, b_cols, b_ptr = other.data, other.col_indices, other.row_ptr
+
+        # Символьный проход: массив меток (marker[j] == i, если столбец j уже встречался в строке i)
+        # дает row_ptr и шаблон результата - столбцы в порядке первого появления. Строки, в которых
+        # вклады нескольких элементов A попали в один столбец, отмечаются в merged_rows
+        marker = [-1] * other.cols
+        merged_rows = [False] * self.rows
+        result_row_ptr = [0] * (self.rows + 1)
+        result_col_indices = []
+        append = result_col_indices.append
+        for i in range(self.rows):
+            for col_a in a_cols[a_ptr[i]:a_ptr[i + 1]]:
+                for col_b in b_cols[b_ptr[col_a]:b_ptr[col_a + 1]]:
+                    if marker[col_b] != i:
+                        marker[col_b] = i
+                        append(col_b)
+                    else:
+                        merged_rows[i] = True
+            result_row_ptr[i + 1] = len(result_col_indices)
+
+        # Численный проход в массивы окончательного размера. В строке без совпадающих столбцов
+        # произведения идут ровно в порядке шаблона, и аккумулятор не нужен; остальные строки
+        # собираются в плотном аккумуляторе, использованные ячейки которого затем обнуляются
+        result_data = [0] * len(result_col_indices)
+        accumulator = [0] * other.cols
+        for i in range(self.rows):
+            start, end = a_ptr[i], a_ptr[i + 1]
+            row_start, row_end = result_row_ptr[i], result_row_ptr[i + 1]
+            if merged_rows[i]:
+                for col_a, val_a in zip(a_cols[start:end], a_data[start:end]):
+                    lo, hi = b_ptr[col_a], b_ptr[col_a + 1]
+                    for col_b, val_b in zip(b_cols[lo:hi], b_data[lo:hi]):
+                        accumulator[col_b] += val_a * val_b
+                pattern = result_col_indices[row_start:row_end]
+                if sort_indices:
+                    pattern.sort()
+                    result_col_indices[row_start:row_end] = pattern
+                result_data[row_start:row_end] = [accumulator[col] for col in pattern]
+                for col in pattern:
+                    accumulator[col] = 0
+            else:
+                products = [val_a * val_b
+                            for col_a, val_a in zip(a_cols[start:end], a_data[start:end])
+                            for val_b in b_data[b_ptr[col_a]:b_ptr[col_a + 1]]]
+                if sort_indices and row_end - row_start > 1:
+                    # Одна перестановка упорядочивает и столбцы, и значения
+                    pattern = result_col_indices[row_start:row_end]
+                    take = operator.itemgetter(*sorted(range(row_end - row_start), key=pattern.__getitem__))
+                    result_col_indices[row_start:row_end] = take(pattern)
+                    result_data[row_start:row_end] = take(products)
+                else:
+                    result_data[row_start:row_end] = products
+
+        # Удаляем элементы, ставшие нулевыми из-за взаимного сокращения (на месте)
+        if 0 in result_data:
+            write = 0
+            for i in range(self.rows):
+                start, end = result_row_ptr[i], result_row_ptr[i + 1]
+                result_row_ptr[i] = write
+                for p in range(start, end):
+                    if result_data[p] != 0:
+                        result_data[write] = result_data[p]
+                        result_col_indices[write] = result_col_indices[p]
+                        write += 1
+            result_row_ptr[self.rows] = write
+            del result_data[write:]
+            del result_col_indices[write:]
+
+        return SparseMatrix(self.rows, other.cols, (result_data, result_col_indices, result_row_ptr),
+                            sorted_indices=sort_indices)
+    
+    def _vector_kernel(self, x):
+        """
+        Нужно ли вычислять произведение на вектор/блок векторизованным ядром NumPy.
+        """
+        return self.storage == "array" or _is_ndarray(x)
+
+    def _reuses_workspace(self, out):
+        """
+        Можно ли вычислить произведение в out без временных массивов: хранение "array"
+        и буфер out - массив float64.
+        """
+        return self.storage == "array" and isinstance(out, np.ndarray) and out.dtype == np.float64
+
+    def _product_workspace(self, width=None):
+        """
+        Буферы для умножения с out: номера непустых строк, начала их сегментов в data, номера строк
+        и столбцов элементов (np.intp, чтобы take не преобразовывал индексы при каждом вызове)
+        и буферы float64 для произведений (nnz или nnz x width) и сумм по строкам.
+        Создаются при первом вызове и используются повторно до изменения матрицы.
+        :param width: Число столбцов блока (None - вектор).
+        """
+        workspace = self._workspaces.get(width)
+        if workspace is None:
+            row_ptr = self.row_ptr
+            nonempty = np.flatnonzero(row_ptr[1:] > row_ptr[:-1])
+            shape = (len(self.data),) if width is None else (len(self.data), width)
+            sums_shape = (len(nonempty),) if width is None else (len(nonempty), width)
+            workspace = (nonempty, row_ptr[nonempty].astype(np.intp),
+                         self._row_indices().astype(np.intp, copy=False),
+                         self.col_indices.astype(np.intp, copy=False),
+                         np.empty(shape), np.empty(sums_shape))
+            self._workspaces[width] = workspace
+        return workspace
+
+    def _matvec_into(self, x, out):
+        """
+        matvec в массив out без выделения памяти (буферы из _product_workspace).
+        """
+        nonempty, starts, _, col_indices, products, sums = self._product_workspace()
+        # mode="clip" - без промежуточной копии out (индексы и так в пределах x)
+        np.take(np.asarray(x, dtype=np.float64), col_indices, out=products, mode="clip")
+        np.multiply(products, self.data, out=products)
+        out.fill(0)
+        if len(products):
+            np.add.reduceat(products, starts, out=sums)
+            out[nonempty] = sums
+        return out
+
+    def matvec(self, x, out=None, workers=1):
+        """
+        Умножение матрицы на вектор: y = A*x.
+        :param x: Вектор длины cols (список или массив NumPy).
+        :param out: Необязательный заранее выделенный буфер длины rows для результата.
+        :param workers: Число параллельных исполнителей по блокам строк (см. модуль parallel).
+        :return: Вектор длины rows (out, если он передан).
+        """
+        if len(x) != self.cols:
+            raise ValueError("Длина вектора должна совпадать с числом столбцов матрицы.")
+        if out is not None and len(out) != self.rows:
+            raise ValueError("Длина буфера out должна совпадать с числом строк матрицы.")
+
+        if workers > 1:
+            from . import parallel
+            return parallel.matvec(self, x, workers, out=out)
+
+        if self._vector_kernel(x):
+            if self._reuses_workspace(out):
+                return self._matvec_into(x, out)
+            row_ptr = _index_array(self.row_ptr)
+            products = np.asarray(self.data) * np.asarray(x)[_index_array(self.col_indices)]
+            result = np.zeros(self.rows, dtype=np.result_type(products, np.float64))
+            # Суммы по сегментам строк; reduceat вызывается только для непустых строк
+            starts = row_ptr[:-1]
+            nonempty = row_ptr[1:] > starts
+            if len(products):
+                result[nonempty] = np.add.reduceat(products, starts[nonempty])
+            return _store(result, out)
+
+        if out is None:
+            out = [0] * self.rows
+        for i in range(self.rows):
+            total = 0
+            for k in range(self.row_ptr[i], self.row_ptr[i + 1]):
+                total += self.data[k] * x[self.col_indices[k]]
+            out[i] = total
+        return out
+
+    def rmatvec(self, x, out=None):
+        """
+        Умножение транспонированной матрицы на вектор: y = A^T*x.
+        :param x: Вектор длины rows (список или массив NumPy).
+        :param out: Необязательный заранее выделенный буфер длины cols для результата.
+        :return: Вектор длины cols (out, если он передан).
+        """
+        if len(x) != self.rows:
+            raise ValueError("Длина вектора должна совпадать с числом строк матрицы.")
+        if out is not None and len(out) != self.cols:
+            raise ValueError("Длина буфера out должна совпадать с числом столбцов матрицы.")
+
+        if self._vector_kernel(x):
+            if self._reuses_workspace(out):
+                _, _, row_indices, col_indices, products, _ = self._product_workspace()
+                np.take(np.asarray(x, dtype=np.float64), row_indices, out=products, mode="clip")
+                np.multiply(products, self.data, out=products)
+                out.fill(0)
+                np.add.at(out, col_indices, products)
+                return out
+            weights = np.asarray(self.data) * np.asarray(x)[self._row_indices()]
+            # bincount без элементов возвращает целые нули, поэтому тип приводится явно
+            result = np.bincount(_index_array(self.col_indices), weights=weights,
+                                 minlength=self.cols).astype(np.float64, copy=False)
+            return _store(result, out)
+
+        if out is None:
+            out = [0] * self.cols
+        else:
+            for j in range(self.cols):
+                out[j] = 0
+        for i in range(self.rows):
+            value = x[i]
+            if value == 0:
+                continue
+            for k in range(self.row_ptr[i], self.row_ptr[i + 1]):
+                out[self.col_indices[k]] += self.data[k] * value
+        return out
+
+    def matmat(self, X, out=None):
+        """
+        Умножение матрицы на плотный блок: Y = A*X.
+        :param X: Плотная матрица cols x k (список списков или двумерный массив NumPy).
+        :param out: Необязательный заранее выделенный буфер rows x k для результата.
+        :return: Плотная матрица rows x k (out, если он передан).
+        """
+        if len(X) != self.cols:
+            raise ValueError("Число строк блока должно совпадать с числом столбцов матрицы.")
+        if out is not None and len(out) != self.rows:
+            raise ValueError("Число строк буфера out должно совпадать с числом строк матрицы.")
+
+        if self._vector_kernel(X):
+            X = np.asarray(X)
+            if X.ndim != 2:
+                raise ValueError("Блок должен быть двумерным.")
+            if self._reuses_workspace(out) and out.shape == (self.rows, X.shape[1]):
+                nonempty, starts, _, col_indices, products, sums = self._product_workspace(X.shape[1])
+                np.take(np.asarray(X, dtype=np.float64), col_indices, axis=0, out=products, mode="clip")
+                np.multiply(products, self.data[:, None], out=products)
+                out.fill(0)
+                if len(products):
+                    np.add.reduceat(products, starts, axis=0, out=sums)
+                    out[nonempty] = sums
+                return out
+            row_ptr = _index_array(self.row_ptr)
+            products = np.asarray(self.data)[:, None] * X[_index_array(self.col_indices)]
+            result = np.zeros((self.rows, X.shape[1]), dtype=np.result_type(products, np.float64))
+            starts = row_ptr[:-1]
+            nonempty = row_ptr[1:] > starts
+            if len(products):
+                result[nonempty] = np.add.reduceat(products, starts[nonempty], axis=0)
+            return _store(result, out)
+
+        width = len(X[0]) if X else 0
+        if out is None:
+            out = [[0] * width for _ in range(self.rows)]
+        for i in range(self.rows):
+            row_out = out[i]
+            for j in range(width):
+                row_out[j] = 0
+            for k in range(self.row_ptr[i], self.row_ptr[i + 1]):
+                value = self.data[k]
+                row_x = X[self.col_indices[k]]
+                for j in range(width):
+                    row_out[j] += value * row_x[j]
+        return out
+
+    # Наименьший размер плотного аккумулятора умножения (в элементах) и наибольшее число блоков строк,
+    # при котором аккумулятор выгоднее сортировки ключей произведений
+    _ACCUMULATOR_SIZE = 1 << 20
+    _ACCUMULATOR_BLOCKS = 4
+
+    def _multiply_matrix_arrays(self, other, sort_indices=True):
+        """
+        Векторизованное умножение Густавсона по блокам строк A. Каждый элемент A[i, k] порождает
+        произведения со всей строкой k матрицы B; ключ i*cols + j адресует плотный аккумулятор блока.
+        Символьный проход (массив меток) дает шаблон блока и длины его строк, численный суммирует
+        произведения в аккумуляторе и переносит суммы в массивы результата, выделенные один раз.
+        При sort_indices сортируется только шаблон (nnz результата), а не все произведения.
+        Если аккумулятор пришлось бы делить больше чем на _ACCUMULATOR_BLOCKS блоков (широкая
+        и очень разреженная матрица), произведения суммируются сортировкой ключей.
+        """
+        rows, cols = self.rows, other.cols
+        a_ptr = _index_array(self.row_ptr).astype(np.intp, copy=False)
+        a_cols = _index_array(self.col_indices)
+        b_ptr = _index_array(other.row_ptr).astype(np.intp, copy=False)
+        b_cols = _index_array(other.col_indices)
+        a_data = np.asarray(self.data, dtype=np.float64)
+        b_data = np.asarray(other.data, dtype=np.float64)
+
+        # Начала произведений каждого элемента A (flop_ptr) и каждой строки A (row_flops)
+        lengths = (b_ptr[1:] - b_ptr[:-1])[a_cols]
+        flop_ptr = np.zeros(len(lengths) + 1, dtype=np.intp)
+        np.cumsum(lengths, out=flop_ptr[1:])
+        flops = int(flop_ptr[-1])
+        row_flops = flop_ptr[a_ptr]
+        index = np.arange(flops, dtype=np.intp)
+
+        def expand(lo, hi):
+            # Позиции в B произведений элементов A с номерами [lo, hi): начало строки B плюс смещение в группе
+            local = index[:flop_ptr[hi] - flop_ptr[lo]]
+            return np.repeat(b_ptr[a_cols[lo:hi]] - (flop_ptr[lo:hi] - flop_ptr[lo]), lengths[lo:hi]) + local, local
+
+        block_rows = max(1, min(rows * cols, max(self._ACCUMULATOR_SIZE, 2 * flops)) // cols)
+        if -(-rows // block_rows) > self._ACCUMULATOR_BLOCKS:
+            positions, _ = expand(0, len(lengths))
+            return _csr_from_coo_arrays(rows, cols, np.repeat(self._row_indices(), lengths), b_cols[positions],
+                                        np.repeat(a_data, lengths) * b_data[positions])
+
+        size = min(rows, block_rows) * cols
+        marker = np.empty(size, dtype=np.intp)  # marker[key] - номер последнего произведения с этим ключом
+        accumulator = np.zeros(size)
+        capacity = min(flops, rows * cols)      # Верхняя граница nnz результата
+        index_dtype = _index_dtype(max(cols, capacity))
+        result_data = np.empty(capacity)
+        result_col_indices = np.empty(capacity, dtype=index_dtype)
+        result_row_ptr = np.zeros(rows + 1, dtype=index_dtype)
+        write = 0
+        for first_row in range(0, rows, block_rows):
+            last_row = min(rows, first_row + block_rows)
+            lo, hi = a_ptr[first_row], a_ptr[last_row]
+            positions, local = expand(lo, hi)
+            keys = np.repeat(np.arange(0, (last_row - first_row) * cols, cols, dtype=np.intp),
+                             np.diff(row_flops[first_row:last_row + 1])) + b_cols[positions]
+
+            # Символьный проход: по одному ключу на позицию результата, строки блока идут по порядку
+            marker[keys] = local
+            pattern = keys[marker[keys] == local]
+            if sort_indices:
+                pattern.sort()
+
+            # Численный проход: суммы в аккумуляторе, использованные ячейки обнуляются
+            np.add.at(accumulator, keys, np.repeat(a_data[lo:hi], lengths[lo:hi]) * b_data[positions])
+            sums = accumulator[pattern]
+            accumulator[pattern] = 0
+            nonzero = sums != 0  # Сокращение произведений
+            if not nonzero.all():
+                pattern, sums = pattern[nonzero], sums[nonzero]
+
+            count = len(pattern)
+            result_data[write:write + count] = sums
+            result_col_indices[write:write + count] = pattern % cols
+            block_ptr = result_row_ptr[first_row + 1:last_row + 1]
+            np.cumsum(np.bincount(pattern // cols, minlength=last_row - first_row), out=block_ptr)
+            block_ptr += write
+            write += count
+
+        if write < capacity:
+            result_data, result_col_indices = result_data[:write].copy(), result_col_indices[:write].copy()
+        return SparseMatrix(rows, cols, (result_data, result_col_indices, result_row_ptr), storage="array",
+                            sorted_indices=True if sort_indices else None)
+
+    # Задача №3
+
+    def determinant(self, method="lu", exact=None):
+        """
+        Вычисляет определитель матрицы в формате CSR.
+        :param method: "lu" - через разреженное LU-разложение (полиномиальное время),
+                       "cofactor" - разложение по первой строке (O(n!)), оставлено для перекрестной проверки.
+        :param exact: Считать точно в дробях Fraction. По умолчанию (None) - точно, если все элементы целые.
+        :return: Определитель матрицы.
+        """
+        if self.rows != self.cols:
+            raise ValueError("Невозможно вычислить определитель для матрицы, не являющейся квадратной.")
+
+        if method == "cofactor":
+            return self._determinant_cofactor()
+        if method != "lu":
+            raise ValueError("Неизвестный метод вычисления определителя: " + str(method))
+
+        return self.factorize(exact=self._is_exact() if exact is None else exact).determinant()
+
+    def _determinant_cofactor(self):
+        """
+        Вычисляет определитель разложением по первой строке (рекурсивно, O(n!)).
+        :return: Определитель матрицы.
+        """
+        # Базовый случай для 1x1 матрицы
+        if self.rows == 1:
+            return self.get_element(1, 1)
+        
+        # Базовый случай для 2x2 матрицы
+        if self.rows == 2:
+            a = self.get_element(1, 1)
+            b = self.get_element(1, 2)
+            c = self.get_element(2, 1)
+            d = self.get_element(2, 2)
+            return a * d - b * c
+
+        # Рекурсивный случай для матрицы размера 3x3 и больше
+        det = 0
+        # Разложение по первой строке
+        for col in range(1, self.cols + 1):
+            minor_data = []
+            minor_col_indices = []
+            minor_row_ptr = [0]
+            
+            # Создание минора матрицы, исключая первую строку и текущий столбец
+            for row in range(2, self.rows + 1):
+                start, end = self.row_ptr[row - 1], self.row_ptr[row]
+                for k in range(start, end):
+                    if self.col_indices[k] != col - 1:
+                        minor_data.append(self.data[k])
+                        minor_col_indices.append(self.col_indices[k] if self.col_indices[k] < col - 1 else self.col_indices[k] - 1)
+                minor_row_ptr.append(len(minor_data))
+            
+            # Рекурсивное вычисление детерминанта для минора
+            cofactor = self.get_element(1, col) * (-1) ** (col + 1) # (-1)^(row + col) - знак минора
+            minor_matrix = SparseMatrix(self.rows - 1, self.cols - 1, (minor_data, minor_col_indices, minor_row_ptr))
+            det += cofactor * minor_matrix._determinant_cofactor()
+        
+        return det
+
+    def _default_tol(self, exact):
+        """
+        Порог численного нуля: 0 для точных вычислений, иначе max(rows, cols) * eps * max|a|.
+        """
+        if exact or len(self.data) == 0:
+            return 0
+        return max(self.rows, self.cols) * sys.float_info.epsilon * max(abs(float(value)) for value in self.data)
+
+    def _is_exact(self):
+        """
+        Все элементы целые или дроби - вычисления можно вести точно.
+        """
+        return all(isinstance(value, (int, Fraction)) for value in self.data)
+
+    def structural_rank(self):
+        """
+        Структурный ранг - верхняя граница ранга, зависящая только от расположения ненулевых элементов.
+        """
+        return _structural_rank(self)
+
+    def _structurally_singular(self):
+        """
+        Быстрая проверка вырожденности по структуре: пустая строка или столбец за O(nnz),
+        затем наибольшее паросочетание строк и столбцов.
+        """
+        nonempty_cols = set()
+        for i in range(self.rows):
+            start, end = self.row_ptr[i], self.row_ptr[i + 1]
+            row_cols = [j for j, value in zip(self.col_indices[start:end], self.data[start:end]) if value != 0]
+            if not row_cols:
+                return True
+            nonempty_cols.update(row_cols)
+        if len(nonempty_cols) < self.cols:
+            return True
+        return _structural_rank(self) < self.rows
+
+    def rank(self, tol=None):
+        """
+        Ранг матрицы по разреженному исключению Гаусса.
+        :param tol: Порог, ниже которого элементы считаются нулями. По умолчанию - 0 для целых
+                    и дробных элементов, иначе max(rows, cols) * eps * max|a|.
+        :return: Ранг (int).
+        """
+        exact = self._is_exact()
+        if tol is None:
+            tol = self._default_tol(exact)
+        # Численный ранг не больше структурного: он ограничивает исключение сверху
+        structural = _structural_rank(self)
+        if structural == 0:
+            return 0
+        return _numeric_rank(self, tol, exact, limit=structural)
+
+    def is_invertible(self, tol=None, return_condition=False):
+        """
+        Проверяет, существует ли обратная матрица. Сначала за O(nnz) проверяется структура
+        (пустые строки и столбцы, структурный ранг): структурно вырожденная матрица необратима сразу.
+        Иначе выполняется исключение Гаусса в float, которое прекращается на первом столбце без ведущего элемента.
+        :param tol: Порог численного нуля. По умолчанию max(rows, cols) * eps * max|a| - и для целых элементов:
+                    точное исключение в дробях здесь не выполняется (для него есть rank и determinant).
+        :param return_condition: Вернуть также оценку числа обусловленности в норме 1.
+        :return: True, если матрица обратима, иначе False; при return_condition - пара (bool, оценка),
+                 для необратимой матрицы оценка равна inf.
+        """
+        if self.rows != self.cols:
+            raise ValueError("Обратимость определена только для квадратной матрицы.")
+
+        if self._structurally_singular():
+            return (False, math.inf) if return_condition else False
+        if tol is None:
+            tol = self._default_tol(False)
+        invertible = _numeric_rank(self, tol, False, stop_early=True) == self.rows
+
+        if not return_condition:
+            return invertible
+        return invertible, (self.condition_estimate() if invertible else math.inf)
+
+    def norm1(self):
+        """
+        Норма 1: наибольшая сумма модулей элементов столбца.
+        """
+        sums = [0.0] * self.cols
+        for j, value in zip(self.col_indices, self.data):
+            sums[j] += abs(float(value))
+        return max(sums)
+
+    def condition_estimate(self):
+        """
+        Оценка числа обусловленности ||A||_1 * ||A^-1||_1 без построения обратной матрицы.
+        :return: Оценка (float), inf для вырожденной матрицы.
+        """
+        factorization = self.factorize(method="lu", exact=False)
+        if factorization.singular:
+            return math.inf
+        return self.norm1() * factorization.inverse_norm_estimate()
+
+    def _is_symmetric(self):
+        """
+        Проверяет симметричность матрицы.
+        """
+        if self.rows != self.cols:
+            return False
+        entries = {}
+        for i in range(self.rows):
+            for k in range(self.row_ptr[i], self.row_ptr[i + 1]):
+                if self.data[k] != 0:
+                    entries[(i, self.col_indices[k])] = self.data[k]
+        return all(entries.get((j, i)) == value for (i, j), value in entries.items())
+
+    def factorize(self, method="auto", exact=False):
+        """
+        Разложение матрицы для многократного решения систем. Результат кешируется.
+        :param method: "lu", "cholesky" (симметричная положительно определенная матрица, L*D*L^T
+                       с хранением одного треугольника) или "auto" - Холецкий, если он применим, иначе LU.
+        :param exact: Считать точно в дробях Fraction (медленно; только для целых и дробных элементов).
+                      По умолчанию множители вычисляются в float и для целочисленной матрицы.
+        :return: Разложение (SparseFactorization).
+        """
+        if self.rows != self.cols:
+            raise ValueError("Разложение возможно только для квадратной матрицы.")
+        if method not in ("auto", "lu", "cholesky"):
+            raise ValueError("Неизвестный метод разложения: " + str(method))
+
+        key = (method, exact)
+        if key in self._factorizations:
+            return self._factorizations[key]
+
+        factorization = None
+        if method in ("auto", "cholesky") and self._is_symmetric():
+            factors = _sparse_ldlt(self, exact=exact)
+            if factors is not None:
+                factorization = SparseFactorization(self.rows, factors, exact, kind="cholesky")
+        if factorization is None:
+            if method == "cholesky":
+                raise ValueError("Разложение Холецкого требует симметричной положительно определенной матрицы.")
+            factorization = SparseFactorization(self.rows, _sparse_lu(self, exact=exact), exact, kind="lu")
+
+        self._factorizations[key] = factorization
+        return factorization
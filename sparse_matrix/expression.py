@@ -0,0 +1,309 @@
+"""
+Ленивые выражения над SparseMatrix.
+
+Операторы +, -, * (на скаляр), @ и .T у SparseMatrix не вычисляют результат сразу, а строят
+выражение. При вызове evaluate() выражение упрощается и вычисляется за минимальное число проходов:
+    - сумма любого числа слагаемых (с коэффициентами) считается одним вызовом
+      SparseMatrix.linear_combination, скаляры при слагаемых-матрицах и произведениях входят
+      в коэффициенты и отдельного прохода не требуют;
+    - скаляр при отдельном произведении применяется к множителю с наименьшим числом ненулевых элементов;
+    - цепочка произведений A1 @ A2 @ ... @ Ak перемножается в порядке, найденном динамическим
+      программированием (как в задаче о порядке перемножения матриц) по оценке числа операций
+      и заполнения разреженных множителей;
+    - транспонирование опускается до листьев (A @ B).T = B.T @ A.T, (A + B).T = A.T + B.T,
+      а транспонирование матрицы использует кеш CSC.
+"""
+import numbers
+
+from .core import SparseMatrix
+
+
+def as_expression(value):
+    """
+    Приводит матрицу или выражение к выражению.
+    """
+    if isinstance(value, Expression):
+        return value
+    if isinstance(value, SparseMatrix):
+        return Leaf(value)
+    raise TypeError("Ожидается SparseMatrix или выражение над ней.")
+
+
+class Expression:
+    """
+    Базовый класс ленивого выражения. Размеры известны без вычисления: rows, cols.
+    """
+
+    rows = 0
+    cols = 0
+
+    def __add__(self, other):
+        other = as_expression(other)
+        if (self.rows, self.cols) != (other.rows, other.cols):
+            raise ValueError("Матрицы должны иметь одинаковые размеры для сложения.")
+        return Sum(self._terms() + other._terms())
+
+    def __radd__(self, other):
+        # sum() начинает с нуля: число 0 - нейтральный элемент сложения
+        if isinstance(other, (int, float)) and other == 0:
+            return self
+        return self + other
+
+    def __sub__(self, other):
+        return self + (-1) * as_expression(other)
+
+    def __rsub__(self, other):
+        return as_expression(other) + (-1) * self
+
+    def __neg__(self):
+        return (-1) * self
+
+    def __mul__(self, scalar):
+        if not isinstance(scalar, numbers.Number):
+            return NotImplemented  # Матричное произведение - через @
+        return self._scaled(scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        if not isinstance(scalar, numbers.Number):
+            return NotImplemented
+        return self._scaled(1 / scalar)
+
+    def __matmul__(self, other):
+        other = as_expression(other)
+        if self.cols != other.rows:
+            raise ValueError("Число столбцов первой матрицы должно совпадать с числом строк второй.")
+        left, right = self._as_product(), other._as_product()
+        return Product(left.coefficient * right.coefficient, left.factors + right.factors)
+
+    def __rmatmul__(self, other):
+        return as_expression(other) @ self
+
+    @property
+    def T(self):
+        return self._transposed()
+
+    def _terms(self):
+        """
+        Слагаемые выражения как список пар (коэффициент, выражение без скаляра).
+        """
+        return [(1, self)]
+
+    def _scaled(self, scalar):
+        return Sum([(scalar * coefficient, term) for coefficient, term in self._terms()])
+
+    def _as_product(self):
+        return Product(1, [self])
+
+    def evaluate(self):
+        """
+        Вычисляет выражение.
+        :return: Матрица (SparseMatrix).
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.rows}x{self.cols}>"
+
+
+class Leaf(Expression):
+    """
+    Лист выражения - готовая матрица.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.rows, self.cols = matrix.rows, matrix.cols
+
+    def _transposed(self):
+        return Transpose(self)
+
+    def nnz(self):
+        return len(self.matrix.data)
+
+    def evaluate(self):
+        return self.matrix
+
+
+class Transpose(Expression):
+    """
+    Транспонированная матрица-лист (транспонирование составных выражений опускается к листьям).
+    """
+
+    def __init__(self, leaf):
+        self.leaf = leaf
+        self.rows, self.cols = leaf.cols, leaf.rows
+
+    def _transposed(self):
+        return self.leaf
+
+    def nnz(self):
+        return self.leaf.nnz()
+
+    def evaluate(self):
+        return self.leaf.matrix.transpose()
+
+
+class Sum(Expression):
+    """
+    Сумма слагаемых c1*E1 + c2*E2 + ...; одинаковые листья объединяются.
+    """
+
+    def __init__(self, terms):
+        merged = []
+        for coefficient, term in terms:
+            for index, (other_coefficient, other_term) in enumerate(merged):
+                if _same_leaf(term, other_term):
+                    merged[index] = (other_coefficient + coefficient, other_term)
+                    break
+            else:
+                merged.append((coefficient, term))
+        self.terms = [(coefficient, term) for coefficient, term in merged if coefficient != 0] or merged[:1]
+        self.rows, self.cols = terms[0][1].rows, terms[0][1].cols
+
+    def _terms(self):
+        return list(self.terms)
+
+    def _as_product(self):
+        if len(self.terms) == 1:
+            coefficient, term = self.terms[0]
+            product = term._as_product()
+            return Product(coefficient * product.coefficient, product.factors)
+        return Product(1, [self])
+
+    def _transposed(self):
+        return Sum([(coefficient, term._transposed()) for coefficient, term in self.terms])
+
+    def evaluate(self):
+        if len(self.terms) == 1:
+            coefficient, term = self.terms[0]
+            if isinstance(term, Product):
+                return Product(coefficient * term.coefficient, term.factors).evaluate()
+            matrix = term.evaluate()
+            return matrix if coefficient == 1 else matrix.multiply_scalar(coefficient)
+
+        # Скаляры при произведениях переходят в коэффициенты линейной комбинации
+        combination = []
+        for coefficient, term in self.terms:
+            if isinstance(term, Product):
+                combination.append((coefficient * term.coefficient, Product(1, term.factors).evaluate()))
+            else:
+                combination.append((coefficient, term.evaluate()))
+        return SparseMatrix.linear_combination(combination)
+
+
+class Product(Expression):
+    """
+    Цепочка произведений coefficient * F1 @ F2 @ ... @ Fk.
+    """
+
+    def __init__(self, coefficient, factors):
+        self.coefficient = coefficient
+        self.factors = factors
+        self.rows, self.cols = factors[0].rows, factors[-1].cols
+
+    def _terms(self):
+        if self.coefficient == 1:
+            return [(1, self)]
+        return [(self.coefficient, Product(1, self.factors))]
+
+    def _scaled(self, scalar):
+        return Product(scalar * self.coefficient, self.factors)
+
+    def _as_product(self):
+        return self
+
+    def _transposed(self):
+        return Product(self.coefficient, [factor._transposed() for factor in reversed(self.factors)])
+
+    def chain_order(self):
+        """
+        Оптимальная расстановка скобок в цепочке по оценке стоимости разреженных произведений.
+        :return: Вложенные кортежи номеров множителей, например ((0, 1), 2).
+        """
+        shapes = [(factor.rows, factor.cols) for factor in self.factors]
+        nnz = [_estimate_nnz(factor) for factor in self.factors]
+        return _chain_order(shapes, nnz)[2]
+
+    def evaluate(self):
+        matrices = [factor.evaluate() for factor in self.factors]
+        if self.coefficient != 1:
+            # Скаляр применяется к самому разреженному множителю - самый короткий проход
+            smallest = min(range(len(matrices)), key=lambda k: len(matrices[k].data))
+            matrices[smallest] = matrices[smallest].multiply_scalar(self.coefficient)
+        if len(matrices) == 1:
+            return matrices[0]
+        shapes = [(matrix.rows, matrix.cols) for matrix in matrices]
+        order = _chain_order(shapes, [len(matrix.data) for matrix in matrices])[2]
+        return _multiply_in_order(order, matrices)
+
+
+def _same_leaf(a, b):
+    """
+    Один и тот же лист (или одна и та же транспонированная матрица).
+    """
+    if isinstance(a, Leaf) and isinstance(b, Leaf):
+        return a.matrix is b.matrix
+    if isinstance(a, Transpose) and isinstance(b, Transpose):
+        return a.leaf.matrix is b.leaf.matrix
+    return False
+
+
+def _estimate_nnz(expression):
+    """
+    Оценка числа ненулевых элементов выражения без его вычисления.
+    """
+    if isinstance(expression, (Leaf, Transpose)):
+        return expression.nnz()
+    if isinstance(expression, Sum):
+        return min(expression.rows * expression.cols, sum(_estimate_nnz(term) for _, term in expression.terms))
+    shapes = [(factor.rows, factor.cols) for factor in expression.factors]
+    return _chain_order(shapes, [_estimate_nnz(factor) for factor in expression.factors])[1]
+
+
+def _product_estimate(shape_a, nnz_a, shape_b, nnz_b):
+    """
+    Оценка (число умножений, nnz результата) для произведения разреженных матриц
+    в предположении равномерного распределения ненулевых элементов.
+    """
+    rows, inner = shape_a
+    cols = shape_b[1]
+    if not rows or not inner or not cols:
+        return 0.0, 0.0
+    flops = nnz_a * nnz_b / inner
+    density = 1 - (1 - (nnz_a / (rows * inner)) * (nnz_b / (inner * cols))) ** inner
+    return flops, min(flops, density * rows * cols)
+
+
+def _chain_order(shapes, nnz):
+    """
+    Динамическое программирование по отрезкам цепочки: минимальная суммарная стоимость умножений.
+    :return: (стоимость, оценка nnz результата, расстановка скобок).
+    """
+    n = len(shapes)
+    best = {}
+    for i in range(n):
+        best[(i, i)] = (0.0, nnz[i], i)
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            j = i + length - 1
+            candidates = []
+            for split in range(i, j):
+                cost_left, nnz_left, order_left = best[(i, split)]
+                cost_right, nnz_right, order_right = best[(split + 1, j)]
+                flops, result_nnz = _product_estimate((shapes[i][0], shapes[split][1]), nnz_left,
+                                                      (shapes[split + 1][0], shapes[j][1]), nnz_right)
+                candidates.append((cost_left + cost_right + flops, result_nnz, (order_left, order_right)))
+            best[(i, j)] = min(candidates, key=lambda candidate: candidate[0])
+    return best[(0, n - 1)]
+
+
+def _multiply_in_order(order, matrices):
+    """
+    Перемножает матрицы согласно расстановке скобок.
+    """
+    if isinstance(order, int):
+        return matrices[order]
+    left, right = order
+    return _multiply_in_order(left, matrices).multiply_matrix(_multiply_in_order(right, matrices))
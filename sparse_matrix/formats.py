@@ -0,0 +1,515 @@
+"""
+Альтернативные форматы хранения разреженных матриц для структурированных шаблонов.
+
+DIAMatrix  - диагональный формат (DIA): ленточные матрицы хранятся по диагоналям без индексов столбцов;
+BSRMatrix  - блочный CSR (BSR): плотные блоки b x b с одним индексом столбца на блок
+             (матрицы жесткости МКЭ с несколькими степенями свободы в узле);
+SELLMatrix - sliced ELLPACK (SELL-C): строки группируются по slice_height, внутри группы
+             дополняются до самой длинной строки и хранятся по столбцам группы.
+
+Все форматы поддерживают интерфейс SparseMatrix: trace, get_element (нумерация с 1), add,
+multiply_scalar, multiply_matrix, matvec, determinant и is_invertible. Умножение на вектор,
+умножение на скаляр, след и доступ к элементу работают прямо по формату; операции, меняющие
+шаблон (сложение, умножение матриц) и разложения выполняются через CSR, а результат
+возвращается в формате левого операнда с теми же параметрами.
+
+optimize_format(matrix) оценивает объем данных, читаемых при умножении на вектор, для каждого
+формата и возвращает матрицу в самом выгодном из них (или исходную CSR-матрицу).
+"""
+import bisect
+import math
+import sys
+
+from .core import SparseMatrix, np, _index_dtype
+
+_VALUE_BYTES = 8
+_BSR_BLOCK_SIZES = (2, 3, 4, 6, 8)
+_SELL_SLICE_HEIGHT = 32
+
+
+def _to_csr(matrix):
+    return matrix if isinstance(matrix, SparseMatrix) else matrix.to_csr()
+
+
+def _csr_rows(matrix):
+    """
+    Строки CSR-матрицы как пары списков (столбцы, значения) в порядке возрастания столбцов.
+    """
+    matrix.sort_indices()
+    data, col_indices, row_ptr = matrix.data, matrix.col_indices, matrix.row_ptr
+    if matrix.storage == "array":
+        data, col_indices, row_ptr = data.tolist(), col_indices.tolist(), row_ptr.tolist()
+    for i in range(matrix.rows):
+        start, end = row_ptr[i], row_ptr[i + 1]
+        yield col_indices[start:end], data[start:end]
+
+
+class _Format:
+    """
+    Общая часть форматов: проверки, операции через CSR и оценка памяти.
+    """
+
+    rows = 0
+    cols = 0
+    storage = "list"
+
+    def _check_index(self, row, col):
+        if not (1 <= row <= self.rows and 1 <= col <= self.cols):
+            raise IndexError("Индексы строки или столбца вне допустимого диапазона.")
+
+    def _check_square(self):
+        if self.rows != self.cols:
+            raise ValueError("След можно считать только для квадратной матрицы.")
+
+    def _check_vector(self, x):
+        if len(x) != self.cols:
+            raise ValueError("Длина вектора должна совпадать с числом столбцов матрицы.")
+
+    def _values(self, values):
+        return np.asarray(values, dtype=np.float64) if self.storage == "array" else values
+
+    def _indices(self, values):
+        if self.storage == "array":
+            return np.asarray(values, dtype=_index_dtype(max(self.rows, self.cols, len(values)) + 1))
+        return values
+
+    def _like(self, matrix):
+        """
+        CSR-матрица, переведенная в формат self с теми же параметрами.
+        """
+        return self.from_csr(matrix, **self._params())
+
+    def _params(self):
+        return {}
+
+    def add(self, other):
+        """
+        Сложение с матрицей любого формата (через CSR).
+        :return: Сумма в формате self.
+        """
+        return self._like(self.to_csr().add(_to_csr(other)))
+
+    def multiply_matrix(self, other):
+        """
+        Умножение на матрицу любого формата (через CSR).
+        :return: Произведение в формате self.
+        """
+        return self._like(self.to_csr().multiply_matrix(_to_csr(other)))
+
+    def determinant(self, method="lu", exact=None):
+        return self.to_csr().determinant(method=method, exact=exact)
+
+    def is_invertible(self, tol=None, return_condition=False):
+        return self.to_csr().is_invertible(tol=tol, return_condition=return_condition)
+
+    def memory_usage(self):
+        """
+        Приблизительный объем памяти (в байтах), занимаемый массивами формата.
+        """
+        total = 0
+        for values in self._arrays():
+            if self.storage == "array":
+                total += values.nbytes
+            else:
+                total += sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+        return total
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.rows}x{self.cols}, storage={self.storage}>"
+
+
+class DIAMatrix(_Format):
+    """
+    Диагональный формат: data[d][i] = A[i][i + offsets[d]] (вне матрицы - дополнение нулями).
+    """
+
+    def __init__(self, rows, cols, offsets, data, storage="list"):
+        """
+        :param offsets: Упорядоченные по возрастанию смещения хранимых диагоналей (col - row).
+        :param data: Для каждой диагонали последовательность длины rows.
+        :param storage: "list" или "array" (как у SparseMatrix).
+        """
+        if len(offsets) != len(data) or any(len(values) != rows for values in data):
+            raise ValueError("Каждой диагонали должна соответствовать последовательность длины rows.")
+        self.rows, self.cols = rows, cols
+        self.storage = storage if np is not None else "list"
+        self.offsets = list(offsets)
+        self.data = self._values(data) if self.offsets else self._values([[0] * rows])[:0]
+        self._positions = {offset: d for d, offset in enumerate(self.offsets)}
+
+    @classmethod
+    def from_csr(cls, matrix):
+        offsets = sorted({col - i for i, (columns, _) in enumerate(_csr_rows(matrix)) for col in columns})
+        positions = {offset: d for d, offset in enumerate(offsets)}
+        data = [[0] * matrix.rows for _ in offsets]
+        for i, (columns, values) in enumerate(_csr_rows(matrix)):
+            for col, value in zip(columns, values):
+                data[positions[col - i]][i] = value
+        return cls(matrix.rows, matrix.cols, offsets, data, storage=matrix.storage)
+
+    def _arrays(self):
+        return [self.data] if self.storage == "array" else list(self.data)
+
+    def to_csr(self):
+        data, col_indices, row_ptr = [], [], [0]
+        for i in range(self.rows):
+            for d, offset in enumerate(self.offsets):
+                col = i + offset
+                if 0 <= col < self.cols and self.data[d][i] != 0:
+                    data.append(self.data[d][i])
+                    col_indices.append(col)
+            row_ptr.append(len(data))
+        return SparseMatrix(self.rows, self.cols, (data, col_indices, row_ptr), storage=self.storage,
+                            sorted_indices=True)
+
+    def get_element(self, row, col):
+        self._check_index(row, col)
+        d = self._positions.get(col - row)
+        if d is None:
+            return 0
+        value = self.data[d][row - 1]
+        return float(value) if self.storage == "array" else value
+
+    def trace(self):
+        self._check_square()
+        d = self._positions.get(0)
+        if d is None:
+            return 0
+        return float(self.data[d].sum()) if self.storage == "array" else sum(self.data[d])
+
+    def multiply_scalar(self, scalar):
+        if self.storage == "array":
+            return DIAMatrix(self.rows, self.cols, self.offsets, self.data * scalar, storage="array")
+        return DIAMatrix(self.rows, self.cols, self.offsets, [[value * scalar for value in values]
+                                                              for values in self.data])
+
+    def add(self, other):
+        """
+        Сложение; для двух DIA-матриц - прямо по диагоналям (объединение смещений).
+        """
+        if not isinstance(other, DIAMatrix):
+            return super().add(other)
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Матрицы должны иметь одинаковые размеры для сложения.")
+        offsets = sorted(set(self.offsets) | set(other.offsets))
+        data = []
+        for offset in offsets:
+            mine, theirs = self._positions.get(offset), other._positions.get(offset)
+            if mine is None:
+                data.append(list(other.data[theirs]))
+            elif theirs is None:
+                data.append(list(self.data[mine]))
+            else:
+                data.append([a + b for a, b in zip(self.data[mine], other.data[theirs])])
+        storage = "array" if "array" in (self.storage, other.storage) else "list"
+        return DIAMatrix(self.rows, self.cols, offsets, data, storage=storage)
+
+    def matvec(self, x):
+        """
+        Умножение на вектор: по каждой диагонали - один непрерывный проход без индексов.
+        """
+        self._check_vector(x)
+        if self.storage == "array":
+            x = np.asarray(x, dtype=np.float64)
+            y = np.zeros(self.rows)
+            for values, offset in zip(self.data, self.offsets):
+                start, end = max(0, -offset), min(self.rows, self.cols - offset)
+                if end > start:
+                    y[start:end] += values[start:end] * x[start + offset:end + offset]
+            return y
+        y = [0] * self.rows
+        for values, offset in zip(self.data, self.offsets):
+            for i in range(max(0, -offset), min(self.rows, self.cols - offset)):
+                y[i] += values[i] * x[i + offset]
+        return y
+
+
+class BSRMatrix(_Format):
+    """
+    Блочный CSR: ненулевые блоки b x b (построчно) с индексами блочных столбцов.
+    Последние блочные строка и столбец дополняются нулями, если размер не кратен b.
+    """
+
+    def __init__(self, rows, cols, block_size, blocks, block_cols, block_row_ptr, storage="list"):
+        """
+        :param block_size: Размер блока b.
+        :param blocks: Значения блоков, по b*b подряд для каждого блока (построчно внутри блока).
+        :param block_cols: Номер блочного столбца для каждого блока (с 0, упорядочены в блочной строке).
+        :param block_row_ptr: Указатели на начало блочных строк (ceil(rows / b) + 1 элементов).
+        """
+        if len(block_row_ptr) != math.ceil(rows / block_size) + 1 or len(blocks) != len(block_cols) * block_size ** 2:
+            raise ValueError("Некорректная BSR-структура.")
+        self.rows, self.cols = rows, cols
+        self.storage = storage if np is not None else "list"
+        self.block_size = block_size
+        self.blocks = self._values(blocks)
+        self.block_cols = self._indices(block_cols)
+        self.block_row_ptr = self._indices(block_row_ptr)
+
+    @classmethod
+    def from_csr(cls, matrix, block_size=2):
+        b = block_size
+        blocks, block_cols, block_row_ptr = [], [], [0]
+        csr_rows = list(_csr_rows(matrix))
+        for block_row in range(math.ceil(matrix.rows / b)):
+            row_blocks = {}
+            for r, (columns, values) in enumerate(csr_rows[block_row * b:(block_row + 1) * b]):
+                for col, value in zip(columns, values):
+                    block = row_blocks.get(col // b)
+                    if block is None:
+                        block = row_blocks[col // b] = [0] * (b * b)
+                    block[r * b + col % b] = value
+            for block_col in sorted(row_blocks):
+                block_cols.append(block_col)
+                blocks.extend(row_blocks[block_col])
+            block_row_ptr.append(len(block_cols))
+        return cls(matrix.rows, matrix.cols, b, blocks, block_cols, block_row_ptr, storage=matrix.storage)
+
+    def _params(self):
+        return {"block_size": self.block_size}
+
+    def _arrays(self):
+        return [self.blocks, self.block_cols, self.block_row_ptr]
+
+    def _block_rows(self):
+        """
+        Пары (блочная строка, номер блока) по всем хранимым блокам.
+        """
+        for block_row in range(len(self.block_row_ptr) - 1):
+            for k in range(self.block_row_ptr[block_row], self.block_row_ptr[block_row + 1]):
+                yield block_row, k
+
+    def to_csr(self):
+        b = self.block_size
+        rows = [{} for _ in range(self.rows)]
+        for block_row, k in self._block_rows():
+            for r in range(b):
+                i = block_row * b + r
+                if i >= self.rows:
+                    break
+                for c in range(b):
+                    value = self.blocks[k * b * b + r * b + c]
+                    if value != 0:
+                        rows[i][self.block_cols[k] * b + c] = value
+        data, col_indices, row_ptr = [], [], [0]
+        for entries in rows:
+            for col in sorted(entries):
+                col_indices.append(int(col))
+                data.append(entries[col])
+            row_ptr.append(len(data))
+        return SparseMatrix(self.rows, self.cols, (data, col_indices, row_ptr), storage=self.storage,
+                            sorted_indices=True)
+
+    def get_element(self, row, col):
+        self._check_index(row, col)
+        b = self.block_size
+        block_row, block_col = (row - 1) // b, (col - 1) // b
+        start, end = int(self.block_row_ptr[block_row]), int(self.block_row_ptr[block_row + 1])
+        k = bisect.bisect_left(self.block_cols, block_col, start, end)
+        if k < end and self.block_cols[k] == block_col:
+            value = self.blocks[k * b * b + (row - 1) % b * b + (col - 1) % b]
+            return float(value) if self.storage == "array" else value
+        return 0
+
+    def trace(self):
+        self._check_square()
+        b = self.block_size
+        total = 0
+        for block_row, k in self._block_rows():
+            if self.block_cols[k] == block_row:
+                size = min(b, self.rows - block_row * b)
+                total += sum(self.blocks[k * b * b + r * (b + 1)] for r in range(size))
+        return float(total) if self.storage == "array" else total
+
+    def multiply_scalar(self, scalar):
+        blocks = self.blocks * scalar if self.storage == "array" else [value * scalar for value in self.blocks]
+        return BSRMatrix(self.rows, self.cols, self.block_size, blocks, self.block_cols, self.block_row_ptr,
+                         storage=self.storage)
+
+    def matvec(self, x):
+        """
+        Умножение на вектор: плотное произведение блока на отрезок x, один индекс на блок.
+        """
+        self._check_vector(x)
+        b = self.block_size
+        block_rows = len(self.block_row_ptr) - 1
+        if self.storage == "array":
+            padded = np.zeros(math.ceil(self.cols / b) * b)
+            padded[:self.cols] = x
+            products = np.einsum("kij,kj->ki", self.blocks.reshape(-1, b, b), padded.reshape(-1, b)[self.block_cols])
+            y = np.zeros((block_rows, b))
+            starts = self.block_row_ptr[:-1]
+            nonempty = self.block_row_ptr[1:] > starts
+            if len(products):
+                y[nonempty] = np.add.reduceat(products, starts[nonempty], axis=0)
+            return y.reshape(-1)[:self.rows]
+        y = [0] * (block_rows * b)
+        for block_row, k in self._block_rows():
+            base = k * b * b
+            offset = self.block_cols[k] * b
+            for r in range(b):
+                total = 0
+                for c in range(b):
+                    if offset + c < self.cols:
+                        total += self.blocks[base + r * b + c] * x[offset + c]
+                y[block_row * b + r] += total
+        return y[:self.rows]
+
+
+class SELLMatrix(_Format):
+    """
+    Sliced ELLPACK (SELL-C): группы по slice_height строк, в группе строки дополнены до самой длинной
+    и хранятся по столбцам группы: элемент k строки r группы s лежит в slice_ptr[s] + k*C + r.
+    Дополнение - значение 0 со столбцом cols.
+    """
+
+    def __init__(self, rows, cols, slice_height, data, col_indices, slice_ptr, storage="list"):
+        if len(slice_ptr) != math.ceil(rows / slice_height) + 1 or len(data) != len(col_indices):
+            raise ValueError("Некорректная SELL-структура.")
+        self.rows, self.cols = rows, cols
+        self.storage = storage if np is not None else "list"
+        self.slice_height = slice_height
+        self.data = self._values(data)
+        self.col_indices = self._indices(col_indices)
+        self.slice_ptr = self._indices(slice_ptr)
+        self._slot_rows = None  # Номер строки для каждой ячейки (NumPy), строится при первом matvec
+
+    @classmethod
+    def from_csr(cls, matrix, slice_height=_SELL_SLICE_HEIGHT):
+        height = slice_height
+        csr_rows = list(_csr_rows(matrix))
+        data, col_indices, slice_ptr = [], [], [0]
+        for start in range(0, matrix.rows, height):
+            group = csr_rows[start:start + height]
+            width = max(len(columns) for columns, _ in group)
+            for k in range(width):
+                for r in range(height):
+                    columns, values = group[r] if r < len(group) else ((), ())
+                    if k < len(columns):
+                        col_indices.append(columns[k])
+                        data.append(values[k])
+                    else:
+                        col_indices.append(matrix.cols)
+                        data.append(0)
+            slice_ptr.append(len(data))
+        return cls(matrix.rows, matrix.cols, height, data, col_indices, slice_ptr, storage=matrix.storage)
+
+    def _params(self):
+        return {"slice_height": self.slice_height}
+
+    def _arrays(self):
+        return [self.data, self.col_indices, self.slice_ptr]
+
+    def _row_entries(self, i):
+        """
+        Хранимые элементы строки i (с 0) как пары (столбец, значение), без дополнения.
+        """
+        s, r = divmod(i, self.slice_height)
+        for slot in range(int(self.slice_ptr[s]) + r, int(self.slice_ptr[s + 1]), self.slice_height):
+            col = self.col_indices[slot]
+            if col == self.cols:
+                break
+            yield col, self.data[slot]
+
+    def to_csr(self):
+        data, col_indices, row_ptr = [], [], [0]
+        for i in range(self.rows):
+            for col, value in self._row_entries(i):
+                if value != 0:
+                    col_indices.append(int(col))
+                    data.append(value)
+            row_ptr.append(len(data))
+        return SparseMatrix(self.rows, self.cols, (data, col_indices, row_ptr), storage=self.storage,
+                            sorted_indices=True)
+
+    def get_element(self, row, col):
+        self._check_index(row, col)
+        for stored_col, value in self._row_entries(row - 1):
+            if stored_col == col - 1:
+                return float(value) if self.storage == "array" else value
+            if stored_col > col - 1:
+                break
+        return 0
+
+    def trace(self):
+        self._check_square()
+        return sum(self.get_element(i, i) for i in range(1, self.rows + 1))
+
+    def multiply_scalar(self, scalar):
+        data = self.data * scalar if self.storage == "array" else [value * scalar for value in self.data]
+        return SELLMatrix(self.rows, self.cols, self.slice_height, data, self.col_indices, self.slice_ptr,
+                          storage=self.storage)
+
+    def matvec(self, x):
+        """
+        Умножение на вектор: ячейки группы читаются подряд, дополнение умножается на нулевой
+        элемент за концом x.
+        """
+        self._check_vector(x)
+        height = self.slice_height
+        if self.storage == "array":
+            if self._slot_rows is None:
+                widths = np.diff(self.slice_ptr) // height
+                slot_rows = np.concatenate([np.tile(np.arange(s * height, (s + 1) * height), width)
+                                            for s, width in enumerate(widths.tolist())] or [np.zeros(0, int)])
+                self._slot_rows = np.minimum(slot_rows, self.rows - 1)  # Дополнение последней группы
+            extended = np.append(np.asarray(x, dtype=np.float64), 0.0)
+            return np.bincount(self._slot_rows, weights=self.data * extended[self.col_indices],
+                               minlength=self.rows)
+        extended = list(x) + [0]
+        y = [0] * (len(self.slice_ptr) - 1) * height
+        for s in range(len(self.slice_ptr) - 1):
+            base = s * height
+            for slot in range(self.slice_ptr[s], self.slice_ptr[s + 1]):
+                y[base + (slot - self.slice_ptr[s]) % height] += self.data[slot] * extended[self.col_indices[slot]]
+        return y[:self.rows]
+
+
+def spmv_costs(matrix):
+    """
+    Оценка объема данных (в байтах), читаемых при умножении на вектор, для каждого формата.
+    :param matrix: Матрица (SparseMatrix).
+    :return: Словарь: "csr", "dia", "sell", "bsr<b>" -> байты.
+    """
+    rows, cols = matrix.rows, matrix.cols
+    index_bytes = np.dtype(_index_dtype(max(rows, cols, len(matrix.data)))).itemsize if np is not None else 8
+    nnz = 0
+    offsets = set()
+    blocks = {b: set() for b in _BSR_BLOCK_SIZES if b <= min(rows, cols)}
+    lengths = []
+    for i, (columns, _) in enumerate(_csr_rows(matrix)):
+        nnz += len(columns)
+        lengths.append(len(columns))
+        for col in columns:
+            offsets.add(col - i)
+        for b, seen in blocks.items():
+            seen.update((i // b, col // b) for col in columns)
+
+    costs = {
+        "csr": nnz * (_VALUE_BYTES + index_bytes) + (rows + 1) * index_bytes,
+        "dia": len(offsets) * (rows * _VALUE_BYTES + index_bytes),
+    }
+    height = _SELL_SLICE_HEIGHT
+    slots = sum(max(lengths[start:start + height]) * height for start in range(0, rows, height))
+    costs["sell"] = slots * (_VALUE_BYTES + index_bytes) + (math.ceil(rows / height) + 1) * index_bytes
+    for b, seen in blocks.items():
+        costs[f"bsr{b}"] = len(seen) * (b * b * _VALUE_BYTES + index_bytes) + (math.ceil(rows / b) + 1) * index_bytes
+    return costs
+
+
+def optimize_format(matrix):
+    """
+    Переводит матрицу в формат с наименьшим объемом данных для умножения на вектор (см. spmv_costs).
+    При равенстве остается CSR.
+    :param matrix: Матрица (SparseMatrix).
+    :return: SparseMatrix, DIAMatrix, BSRMatrix или SELLMatrix.
+    """
+    costs = spmv_costs(matrix)
+    best = min(costs, key=lambda name: (costs[name], name != "csr"))
+    if best == "csr":
+        return matrix
+    if best == "dia":
+        return DIAMatrix.from_csr(matrix)
+    if best == "sell":
+        return SELLMatrix.from_csr(matrix)
+    return BSRMatrix.from_csr(matrix, block_size=int(best[3:]))
@@ -0,0 +1,344 @@
+"""
+Итерационные (крыловские) методы решения систем A*x = b для SparseMatrix.
+
+cg       - метод сопряженных градиентов для симметричных положительно определенных матриц;
+bicgstab - стабилизированный метод бисопряженных градиентов для несимметричных матриц;
+gmres    - обобщенный метод минимальных невязок с перезапуском.
+
+Все методы используют только SparseMatrix.matvec, поэтому память - O(nnz + n) (для gmres - O(nnz + n*restart)).
+Предобуславливатели (JacobiPreconditioner, ILU0Preconditioner) применяются справа методом apply(r).
+Каждый метод возвращает пару (x, info), где info - словарь с ключами converged, iterations и residual
+(норма невязки в конце работы).
+"""
+import math
+import sys
+
+from .core import np
+
+
+# Векторные операции: массивы NumPy, если он установлен, иначе списки
+
+def _vector(values):
+    if np is not None:
+        return np.array(values, dtype=np.float64)
+    return [float(value) for value in values]
+
+
+def _zeros(n):
+    return np.zeros(n) if np is not None else [0.0] * n
+
+
+def _dot(u, v):
+    if np is not None:
+        return float(np.dot(u, v))
+    return math.fsum(a * b for a, b in zip(u, v))
+
+
+def _norm(u):
+    return math.sqrt(_dot(u, u))
+
+
+def _axpy(alpha, x, y):
+    """
+    alpha*x + y (новый вектор).
+    """
+    if np is not None:
+        return alpha * x + y
+    return [alpha * a + b for a, b in zip(x, y)]
+
+
+def _scale(alpha, x):
+    if np is not None:
+        return alpha * x
+    return [alpha * a for a in x]
+
+
+def _sub(x, y):
+    if np is not None:
+        return x - y
+    return [a - b for a, b in zip(x, y)]
+
+
+class JacobiPreconditioner:
+    """
+    Предобуславливатель Якоби: M = diag(A).
+    """
+
+    def __init__(self, matrix):
+        """
+        :param matrix: Квадратная матрица (SparseMatrix) без нулей на диагонали.
+        """
+        diagonal = [float(value) for value in matrix.diagonal()]
+        if any(value == 0 for value in diagonal):
+            raise ValueError("Предобуславливатель Якоби требует ненулевой диагонали.")
+        self.inverse_diagonal = _vector([1.0 / value for value in diagonal])
+
+    def apply(self, r):
+        """
+        M^-1 * r.
+        """
+        if np is not None:
+            return self.inverse_diagonal * r
+        return [d * value for d, value in zip(self.inverse_diagonal, r)]
+
+
+class ILU0Preconditioner:
+    """
+    Неполное LU-разложение без заполнения ILU(0): L и U имеют тот же шаблон, что и A.
+    """
+
+    def __init__(self, matrix):
+        """
+        :param matrix: Квадратная матрица (SparseMatrix) с ненулевой диагональю.
+        """
+        if matrix.rows != matrix.cols:
+            raise ValueError("ILU(0) строится только для квадратной матрицы.")
+        matrix.sort_indices()
+        n = matrix.rows
+        rows = []
+        for i in range(n):
+            start, end = matrix.row_ptr[i], matrix.row_ptr[i + 1]
+            rows.append({int(j): float(value) for j, value in zip(matrix.col_indices[start:end], matrix.data[start:end])})
+
+        # Алгоритм IKJ: исключение только внутри шаблона строки
+        for i in range(n):
+            row = rows[i]
+            for k in sorted(j for j in row if j < i):
+                pivot = rows[k].get(k, 0.0)
+                if pivot == 0:
+                    raise ValueError("ILU(0): нулевой ведущий элемент в строке " + str(k + 1) + ".")
+                factor = row[k] / pivot
+                row[k] = factor
+                for j, value in rows[k].items():
+                    if j > k and j in row:
+                        row[j] -= factor * value
+            if row.get(i, 0.0) == 0:
+                raise ValueError("ILU(0): нулевой ведущий элемент в строке " + str(i + 1) + ".")
+
+        self.size = n
+        self.lower = [sorted((j, v) for j, v in row.items() if j < i) for i, row in enumerate(rows)]
+        self.upper = [sorted((j, v) for j, v in row.items() if j > i) for i, row in enumerate(rows)]
+        self.diagonal = [row[i] for i, row in enumerate(rows)]
+
+    def apply(self, r):
+        """
+        (L*U)^-1 * r: прямой ход с единичной L и обратный ход с U.
+        """
+        n = self.size
+        y = [0.0] * n
+        for i in range(n):
+            value = float(r[i])
+            for j, l_value in self.lower[i]:
+                value -= l_value * y[j]
+            y[i] = value
+        x = [0.0] * n
+        for i in range(n - 1, -1, -1):
+            value = y[i]
+            for j, u_value in self.upper[i]:
+                value -= u_value * x[j]
+            x[i] = value / self.diagonal[i]
+        return _vector(x)
+
+
+def _prepare(matrix, b, x0):
+    """
+    Проверка размеров и начальное приближение.
+    """
+    if matrix.rows != matrix.cols:
+        raise ValueError("Итерационные методы требуют квадратной матрицы.")
+    if len(b) != matrix.rows:
+        raise ValueError("Длина правой части должна совпадать с порядком матрицы.")
+    b = _vector(b)
+    x = _vector(x0) if x0 is not None else _zeros(matrix.rows)
+    return b, x
+
+
+def _identity(r):
+    return r
+
+
+def cg(matrix, b, x0=None, tol=1e-8, maxiter=None, preconditioner=None, callback=None):
+    """
+    Метод сопряженных градиентов (с предобуславливанием).
+    :param matrix: Симметричная положительно определенная матрица (SparseMatrix).
+    :param b: Правая часть.
+    :param x0: Начальное приближение (по умолчанию - нулевой вектор).
+    :param tol: Относительная точность: ||b - A*x|| <= tol * ||b||.
+    :param maxiter: Наибольшее число итераций (по умолчанию - 10 * n).
+    :param preconditioner: Предобуславливатель с методом apply(r) (например, JacobiPreconditioner).
+    :param callback: Функция callback(iteration, residual_norm), вызывается после каждой итерации.
+    :return: (x, info).
+    """
+    b, x = _prepare(matrix, b, x0)
+    maxiter = maxiter if maxiter is not None else 10 * matrix.rows
+    apply = preconditioner.apply if preconditioner is not None else _identity
+    threshold = tol * (_norm(b) or 1.0)
+
+    r = _sub(b, matrix.matvec(x))
+    residual = _norm(r)
+    if residual <= threshold:
+        return x, {"converged": True, "iterations": 0, "residual": residual}
+    z = apply(r)
+    p = z
+    rz = _dot(r, z)
+    for iteration in range(1, maxiter + 1):
+        ap = matrix.matvec(p)
+        curvature = _dot(p, ap)
+        if curvature <= 0:
+            raise ValueError("Матрица не является положительно определенной.")
+        alpha = rz / curvature
+        x = _axpy(alpha, p, x)
+        r = _axpy(-alpha, ap, r)
+        residual = _norm(r)
+        if callback is not None:
+            callback(iteration, residual)
+        if residual <= threshold:
+            return x, {"converged": True, "iterations": iteration, "residual": residual}
+        z = apply(r)
+        rz_new = _dot(r, z)
+        p = _axpy(rz_new / rz, p, z)
+        rz = rz_new
+    return x, {"converged": False, "iterations": maxiter, "residual": residual}
+
+
+def bicgstab(matrix, b, x0=None, tol=1e-8, maxiter=None, preconditioner=None, callback=None):
+    """
+    Стабилизированный метод бисопряженных градиентов (с правым предобуславливанием).
+    Параметры и результат - как у cg.
+    """
+    b, x = _prepare(matrix, b, x0)
+    maxiter = maxiter if maxiter is not None else 10 * matrix.rows
+    apply = preconditioner.apply if preconditioner is not None else _identity
+    threshold = tol * (_norm(b) or 1.0)
+
+    r = _sub(b, matrix.matvec(x))
+    residual = _norm(r)
+    if residual <= threshold:
+        return x, {"converged": True, "iterations": 0, "residual": residual}
+    r_hat = r
+    rho = alpha = omega = 1.0
+    v = p = _zeros(matrix.rows)
+    iteration = 0
+    for iteration in range(1, maxiter + 1):
+        rho_new = _dot(r_hat, r)
+        if rho_new == 0:
+            break  # Вырождение метода
+        beta = (rho_new / rho) * (alpha / omega)
+        p = _axpy(beta, _axpy(-omega, v, p), r)
+        p_hat = apply(p)
+        v = matrix.matvec(p_hat)
+        r_hat_v = _dot(r_hat, v)
+        if r_hat_v == 0:
+            break  # Вырождение: r_hat ортогонален A*p
+        alpha = rho_new / r_hat_v
+        s = _axpy(-alpha, v, r)
+        if _norm(s) <= threshold:
+            x = _axpy(alpha, p_hat, x)
+            residual = _norm(s)
+            if callback is not None:
+                callback(iteration, residual)
+            return x, {"converged": True, "iterations": iteration, "residual": residual}
+        s_hat = apply(s)
+        t = matrix.matvec(s_hat)
+        t_t = _dot(t, t)
+        if t_t == 0:
+            # Вырождение: A*s_hat = 0, сохраняем только первый полушаг
+            x = _axpy(alpha, p_hat, x)
+            residual = _norm(s)
+            break
+        omega = _dot(t, s) / t_t
+        x = _axpy(omega, s_hat, _axpy(alpha, p_hat, x))
+        r = _axpy(-omega, t, s)
+        residual = _norm(r)
+        rho = rho_new
+        if callback is not None:
+            callback(iteration, residual)
+        if residual <= threshold:
+            return x, {"converged": True, "iterations": iteration, "residual": residual}
+        if omega == 0:
+            break
+    return x, {"converged": False, "iterations": iteration, "residual": residual}
+
+
+def gmres(matrix, b, x0=None, tol=1e-8, restart=30, maxiter=None, preconditioner=None, callback=None):
+    """
+    GMRES с перезапуском через restart итераций (с правым предобуславливанием).
+    :param restart: Размерность подпространства Крылова до перезапуска.
+    Остальные параметры и результат - как у cg; maxiter считает все внутренние итерации.
+    """
+    b, x = _prepare(matrix, b, x0)
+    n = matrix.rows
+    maxiter = maxiter if maxiter is not None else 10 * n
+    restart = max(1, min(restart, n))
+    apply = preconditioner.apply if preconditioner is not None else _identity
+    threshold = tol * (_norm(b) or 1.0)
+
+    iteration = 0
+    residual = _norm(_sub(b, matrix.matvec(x)))
+    while iteration < maxiter:
+        r = _sub(b, matrix.matvec(x))
+        beta = _norm(r)
+        residual = beta
+        if beta <= threshold:
+            return x, {"converged": True, "iterations": iteration, "residual": beta}
+
+        basis = [_scale(1.0 / beta, r)]
+        hessenberg = []   # Столбцы матрицы Хессенберга после вращений Гивенса
+        cosines, sines = [], []
+        g = [beta]
+        for j in range(restart):
+            iteration += 1
+            # Арнольди с модифицированным ортогонализацией Грама-Шмидта
+            w = matrix.matvec(apply(basis[j]))
+            column = []
+            for i in range(j + 1):
+                h = _dot(w, basis[i])
+                w = _axpy(-h, basis[i], w)
+                column.append(h)
+            h_next = _norm(w)
+
+            # Применяем накопленные вращения и строим новое
+            for i in range(j):
+                column[i], column[i + 1] = (cosines[i] * column[i] + sines[i] * column[i + 1],
+                                            -sines[i] * column[i] + cosines[i] * column[i + 1])
+            denominator = math.hypot(column[j], h_next)
+            cosine, sine = (1.0, 0.0) if denominator == 0 else (column[j] / denominator, h_next / denominator)
+            cosines.append(cosine)
+            sines.append(sine)
+            column[j] = cosine * column[j] + sine * h_next
+            g.append(-sine * g[j])
+            g[j] = cosine * g[j]
+            hessenberg.append(column)
+
+            residual = abs(g[j + 1])
+            if callback is not None:
+                callback(iteration, residual)
+            if residual <= threshold or h_next == 0 or iteration >= maxiter:
+                break
+            basis.append(_scale(1.0 / h_next, w))
+
+        # Обратный ход для верхнетреугольной системы H*y = g. Нулевой диагональный элемент после
+        # вращений означает вырождение A на подпространстве Крылова: базис усекается до последнего
+        # невырожденного столбца, а сходимость определяется по истинной невязке
+        tiny = sys.float_info.epsilon * max(abs(value) for column in hessenberg for value in column)
+        k = 0
+        while k < len(hessenberg) and abs(hessenberg[k][k]) > tiny:
+            k += 1
+        breakdown = k < len(hessenberg)
+        y = [0.0] * k
+        for i in range(k - 1, -1, -1):
+            value = g[i]
+            for m in range(i + 1, k):
+                value -= hessenberg[m][i] * y[m]
+            y[i] = value / hessenberg[i][i]
+        update = _zeros(n)
+        for i in range(k):
+            update = _axpy(y[i], basis[i], update)
+        x = _axpy(1.0, apply(update), x)
+
+        if residual <= threshold or breakdown:
+            # Оценка g[k] может расходиться с истинной невязкой из-за округлений: перепроверяем
+            residual = _norm(_sub(b, matrix.matvec(x)))
+            if residual <= threshold or breakdown:
+                return x, {"converged": residual <= threshold, "iterations": iteration, "residual": residual}
+    return x, {"converged": False, "iterations": iteration, "residual": residual}
@@ -0,0 +1,285 @@
+"""
+Многопоточное и многопроцессное выполнение операций SparseMatrix по блокам строк.
+
+Строки делятся на непрерывные блоки с примерно одинаковым числом ненулевых элементов (по row_ptr),
+каждый блок обрабатывается отдельно, а результаты записываются в заранее выделенные массивы
+одной CSR-матрицы. Пулы потоков и процессов создаются один раз и переиспользуются между вызовами.
+Для хранения в массивах NumPy используются потоки: ядра NumPy отпускают GIL, а блоки строк
+являются представлениями общих массивов без копирования. Процессы по умолчанию используются для
+хранения в списках: блок строк и второй операнд передаются процессу сериализованными. Матрицы
+в массивах NumPy передаются процессам через общую память (multiprocessing.shared_memory).
+
+Кривую масштабирования на конкретной машине печатает bench_sparse_matrix.py (функция bench_parallel).
+"""
+import bisect
+import itertools
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+from .core import SparseMatrix, _index_dtype, np
+
+_pools = {}  # (backend, workers) -> пул, переиспользуемый между вызовами
+_pools_lock = threading.Lock()
+
+
+def _pool(backend, workers):
+    """
+    Пул потоков или процессов на workers исполнителей (создается при первом обращении).
+    """
+    with _pools_lock:
+        pool = _pools.get((backend, workers))
+        if pool is None:
+            executor = ThreadPoolExecutor if backend == "thread" else ProcessPoolExecutor
+            pool = _pools[(backend, workers)] = executor(max_workers=workers)
+        return pool
+
+
+def shutdown():
+    """
+    Останавливает переиспользуемые пулы (при завершении интерпретатора это происходит само).
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def partition_rows(matrix, parts):
+    """
+    Делит строки на не более чем parts непрерывных блоков с близким числом ненулевых элементов.
+    :param matrix: Матрица (SparseMatrix).
+    :param parts: Желаемое число блоков.
+    :return: Список пар (первая строка, строка после последней).
+    """
+    row_ptr = matrix.row_ptr
+    nnz = int(row_ptr[matrix.rows])
+    bounds = [0]
+    for part in range(1, parts):
+        target = nnz * part // parts
+        row = bisect.bisect_left(row_ptr, target, bounds[-1], matrix.rows)
+        bounds.append(max(row, bounds[-1]))
+    bounds.append(matrix.rows)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def row_block(matrix, start, end):
+    """
+    Строки [start, end) матрицы как отдельная матрица (см. SparseMatrix.row_slice).
+    """
+    return matrix.row_slice(start, end)
+
+
+def _stitch(pieces, cols, storage):
+    """
+    Склеивает блоки строк в одну матрицу. Размеры результата известны по nnz блоков, поэтому
+    массивы выделяются один раз, а блоки (для массивов NumPy - параллельно) копируются в свои срезы.
+    """
+    rows = sum(piece.rows for piece in pieces)
+    is_sorted = all(piece._sorted for piece in pieces) or None
+    offsets = list(itertools.accumulate((len(piece.data) for piece in pieces), initial=0))
+    row_starts = list(itertools.accumulate((piece.rows for piece in pieces), initial=0))
+    nnz = offsets[-1]
+    if storage == "array":
+        index_dtype = _index_dtype(max(cols, nnz))
+        data = np.empty(nnz, dtype=np.float64)
+        col_indices = np.empty(nnz, dtype=index_dtype)
+        row_ptr = np.empty(rows + 1, dtype=index_dtype)
+        row_ptr[0] = 0
+
+        def fill(k):
+            piece, offset, start = pieces[k], offsets[k], row_starts[k]
+            data[offset:offsets[k + 1]] = piece.data
+            col_indices[offset:offsets[k + 1]] = piece.col_indices
+            np.add(piece.row_ptr[1:], offset, out=row_ptr[start + 1:row_starts[k + 1] + 1])
+
+        list(_pool("thread", len(pieces)).map(fill, range(len(pieces))))
+        return SparseMatrix(rows, cols, (data, col_indices, row_ptr), storage="array", sorted_indices=is_sorted)
+
+    data, col_indices, row_ptr = [0] * nnz, [0] * nnz, [0] * (rows + 1)
+    for piece, offset, start in zip(pieces, offsets, row_starts):
+        data[offset:offset + len(piece.data)] = piece.data
+        col_indices[offset:offset + len(piece.data)] = piece.col_indices
+        row_ptr[start + 1:start + piece.rows + 1] = [p + offset for p in piece.row_ptr[1:]]
+    return SparseMatrix(rows, cols, (data, col_indices, row_ptr), sorted_indices=is_sorted)
+
+
+def _share(matrix, segments):
+    """
+    Копирует CSR-массивы матрицы в сегмент общей памяти (добавляется в segments).
+    :return: Описание для процесса-обработчика (см. _attach).
+    """
+    arrays = (matrix.data, matrix.col_indices, matrix.row_ptr)
+    layout, size = [], 0
+    for values in arrays:
+        size += -size % values.itemsize
+        layout.append((values.dtype.str, size, len(values)))
+        size += values.nbytes
+    segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    segments.append(segment)
+    for values, (dtype, offset, length) in zip(arrays, layout):
+        np.ndarray(length, dtype=dtype, buffer=segment.buf, offset=offset)[:] = values
+    return segment.name, layout, matrix.rows, matrix.cols, matrix._sorted
+
+
+def _attach(description, segments):
+    """
+    Матрица, CSR-массивы которой - представления сегмента общей памяти (добавляется в segments).
+    """
+    name, layout, rows, cols, is_sorted = description
+    segment = shared_memory.SharedMemory(name=name)
+    segments.append(segment)
+    arrays = tuple(np.ndarray(length, dtype=dtype, buffer=segment.buf, offset=offset)
+                   for dtype, offset, length in layout)
+    return SparseMatrix(rows, cols, arrays, storage="array", sorted_indices=is_sorted)
+
+
+def _call(function, block, operand, args):
+    return function(block, *args) if operand is None else function(block, operand, *args)
+
+
+def _shared_call(function, shared, start, end, args, shared_operand, split_operand, segments):
+    matrix = _attach(shared, segments)
+    operand = _attach(shared_operand, segments) if shared_operand is not None else None
+    if split_operand:
+        operand = operand.row_slice(start, end)
+    result = _call(function, matrix.row_slice(start, end), operand, args)
+    # Результат не должен ссылаться на общую память: она закрывается до его отправки
+    buffers = [array for item in (matrix, operand) if item is not None
+               for array in (item.data, item.col_indices, item.row_ptr)]
+    own = lambda values: values.copy() if any(np.may_share_memory(values, array) for array in buffers) else values
+    if isinstance(result, SparseMatrix):
+        return SparseMatrix(result.rows, result.cols, (own(result.data), own(result.col_indices), own(result.row_ptr)),
+                            storage="array", sorted_indices=result._sorted)
+    return own(result)
+
+
+def _shared_block(function, shared, start, end, args, shared_operand=None, split_operand=False):
+    """
+    Задача процесса-обработчика для хранения в массивах: матрица и операнд читаются из общей памяти.
+    """
+    segments = []
+    try:
+        return _shared_call(function, shared, start, end, args, shared_operand, split_operand, segments)
+    finally:
+        for segment in segments:
+            try:
+                segment.close()
+            except BufferError:
+                pass  # Представления еще живы (исключение в задаче): отображение закроется вместе с ними
+
+
+def _multiply_block(block, operand, sort_indices):
+    return block.multiply_matrix(operand, sort_indices=sort_indices)
+
+
+def _add_block(block, other_block, alpha, beta):
+    return block.axpby(alpha, other_block, beta)
+
+
+def _scalar_block(block, scalar):
+    return block.multiply_scalar(scalar)
+
+
+def _matvec_block(block, x, out=None):
+    # Блок создается заново при каждом вызове, поэтому буферы matvec(out=...) ему не выгодны:
+    # результат блока просто копируется в его срез
+    if out is None:
+        return block.matvec(x)
+    out[:] = block.matvec(x)
+
+
+def _run(matrix, workers, backend, function, block_args, operand=None, split_operand=False):
+    """
+    Выполняет function(блок, [операнд,] *block_args(start, end)) для каждого блока строк
+    и возвращает результаты по порядку.
+    Потоки (по умолчанию для массивов NumPy) получают блоки и операнд как представления общих массивов,
+    процессы для массивов NumPy - через общую память, для списков - сериализованными.
+    :param operand: Второй операнд (SparseMatrix) или None.
+    :param split_operand: Передавать блоку те же строки операнда, а не весь операнд.
+    :return: Пара (результаты, диапазоны строк).
+    """
+    if backend is None:
+        backend = "thread" if matrix.storage == "array" else "process"
+    if backend not in ("thread", "process"):
+        raise ValueError("backend должен быть \"thread\" или \"process\".")
+
+    ranges = partition_rows(matrix, workers)
+    pool = _pool(backend, workers)
+    shared = backend == "process" and matrix.storage == "array" and getattr(operand, "storage", "array") == "array"
+    segments = []
+    try:
+        if shared:
+            description = _share(matrix, segments)
+            operand_description = _share(operand, segments) if operand is not None else None
+            futures = [pool.submit(_shared_block, function, description, start, end, block_args(start, end),
+                                   operand_description, split_operand)
+                       for start, end in ranges]
+        else:
+            part = lambda start, end: (None if operand is None else
+                                       row_block(operand, start, end) if split_operand else operand)
+            futures = [pool.submit(_call, function, row_block(matrix, start, end), part(start, end),
+                                   block_args(start, end))
+                       for start, end in ranges]
+        return [future.result() for future in futures], ranges
+    except BrokenExecutor:
+        # Процесс-обработчик аварийно завершился: пул больше не принимает задачи
+        with _pools_lock:
+            if _pools.get((backend, workers)) is pool:
+                del _pools[(backend, workers)]
+        raise
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def multiply_matrix(a, b, workers, sort_indices=True, backend=None):
+    """
+    Параллельное произведение A*B: блоки строк A умножаются на всю матрицу B.
+    """
+    pieces, _ = _run(a, workers, backend, _multiply_block, lambda start, end: (sort_indices,), operand=b)
+    return _stitch(pieces, b.cols, pieces[0].storage)
+
+
+def axpby(a, alpha, b, beta, workers, backend=None):
+    """
+    Параллельная линейная комбинация alpha*A + beta*B по совпадающим блокам строк.
+    """
+    pieces, _ = _run(a, workers, backend, _add_block, lambda start, end: (alpha, beta),
+                     operand=b, split_operand=True)
+    return _stitch(pieces, a.cols, pieces[0].storage)
+
+
+def multiply_scalar(a, scalar, workers, backend=None):
+    """
+    Параллельное умножение матрицы на скаляр.
+    """
+    pieces, _ = _run(a, workers, backend, _scalar_block, lambda start, end: (scalar,))
+    return _stitch(pieces, a.cols, pieces[0].storage)
+
+
+def matvec(a, x, workers, out=None, backend=None):
+    """
+    Параллельное произведение матрицы на вектор. Потоки записывают блоки прямо в срезы
+    результата (или out), результаты процессов копируются в него.
+    """
+    if backend is None:
+        backend = "thread" if a.storage == "array" else "process"
+    if a.storage != "array":
+        result = [0] * a.rows
+    elif isinstance(out, np.ndarray) and out.dtype == np.float64 and out.shape == (a.rows,):
+        result = out
+    else:
+        result = np.empty(a.rows)
+    if backend == "thread" and a.storage == "array":
+        _run(a, workers, backend, _matvec_block, lambda start, end: (x, result[start:end]))
+    else:
+        pieces, ranges = _run(a, workers, backend, _matvec_block, lambda start, end: (x,))
+        for piece, (start, end) in zip(pieces, ranges):
+            result[start:end] = piece
+    if out is None or out is result:
+        return result
+    out[:] = result
+    return out
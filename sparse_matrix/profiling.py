@@ -0,0 +1,236 @@
+"""
+Профилирование операций SparseMatrix по требованию.
+
+Пока профилирование выключено, модуль ничего не меняет: методы класса остаются исходными, и вызовы
+не несут никаких накладных расходов. При включении публичные методы SparseMatrix (включая
+from_coo, from_triplets, load и linear_combination) заменяются обертками, которые считают вызовы
+и для отобранных вызовов измеряют:
+    - время выполнения (perf_counter, включая вложенные вызовы других методов);
+    - число ненулевых элементов операндов-матриц и результата (отношение - заполнение);
+    - объем выделенной памяти (пик tracemalloc относительно начала вызова, только если track_memory=True;
+      измеряется лишь для внешнего вызова в потоке, вложенные вызовы входят в него).
+Выборка: при sample_rate < 1 измеряется каждый round(1/sample_rate)-й вызов метода, а остальные
+только подсчитываются, так что профилирование можно оставлять включенным под нагрузкой.
+
+Пример:
+    with profiling.profile(sample_rate=0.1) as profiler:
+        ...
+    metrics = profiler.snapshot()  # Словарь, пригодный для json.dumps
+"""
+import contextlib
+import functools
+import threading
+import time
+import tracemalloc
+
+from .core import SparseMatrix
+
+
+def _nnz(value):
+    """
+    Число хранимых элементов матрицы без слияния буфера изменений.
+    """
+    if value._base is not None:
+        return len(value._base[0]) + len(value._delta)
+    return len(value.data)
+
+
+class OperationStats:
+    """
+    Накопленные показатели одного метода.
+    """
+
+    __slots__ = ("calls", "sampled", "errors", "total_time", "max_time", "nnz_in", "nnz_out",
+                 "alloc_bytes", "max_alloc_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.sampled = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.nnz_in = 0
+        self.nnz_out = 0
+        self.alloc_bytes = 0
+        self.max_alloc_bytes = 0
+
+    def as_dict(self):
+        """
+        Показатели в виде словаря. Суммы по времени и nnz относятся к измеренным вызовам,
+        estimated_total_time - оценка для всех вызовов с учетом выборки.
+        """
+        mean_time = self.total_time / self.sampled if self.sampled else 0.0
+        return {
+            "calls": self.calls,
+            "sampled_calls": self.sampled,
+            "errors": self.errors,
+            "total_time": self.total_time,
+            "mean_time": mean_time,
+            "max_time": self.max_time,
+            "estimated_total_time": mean_time * self.calls,
+            "nnz_in": self.nnz_in,
+            "nnz_out": self.nnz_out,
+            "fill_ratio": self.nnz_out / self.nnz_in if self.nnz_in else None,
+            "alloc_bytes": self.alloc_bytes,
+            "max_alloc_bytes": self.max_alloc_bytes,
+        }
+
+
+class Profiler:
+    """
+    Сборщик показателей. Одновременно в SparseMatrix может быть установлен только один профилировщик.
+    """
+
+    def __init__(self, sample_rate=1.0, track_memory=False):
+        """
+        :param sample_rate: Доля измеряемых вызовов (0, 1]; вызовы считаются всегда.
+        :param track_memory: Измерять ли выделение памяти через tracemalloc (заметно замедляет вызовы).
+        """
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate должно быть в интервале (0, 1].")
+        self.sample_every = max(1, round(1 / sample_rate))
+        self.track_memory = track_memory
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = None
+        self._started_tracemalloc = False
+
+    @property
+    def enabled(self):
+        return self._originals is not None
+
+    def enable(self):
+        """
+        Устанавливает обертки в SparseMatrix.
+        """
+        global _active
+        if self.enabled:
+            return
+        if _active is not None:
+            raise ValueError("Другой профилировщик уже включен.")
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._originals = {}
+        for name, attribute in list(vars(SparseMatrix).items()):
+            if name.startswith("_"):
+                continue
+            if isinstance(attribute, (classmethod, staticmethod)):
+                wrapped = type(attribute)(self._wrap(name, attribute.__func__))
+            elif callable(attribute):
+                wrapped = self._wrap(name, attribute)
+            else:
+                continue  # Свойства (T, has_sorted_indices) не профилируются
+            self._originals[name] = attribute
+            setattr(SparseMatrix, name, wrapped)
+        _active = self
+
+    def disable(self):
+        """
+        Возвращает исходные методы SparseMatrix; накопленные показатели сохраняются.
+        """
+        global _active
+        if not self.enabled:
+            return
+        for name, attribute in self._originals.items():
+            setattr(SparseMatrix, name, attribute)
+        self._originals = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        _active = None
+
+    def reset(self):
+        """
+        Обнуляет накопленные показатели.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self):
+        """
+        Текущие показатели.
+        :return: Словарь "SparseMatrix.<метод>" -> словарь показателей (см. OperationStats.as_dict).
+        """
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in sorted(self._stats.items())}
+
+    def _wrap(self, name, function):
+        key = f"SparseMatrix.{name}"
+        profiler = self
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profiler._lock:
+                stats = profiler._stats.get(key)
+                if stats is None:
+                    stats = profiler._stats[key] = OperationStats()
+                stats.calls += 1
+                sampled = (stats.calls - 1) % profiler.sample_every == 0
+            if not sampled:
+                return function(*args, **kwargs)
+            return profiler._measure(stats, function, args, kwargs)
+
+        return wrapper
+
+    def _measure(self, stats, function, args, kwargs):
+        nnz_in = sum(_nnz(arg) for arg in args if isinstance(arg, SparseMatrix))
+        nnz_in += sum(_nnz(arg) for arg in kwargs.values() if isinstance(arg, SparseMatrix))
+        depth = getattr(self._local, "depth", 0)
+        measure_memory = self.track_memory and depth == 0 and tracemalloc.is_tracing()
+        if measure_memory:
+            memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._local.depth = depth + 1
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            allocated = tracemalloc.get_traced_memory()[1] - memory_before if measure_memory else 0
+            with self._lock:
+                stats.sampled += 1
+                stats.errors += failed
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
+                stats.nnz_in += nnz_in
+                stats.alloc_bytes += allocated
+                stats.max_alloc_bytes = max(stats.max_alloc_bytes, allocated)
+        if isinstance(result, SparseMatrix):
+            with self._lock:
+                stats.nnz_out += _nnz(result)
+        return result
+
+
+_active = None  # Установленный профилировщик
+
+
+def active_profiler():
+    """
+    Включенный в данный момент профилировщик (или None).
+    """
+    return _active
+
+
+@contextlib.contextmanager
+def profile(sample_rate=1.0, track_memory=False):
+    """
+    Профилирование внутри блока with. Если профилировщик уже включен, используется он,
+    а выход из вложенного блока его не выключает.
+    :param sample_rate: Доля измеряемых вызовов (0, 1].
+    :param track_memory: Измерять ли выделение памяти.
+    :return: Профилировщик (Profiler), у которого после блока можно взять snapshot().
+    """
+    if _active is not None:
+        yield _active
+        return
+    profiler = Profiler(sample_rate, track_memory)
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
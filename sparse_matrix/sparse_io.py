@@ -0,0 +1,433 @@
+"""
+Ввод и вывод разреженных матриц SparseMatrix.
+
+Двоичный формат (версия 1), все числа заголовка в little-endian:
+    64 байта заголовка: сигнатура b"SPMX", версия, размер заголовка, rows, cols, nnz,
+    тип значений ("d" - float64, "q" - int64), размер индекса в байтах (4 или 8), флаг упорядоченности строк;
+    затем массивы data, col_indices и row_ptr, каждый выровнен на 64 байта.
+Массивы лежат в файле как есть, поэтому загрузка через mmap не копирует данные,
+а несколько процессов, открывших один файл, разделяют одни и те же страницы памяти.
+"""
+import array
+import mmap as mmap_module
+import struct
+import sys
+
+from .core import SparseMatrix, _is_ndarray, np
+
+MAGIC = b"SPMX"
+VERSION = 1
+ALIGNMENT = 64
+_HEADER = struct.Struct("<4sHHqqqcBB")
+HEADER_SIZE = ALIGNMENT
+
+
+def _aligned(offset):
+    """
+    Ближайшее смещение, кратное ALIGNMENT.
+    """
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _layout(nnz, rows, index_size):
+    """
+    Смещения массивов data, col_indices и row_ptr в файле.
+    """
+    data_offset = HEADER_SIZE
+    col_offset = _aligned(data_offset + nnz * 8)
+    ptr_offset = _aligned(col_offset + nnz * index_size)
+    return data_offset, col_offset, ptr_offset, ptr_offset + (rows + 1) * index_size
+
+
+def _write_array(file, typecode, values):
+    """
+    Записывает значения как массив little-endian.
+    """
+    if _is_ndarray(values):
+        values.astype(np.dtype(typecode).newbyteorder("<"), copy=False).tofile(file)
+        return
+    packed = array.array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    packed.tofile(file)
+
+
+def save_binary(matrix, path):
+    """
+    Сохраняет матрицу в двоичном формате.
+    :param matrix: Матрица (SparseMatrix).
+    :param path: Путь к файлу.
+    """
+    nnz = len(matrix.data)
+    index_size = 4 if max(matrix.cols, nnz) <= 2 ** 31 - 1 else 8
+    index_code = "i" if index_size == 4 else "q"
+    if matrix.storage == "array":
+        value_code = "d"
+    else:
+        value_code = "q" if all(isinstance(value, int) and -2 ** 63 <= value < 2 ** 63 for value in matrix.data) else "d"
+
+    data_offset, col_offset, ptr_offset, _ = _layout(nnz, matrix.rows, index_size)
+    header = _HEADER.pack(MAGIC, VERSION, HEADER_SIZE, matrix.rows, matrix.cols, nnz,
+                          value_code.encode(), index_size, int(matrix.has_sorted_indices))
+    with open(path, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        _write_array(file, value_code, matrix.data)
+        file.write(b"\0" * (col_offset - file.tell()))
+        _write_array(file, index_code, matrix.col_indices)
+        file.write(b"\0" * (ptr_offset - file.tell()))
+        _write_array(file, index_code, matrix.row_ptr)
+
+
+def read_header(path):
+    """
+    Читает заголовок двоичного файла.
+    :return: Словарь с полями rows, cols, nnz, value_code, index_size, sorted.
+    """
+    with open(path, "rb") as file:
+        raw = file.read(HEADER_SIZE)
+    if len(raw) < _HEADER.size or raw[:4] != MAGIC:
+        raise ValueError("Файл не является двоичной матрицей SparseMatrix.")
+    magic, version, header_size, rows, cols, nnz, value_code, index_size, is_sorted = _HEADER.unpack_from(raw)
+    if version != VERSION or header_size != HEADER_SIZE:
+        raise ValueError("Неподдерживаемая версия формата: " + str(version))
+    return {"rows": rows, "cols": cols, "nnz": nnz, "value_code": value_code.decode(),
+            "index_size": index_size, "sorted": bool(is_sorted)}
+
+
+def load_binary(path, mmap=True, storage=None):
+    """
+    Загружает матрицу из двоичного файла.
+    :param path: Путь к файлу.
+    :param mmap: Отобразить файл в память без копирования (только чтение).
+    :param storage: "array" или "list". По умолчанию хранение следует типу значений в файле:
+                    float64 - "array", если установлен NumPy; int64 - "list", чтобы целые значения
+                    отображались из файла как есть (хранение "array" требует float64 и копирует data).
+    :return: Матрица (SparseMatrix).
+    """
+    header = read_header(path)
+    rows, cols, nnz = header["rows"], header["cols"], header["nnz"]
+    value_code = header["value_code"]
+    index_code = "i" if header["index_size"] == 4 else "q"
+    data_offset, col_offset, ptr_offset, end = _layout(nnz, rows, header["index_size"])
+    if storage is None:
+        storage = "array" if np is not None and value_code == "d" else "list"
+
+    if np is not None and storage == "array":
+        if mmap:
+            def read(code, offset, count):
+                if count == 0:
+                    return np.zeros(0, dtype=np.dtype(code).newbyteorder("<"))
+                return np.memmap(path, dtype=np.dtype(code).newbyteorder("<"), mode="r", offset=offset, shape=(count,))
+        else:
+            def read(code, offset, count):
+                with open(path, "rb") as file:
+                    file.seek(offset)
+                    return np.fromfile(file, dtype=np.dtype(code).newbyteorder("<"), count=count)
+        arrays = (read(value_code, data_offset, nnz), read(index_code, col_offset, nnz), read(index_code, ptr_offset, rows + 1))
+        return SparseMatrix(rows, cols, arrays, storage="array", sorted_indices=header["sorted"])
+
+    with open(path, "rb") as file:
+        if mmap and sys.byteorder == "little":
+            # Представления memoryview над отображенным файлом - без копирования
+            buffer = memoryview(mmap_module.mmap(file.fileno(), 0, access=mmap_module.ACCESS_READ))
+        else:
+            buffer = file.read(end)
+    if len(buffer) < end:
+        raise ValueError("Файл поврежден: недостаточно данных.")
+
+    def read(code, offset, count):
+        size = array.array(code).itemsize
+        if isinstance(buffer, memoryview):
+            return buffer[offset:offset + count * size].cast(code)
+        values = array.array(code)
+        values.frombytes(buffer[offset:offset + count * size])
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values.tolist()
+
+    arrays = (read(value_code, data_offset, nnz), read(index_code, col_offset, nnz), read(index_code, ptr_offset, rows + 1))
+    return SparseMatrix(rows, cols, arrays, storage="list", sorted_indices=header["sorted"])
+
+
+# Matrix Market и SVMLight
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def _read_mtx_header(path):
+    """
+    Читает баннер и строку размеров файла Matrix Market.
+    :return: (rows, cols, nnz, field, symmetry, смещение начала данных в байтах).
+    """
+    with open(path, "rb") as file:
+        banner = file.readline().decode("ascii").split()
+        if len(banner) != 5 or banner[0] != "%%MatrixMarket" or banner[1].lower() != "matrix":
+            raise ValueError("Файл не является матрицей в формате Matrix Market.")
+        layout, field, symmetry = (word.lower() for word in banner[2:])
+        if layout != "coordinate":
+            raise ValueError("Поддерживается только координатный формат Matrix Market.")
+        if field not in ("real", "integer", "pattern"):
+            raise ValueError("Неподдерживаемый тип значений Matrix Market: " + field)
+        if symmetry not in ("general", "symmetric", "skew-symmetric"):
+            raise ValueError("Неподдерживаемая симметрия Matrix Market: " + symmetry)
+        while True:
+            line = file.readline()
+            if not line:
+                raise ValueError("В файле Matrix Market нет строки размеров.")
+            line = line.strip()
+            if line and not line.startswith(b"%"):
+                break
+        rows, cols, nnz = (int(value) for value in line.split())
+        return rows, cols, nnz, field, symmetry, file.tell()
+
+
+def _parse_mtx_lines(lines, field, symmetry):
+    """
+    Генератор троек (i, j, value) с индексами с 0 из строк данных Matrix Market.
+    Для симметричных матриц добавляется отраженный элемент.
+    """
+    convert = int if field == "integer" else float
+    for line in lines:
+        parts = line.split()
+        if not parts or parts[0].startswith(b"%"):
+            continue
+        i = int(parts[0]) - 1
+        j = int(parts[1]) - 1
+        value = 1 if field == "pattern" else convert(parts[2])
+        yield i, j, value
+        if symmetry != "general" and i != j:
+            yield j, i, value if symmetry == "symmetric" else -value
+
+
+def _iter_range_lines(path, start, end, data_start, buffer_size):
+    """
+    Строки файла, начинающиеся в диапазоне байтов [start, end).
+    Неполная строка в начале диапазона принадлежит предыдущему диапазону.
+    """
+    with open(path, "rb", buffering=buffer_size) as file:
+        if start > data_start:
+            file.seek(start - 1)
+            file.readline()
+        else:
+            file.seek(start)
+        position = file.tell()
+        while position < end:
+            line = file.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def _byte_ranges(path, data_start, workers):
+    """
+    Делит область данных файла на workers диапазонов байтов.
+    """
+    with open(path, "rb") as file:
+        file.seek(0, 2)
+        size = file.tell()
+    step = max(1, (size - data_start + workers - 1) // workers)
+    return [(start, min(start + step, size)) for start in range(data_start, size, step)]
+
+
+def _parse_mtx_range(path, start, end, data_start, field, symmetry, buffer_size):
+    """
+    Разбор диапазона байтов Matrix Market в отдельном процессе.
+    """
+    row_idx, col_idx, values = [], [], []
+    for i, j, value in _parse_mtx_lines(_iter_range_lines(path, start, end, data_start, buffer_size), field, symmetry):
+        row_idx.append(i)
+        col_idx.append(j)
+        values.append(value)
+    return row_idx, col_idx, values
+
+
+def _parallel_parse(function, path, data_start, workers, *args):
+    """
+    Разбирает диапазоны байтов файла в пуле процессов и возвращает результаты по порядку.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    ranges = _byte_ranges(path, data_start, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(function, path, start, end, data_start, *args) for start, end in ranges]
+        return [future.result() for future in futures]
+
+
+def read_matrix_market(path, chunk_size=65536, storage="list", workers=1, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Потоковое чтение матрицы в координатном формате Matrix Market (.mtx).
+    :param path: Путь к файлу.
+    :param chunk_size: Размер порции троек при построении CSR.
+    :param storage: "list" или "array".
+    :param workers: Число процессов для параллельного разбора диапазонов файла.
+    :param buffer_size: Размер буфера чтения в байтах.
+    :return: Матрица (SparseMatrix).
+    """
+    rows, cols, _, field, symmetry, data_start = _read_mtx_header(path)
+    if workers > 1:
+        parts = _parallel_parse(_parse_mtx_range, path, data_start, workers, field, symmetry, buffer_size)
+        row_idx, col_idx, values = [], [], []
+        for part_rows, part_cols, part_values in parts:
+            row_idx.extend(part_rows)
+            col_idx.extend(part_cols)
+            values.extend(part_values)
+        return SparseMatrix.from_coo(rows, cols, row_idx, col_idx, values, storage=storage)
+
+    lines = _iter_range_lines(path, data_start, float("inf"), data_start, buffer_size)
+    return SparseMatrix.from_triplets(_parse_mtx_lines(lines, field, symmetry), rows, cols,
+                                      chunk_size=chunk_size, storage=storage)
+
+
+def _iter_entries(matrix):
+    """
+    Генератор (i, j, value) по хранимым элементам матрицы, индексы с 0.
+    """
+    for i in range(matrix.rows):
+        for k in range(matrix.row_ptr[i], matrix.row_ptr[i + 1]):
+            yield i, int(matrix.col_indices[k]), matrix.data[k]
+
+
+def _format_value(value):
+    """
+    Запись числа без потери точности.
+    """
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def write_matrix_market(matrix, path, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Потоковая запись матрицы в формате Matrix Market (coordinate general).
+    :param matrix: Матрица (SparseMatrix).
+    :param path: Путь к файлу.
+    :param buffer_size: Размер буфера записи в байтах.
+    """
+    field = "integer" if all(isinstance(value, int) for value in matrix.data) else "real"
+    with open(path, "w", buffering=buffer_size) as file:
+        file.write("%%MatrixMarket matrix coordinate " + field + " general\n")
+        file.write(f"{matrix.rows} {matrix.cols} {len(matrix.data)}\n")
+        for i, j, value in _iter_entries(matrix):
+            file.write(f"{i + 1} {j + 1} {_format_value(value)}\n")
+
+
+def _parse_svmlight_lines(lines, zero_based):
+    """
+    Генератор (метка, [(столбец, значение), ...]) по строкам SVMLight.
+    """
+    offset = 0 if zero_based else 1
+    for line in lines:
+        line = line.split(b"#", 1)[0].split()
+        if not line:
+            continue
+        features = []
+        for token in line[1:]:
+            if token.startswith(b"qid:"):
+                continue
+            index, value = token.split(b":", 1)
+            features.append((int(index) - offset, float(value)))
+        yield float(line[0]), features
+
+
+def _parse_svmlight_range(path, start, end, data_start, zero_based, buffer_size):
+    """
+    Разбор диапазона байтов SVMLight в отдельном процессе; номера строк локальные.
+    """
+    labels, row_idx, col_idx, values = [], [], [], []
+    lines = _iter_range_lines(path, start, end, data_start, buffer_size)
+    for row, (label, features) in enumerate(_parse_svmlight_lines(lines, zero_based)):
+        labels.append(label)
+        for j, value in features:
+            row_idx.append(row)
+            col_idx.append(j)
+            values.append(value)
+    return labels, row_idx, col_idx, values
+
+
+def read_svmlight(path, n_features=None, zero_based=False, chunk_size=65536, storage="list",
+                  workers=1, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Потоковое чтение файла SVMLight/LibSVM: "метка индекс:значение ...".
+    :param path: Путь к файлу.
+    :param n_features: Число столбцов (по умолчанию - максимальный индекс + 1).
+    :param zero_based: Индексы признаков в файле начинаются с 0 (по стандарту SVMLight - с 1).
+    :param chunk_size: Размер порции троек при построении CSR.
+    :param storage: "list" или "array".
+    :param workers: Число процессов для параллельного разбора диапазонов файла.
+    :param buffer_size: Размер буфера чтения в байтах.
+    :return: (матрица SparseMatrix, список меток).
+    """
+    labels = []
+
+    if workers > 1:
+        row_idx, col_idx, values = [], [], []
+        for part_labels, part_rows, part_cols, part_values in _parallel_parse(
+                _parse_svmlight_range, path, 0, workers, zero_based, buffer_size):
+            offset = len(labels)
+            labels.extend(part_labels)
+            row_idx.extend(row + offset for row in part_rows)
+            col_idx.extend(part_cols)
+            values.extend(part_values)
+        cols = n_features if n_features is not None else (max(col_idx) + 1 if col_idx else 1)
+        matrix = SparseMatrix.from_coo(max(len(labels), 1), cols, row_idx, col_idx, values, storage=storage)
+        return matrix, labels
+
+    def triplets():
+        lines = _iter_range_lines(path, 0, float("inf"), 0, buffer_size)
+        for row, (label, features) in enumerate(_parse_svmlight_lines(lines, zero_based)):
+            labels.append(label)
+            for j, value in features:
+                yield row, j, value
+
+    matrix = SparseMatrix.from_triplets(triplets(), None, n_features, chunk_size=chunk_size, storage=storage)
+    if matrix.rows < len(labels):
+        # Последние объекты без признаков - добавляем пустые строки
+        extra = len(labels) - matrix.rows
+        nnz = len(matrix.data)
+        if matrix.storage == "array":
+            row_ptr = np.concatenate((matrix.row_ptr, np.full(extra, nnz, dtype=matrix.row_ptr.dtype)))
+        else:
+            row_ptr = list(matrix.row_ptr) + [nnz] * extra
+        matrix = SparseMatrix(len(labels), matrix.cols, (matrix.data, matrix.col_indices, row_ptr), storage=matrix.storage)
+    return matrix, labels
+
+
+def write_svmlight(matrix, labels, path, zero_based=False, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Потоковая запись матрицы и меток в формате SVMLight.
+    :param matrix: Матрица (SparseMatrix), строка - объект.
+    :param labels: Метки объектов (по одной на строку).
+    :param path: Путь к файлу.
+    :param zero_based: Записывать индексы признаков с 0.
+    :param buffer_size: Размер буфера записи в байтах.
+    """
+    if len(labels) != matrix.rows:
+        raise ValueError("Число меток должно совпадать с числом строк матрицы.")
+    offset = 0 if zero_based else 1
+    with open(path, "w", buffering=buffer_size) as file:
+        for i in range(matrix.rows):
+            cols, values = matrix._sorted_row(i)
+            features = " ".join(f"{int(j) + offset}:{_format_value(value)}" for j, value in zip(cols, values))
+            file.write(f"{_format_value(labels[i])} {features}".rstrip() + "\n")
+
+
+def read_matrix(path, **kwargs):
+    """
+    Чтение матрицы с выбором формата по расширению: .mtx, .svm/.svmlight/.libsvm или двоичный формат.
+    """
+    lower = path.lower()
+    if lower.endswith(".mtx"):
+        return read_matrix_market(path, **kwargs)
+    if lower.endswith((".svm", ".svmlight", ".libsvm")):
+        return read_svmlight(path, **kwargs)[0]
+    return load_binary(path, **kwargs)
+
+
+def write_matrix(matrix, path):
+    """
+    Запись матрицы с выбором формата по расширению: .mtx или двоичный формат.
+    """
+    if path.lower().endswith(".mtx"):
+        write_matrix_market(matrix, path)
+    else:
+        save_binary(matrix, path)
@@ -0,0 +1,40 @@
+import unittest
+import bench_sparse_matrix as bench
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_generators_seeded(self):
+        for name, generator in bench.GENERATORS.items():
+            a = generator(2000, seed=5)
+            b = generator(2000, seed=5)
+            self.assertEqual((a.data, a.col_indices, a.row_ptr), (b.data, b.col_indices, b.row_ptr), name)
+            self.assertTrue(a.has_sorted_indices)
+            self.assertEqual(a.rows, a.cols)
+            self.assertTrue(1000 <= len(a.data) <= 3000, name)
+            self.assertTrue(all(a.get_element(i, i) != 0 for i in range(1, a.rows + 1)))
+
+    def test_run_suite_records_metrics(self):
+        results = bench.run_suite([1000], ["banded"], ["trace", "add", "determinant"], repeat=1, log=lambda line: None)
+        self.assertEqual([result["operation"] for result in results["results"]], ["trace", "add", "determinant"])
+        for result in results["results"]:
+            self.assertGreater(result["time"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+            self.assertEqual(result["size"], 1000)
+        self.assertIn("python", results["meta"])
+
+    def test_compare_flags_regressions(self):
+        def suite(time, memory):
+            return {"results": [{"operation": "add", "generator": "uniform", "storage": "list", "size": 1000,
+                                 "time": time, "peak_memory": memory}]}
+
+        self.assertEqual(bench.compare(suite(0.010, 1000), suite(0.0105, 1050)), [])
+        regressions = bench.compare(suite(0.010, 1000), suite(0.020, 1000))
+        self.assertEqual([(item["metric"], item["ratio"]) for item in regressions], [("time", 2.0)])
+        # Очень короткие замеры по времени не сравниваются, память сравнивается всегда
+        regressions = bench.compare(suite(1e-5, 1000), suite(1e-4, 2000))
+        self.assertEqual([item["metric"] for item in regressions], ["peak_memory"])
+
+
+if __name__ == "__main__":
+    unittest.main()
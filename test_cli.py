@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from sparse_matrix import SparseMatrix, cli, sparse_io
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "a.mtx")
+        sparse_io.write_matrix(SparseMatrix(3, 3, [[2, 0, 1], [0, 3, 0], [1, 0, 4]]), self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_batch(self):
+        output = os.path.join(self.directory.name, "product.mtx")
+        jobs = [
+            {"id": 1, "op": "trace", "input": self.path},
+            {"id": 2, "op": "get", "input": self.path, "row": 1, "col": 3},
+            {"id": 3, "op": "multiply", "input": self.path, "other": self.path, "output": output},
+            {"id": 4, "op": "matvec", "input": self.path, "x": [1, 1, 1]},
+            {"id": 5, "op": "determinant", "input": self.path},
+            {"id": 6, "op": "get", "input": self.path, "row": 4, "col": 1},
+            {"id": 7, "op": "unknown", "input": self.path},
+        ]
+        out = io.StringIO()
+        failures = cli.run_batch(jobs, workers=3, out=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(failures, 2)
+        self.assertEqual([record["id"] for record in records], [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual([record.get("result") for record in records[:5]],
+                         [9, 1, {"rows": 3, "cols": 3, "nnz": 5, "output": output}, [3, 3, 5], 21])
+        self.assertTrue(records[5]["error"].startswith("IndexError"))
+        self.assertFalse(records[6]["ok"])
+        self.assertEqual(sparse_io.read_matrix(output).get_element(3, 3), 17)
+
+    def test_run_batch_rereads_overwritten_file(self):
+        other = os.path.join(self.directory.name, "b.mtx")
+        sparse_io.write_matrix(SparseMatrix(3, 3, [[2, 0, 1], [0, 3, 0], [1, 0, 4]]), other)
+        jobs = [
+            {"id": 1, "op": "trace", "input": other},
+            {"id": 2, "op": "scalar", "input": self.path, "scalar": 10, "output": other},
+            {"id": 3, "op": "trace", "input": other},
+        ]
+        out = io.StringIO()
+        self.assertEqual(cli.run_batch(jobs, out=out), 0)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([records[0]["result"], records[2]["result"]], [9, 90])
+
+    def test_batch_command_line(self):
+        jobs = os.path.join(self.directory.name, "jobs.jsonl")
+        results = os.path.join(self.directory.name, "results.jsonl")
+        with open(jobs, "w", encoding="utf-8") as file:
+            file.write("# комментарий\n\n")
+            file.write(json.dumps({"id": "t", "op": "trace", "input": self.path}) + "\n")
+        self.assertEqual(cli.main(["batch", jobs, "--workers", "2", "--output", results]), 0)
+        with open(results, encoding="utf-8") as file:
+            self.assertEqual(json.loads(file.read())["result"], 9)
+
+    def test_lazy_import(self):
+        code = ("import sys, sparse_matrix; from sparse_matrix import SparseMatrix; "
+                "sm = SparseMatrix(2, 2, [[1, 0], [0, 2]]); sm.matvec([1, 1]); "
+                "SparseMatrix(2, 2, ([1], [0], [0, 1, 1])).get_element(1, 1); "
+                "print(sorted(name for name in ('numpy', 'sparse_matrix.parallel', 'sparse_matrix.formats') "
+                "if name in sys.modules))")
+        root = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=root, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
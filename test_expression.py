@@ -0,0 +1,82 @@
+import random
+import unittest
+from SparseMatrix1 import SparseMatrix
+import expression
+
+
+def random_matrix(rows, cols, density, seed):
+    rng = random.Random(seed)
+    data = [[rng.randint(1, 9) if rng.random() < density else 0 for _ in range(cols)] for _ in range(rows)]
+    return SparseMatrix(rows, cols, data)
+
+
+def dense(matrix):
+    return [[matrix.get_element(i + 1, j + 1) for j in range(matrix.cols)] for i in range(matrix.rows)]
+
+
+class TestExpression(unittest.TestCase):
+
+    def setUp(self):
+        self.A = random_matrix(6, 6, 0.4, 1)
+        self.B = random_matrix(6, 6, 0.4, 2)
+        self.C = random_matrix(6, 6, 0.4, 3)
+
+    def test_operators_are_lazy(self):
+        expr = 2 * self.A + self.B @ self.C
+        self.assertIsInstance(expr, expression.Expression)
+        self.assertEqual((expr.rows, expr.cols), (6, 6))
+        self.assertIsInstance(expr.evaluate(), SparseMatrix)
+
+    def test_linear_combination_fused(self):
+        result = (2 * self.A - self.B + self.A / 2 - (-self.C)).evaluate()
+        expected = SparseMatrix.linear_combination([(2.5, self.A), (-1, self.B), (1, self.C)])
+        self.assertEqual(dense(result), dense(expected))
+        # Одинаковые листья объединяются в одно слагаемое
+        self.assertEqual(len((self.A + self.A * 3 + self.B).terms), 2)
+
+    def test_builtin_sum(self):
+        result = sum([self.A, 2 * self.B, self.C])
+        self.assertIsInstance(result, expression.Expression)
+        expected = SparseMatrix.linear_combination([(1, self.A), (2, self.B), (1, self.C)])
+        self.assertEqual(dense(result.evaluate()), dense(expected))
+        self.assertIs(sum([self.A]).evaluate(), self.A)
+        with self.assertRaises(TypeError):
+            1 + self.A
+
+    def test_scaled_products(self):
+        result = ((3 * self.A) @ (self.B * 2) - self.C).evaluate()
+        product = self.A.multiply_matrix(self.B)
+        expected = SparseMatrix.linear_combination([(6, product), (-1, self.C)])
+        self.assertEqual(dense(result), dense(expected))
+        self.assertEqual(dense((-self.A @ self.B).evaluate()), dense(product.multiply_scalar(-1)))
+
+    def test_transpose(self):
+        result = (self.A @ self.B + self.C).T.evaluate()
+        expected = self.A.multiply_matrix(self.B).add(self.C).transpose()
+        self.assertEqual(dense(result), dense(expected))
+        self.assertIs(self.A.T.T.evaluate(), self.A)
+
+    def test_chain_order(self):
+        # Широкая-узкая цепочка: (n x 1) @ (1 x n) @ (n x 1) выгоднее считать справа
+        n = 30
+        column = SparseMatrix(n, 1, [[1] for _ in range(n)])
+        row = SparseMatrix(1, n, [[1] * n])
+        product = column @ row @ column
+        self.assertEqual(product.chain_order(), (0, (1, 2)))
+        self.assertEqual(dense(product.evaluate()), [[n] for _ in range(n)])
+
+        chain = self.A @ self.B @ self.C @ self.A
+        expected = self.A.multiply_matrix(self.B).multiply_matrix(self.C).multiply_matrix(self.A)
+        self.assertEqual(dense(chain.evaluate()), dense(expected))
+
+    def test_dimension_and_type_errors(self):
+        with self.assertRaises(ValueError):
+            self.A + random_matrix(6, 5, 0.4, 4)
+        with self.assertRaises(ValueError):
+            self.A @ random_matrix(5, 6, 0.4, 4)
+        with self.assertRaises(TypeError):
+            self.A * self.B
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import random
+import unittest
+from SparseMatrix1 import SparseMatrix, np
+import formats
+
+
+def banded(n, half=1):
+    return SparseMatrix(n, n, [[(4 if i == j else -1) if abs(i - j) <= half else 0 for j in range(n)]
+                               for i in range(n)])
+
+
+def block_matrix(blocks, b):
+    n = blocks * b
+    data = [[0] * n for _ in range(n)]
+    rng = random.Random(1)
+    for k in range(blocks):
+        for other in (k, (k + 1) % blocks):
+            for r in range(b):
+                for c in range(b):
+                    data[k * b + r][other * b + c] = rng.randint(1, 9) + (20 if other == k and r == c else 0)
+    return SparseMatrix(n, n, data)
+
+
+def irregular(rows, cols, seed):
+    rng = random.Random(seed)
+    return SparseMatrix(rows, cols, [[rng.randint(1, 9) if rng.random() < 0.3 else 0 for _ in range(cols)]
+                                     for _ in range(rows)])
+
+
+def dense(matrix):
+    return [[matrix.get_element(i + 1, j + 1) for j in range(matrix.cols)] for i in range(matrix.rows)]
+
+
+class TestFormats(unittest.TestCase):
+
+    def conversions(self, matrix):
+        return [formats.DIAMatrix.from_csr(matrix), formats.BSRMatrix.from_csr(matrix, block_size=3),
+                formats.SELLMatrix.from_csr(matrix, slice_height=4)]
+
+    def check_interface(self, matrix):
+        other = irregular(matrix.rows, matrix.cols, 7)
+        x = [float(k + 1) for k in range(matrix.cols)]
+        for converted in self.conversions(matrix):
+            name = type(converted).__name__
+            self.assertEqual(dense(converted), dense(matrix), name)
+            self.assertEqual(dense(converted.to_csr()), dense(matrix), name)
+            self.assertEqual(list(converted.matvec(x)), list(matrix.matvec(x)), name)
+            self.assertEqual(dense(converted.multiply_scalar(2)), dense(matrix.multiply_scalar(2)), name)
+            summed = converted.add(other)
+            self.assertIsInstance(summed, type(converted))
+            self.assertEqual(dense(summed), dense(matrix.add(other)), name)
+            if matrix.rows == matrix.cols:
+                self.assertEqual(converted.trace(), matrix.trace(), name)
+                self.assertEqual(dense(converted.multiply_matrix(other)), dense(matrix.multiply_matrix(other)), name)
+                self.assertAlmostEqual(converted.determinant(), matrix.determinant(), places=6)
+                self.assertEqual(converted.is_invertible(), matrix.is_invertible(), name)
+                invertible, condition = converted.is_invertible(return_condition=True)
+                self.assertEqual((invertible, condition), matrix.is_invertible(return_condition=True), name)
+            else:
+                with self.assertRaises(ValueError):
+                    converted.trace()
+            with self.assertRaises(IndexError):
+                converted.get_element(matrix.rows + 1, 1)
+            with self.assertRaises(ValueError):
+                converted.matvec([1.0])
+
+    def test_square_and_rectangular(self):
+        self.check_interface(banded(10, half=2))
+        self.check_interface(block_matrix(3, 3))
+        self.check_interface(irregular(7, 11, 3))
+        self.check_interface(irregular(11, 5, 4))
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_storage(self):
+        self.check_interface(banded(10, half=2).convert_storage("array"))
+        self.check_interface(irregular(9, 10, 5).convert_storage("array"))
+
+    def test_dia_add_native(self):
+        a = formats.DIAMatrix.from_csr(banded(6, half=1))
+        b = formats.DIAMatrix.from_csr(SparseMatrix(6, 6, [[1 if j == i + 3 else 0 for j in range(6)]
+                                                           for i in range(6)]))
+        total = a.add(b)
+        self.assertEqual(total.offsets, [-1, 0, 1, 3])
+        self.assertEqual(dense(total), dense(banded(6, half=1).add(b.to_csr())))
+
+    def test_optimize_format(self):
+        self.assertIsInstance(banded(200, half=2).optimize_format(), formats.DIAMatrix)
+        bsr = block_matrix(20, 4).optimize_format()
+        self.assertIsInstance(bsr, formats.BSRMatrix)
+        self.assertEqual(bsr.block_size, 4)
+        uniform = SparseMatrix.from_coo(64, 64, [i for i in range(64) for _ in range(3)],
+                                        [(7 * i + 13 * k) % 64 for i in range(64) for k in range(3)], [1.0] * 192)
+        self.assertIsInstance(uniform.optimize_format(), formats.SELLMatrix)
+        skewed = SparseMatrix.from_coo(64, 64, [0] * 64 + list(range(1, 64)), list(range(64)) + [0] * 63,
+                                       [1.0] * 127)
+        self.assertIs(skewed.optimize_format(), skewed)
+        costs = formats.spmv_costs(banded(200, half=2))
+        self.assertLess(costs["dia"], costs["csr"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from SparseMatrix1 import SparseMatrix
+import krylov
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def poisson_1d(n):
+    data = []
+    for i in range(n):
+        row = [0] * n
+        row[i] = 2
+        if i > 0:
+            row[i - 1] = -1
+        if i < n - 1:
+            row[i + 1] = -1
+        data.append(row)
+    return SparseMatrix(n, n, data)
+
+
+def nonsymmetric(n):
+    data = []
+    for i in range(n):
+        row = [0] * n
+        row[i] = 4
+        if i > 0:
+            row[i - 1] = -2
+        if i < n - 1:
+            row[i + 1] = -1
+        data.append(row)
+    return SparseMatrix(n, n, data)
+
+
+class TestKrylov(unittest.TestCase):
+
+    def assertSolves(self, matrix, x, b, tol=1e-6):
+        residual = [value - expected for value, expected in zip(matrix.matvec(list(x)), b)]
+        self.assertLess(max(abs(value) for value in residual), tol)
+
+    def test_cg_with_preconditioners(self):
+        matrix = poisson_1d(50)
+        b = [1.0] * 50
+        for preconditioner in (None, krylov.JacobiPreconditioner(matrix), krylov.ILU0Preconditioner(matrix)):
+            history = []
+            x, info = krylov.cg(matrix, b, tol=1e-10, preconditioner=preconditioner,
+                                callback=lambda iteration, residual: history.append(residual))
+            self.assertTrue(info["converged"])
+            self.assertEqual(len(history), info["iterations"])
+            self.assertSolves(matrix, x, b)
+
+    def test_ilu0_exact_for_tridiagonal(self):
+        # Для трехдиагональной матрицы ILU(0) совпадает с точным LU
+        matrix = nonsymmetric(20)
+        x, info = krylov.bicgstab(matrix, [1.0] * 20, preconditioner=krylov.ILU0Preconditioner(matrix))
+        self.assertTrue(info["converged"])
+        self.assertLessEqual(info["iterations"], 2)
+
+    def test_bicgstab_and_gmres(self):
+        matrix = nonsymmetric(40)
+        b = [float(i % 3) for i in range(40)]
+        x, info = krylov.bicgstab(matrix, b, tol=1e-10)
+        self.assertTrue(info["converged"])
+        self.assertSolves(matrix, x, b)
+        for restart in (5, 40):
+            x, info = krylov.gmres(matrix, b, tol=1e-10, restart=restart,
+                                   preconditioner=krylov.JacobiPreconditioner(matrix))
+            self.assertTrue(info["converged"])
+            self.assertSolves(matrix, x, b)
+
+    def test_iteration_limit(self):
+        matrix = poisson_1d(100)
+        x, info = krylov.cg(matrix, [1.0] * 100, tol=1e-12, maxiter=3)
+        self.assertFalse(info["converged"])
+        self.assertEqual(info["iterations"], 3)
+
+    def test_bicgstab_without_iterations(self):
+        x, info = krylov.bicgstab(nonsymmetric(5), [1.0] * 5, maxiter=0)
+        self.assertFalse(info["converged"])
+        self.assertEqual(info["iterations"], 0)
+        self.assertEqual(list(x), [0] * 5)
+
+    def test_bicgstab_breakdown(self):
+        # r_hat ортогонален A*p: знаменатель alpha равен нулю
+        x, info = krylov.bicgstab(SparseMatrix(2, 2, [[0, 1], [-1, 0]]), [1, 0])
+        self.assertFalse(info["converged"])
+        self.assertEqual(info["iterations"], 1)
+        # A*s = 0: знаменатель omega равен нулю, остается первый полушаг
+        x, info = krylov.bicgstab(SparseMatrix(2, 2, [[1, 0], [1, 0]]), [1, 0])
+        self.assertFalse(info["converged"])
+        self.assertEqual(list(x), [1, 0])
+        self.assertEqual(info["residual"], 1.0)
+
+    def test_gmres_singular_breakdown(self):
+        # После вращений диагональ H обнуляется: базис усекается, сходимости нет
+        matrix = SparseMatrix(2, 2, [[1.0, 0.0], [0.0, 0.0]])
+        x, info = krylov.gmres(matrix, [1.0, 1.0])
+        self.assertFalse(info["converged"])
+        self.assertAlmostEqual(x[0], 1.0)
+        self.assertAlmostEqual(info["residual"], 1.0)
+        x, info = krylov.gmres(SparseMatrix(2, 2, [[0, 0], [0, 0]]), [1.0, 0.0])
+        self.assertFalse(info["converged"])
+        self.assertEqual(list(x), [0, 0])
+        # Совместная система с вырожденной матрицей решается
+        x, info = krylov.gmres(matrix, [2.0, 0.0])
+        self.assertTrue(info["converged"])
+        self.assertSolves(matrix, x, [2.0, 0.0])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_cg_zero_matrix_numpy(self):
+        x, info = krylov.cg(SparseMatrix(3, 3, [[0] * 3] * 3), np.zeros(3))
+        self.assertTrue(info["converged"])
+        self.assertEqual(list(x), [0, 0, 0])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            krylov.cg(poisson_1d(3), [1.0, 2.0])
+        with self.assertRaises(ValueError):
+            krylov.JacobiPreconditioner(SparseMatrix(2, 2, [[0, 1], [1, 0]]))
+
+
+if __name__ == "__main__":
+    unittest.main()
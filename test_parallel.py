@@ -0,0 +1,80 @@
+import random
+import unittest
+from SparseMatrix1 import SparseMatrix
+import parallel
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def random_matrix(rows, cols, seed, storage="list"):
+    rng = random.Random(seed)
+    dense = [[rng.choice([0, 0, 0, 1, 2, -3]) for _ in range(cols)] for _ in range(rows)]
+    return SparseMatrix(rows, cols, dense, storage=storage)
+
+
+class TestParallel(unittest.TestCase):
+
+    def assertSameMatrix(self, result, expected):
+        self.assertEqual(list(result.data), list(expected.data))
+        self.assertEqual(list(result.col_indices), list(expected.col_indices))
+        self.assertEqual(list(result.row_ptr), list(expected.row_ptr))
+
+    def test_partition_rows_balanced(self):
+        sm = SparseMatrix(4, 4, ([1] * 8, [0, 1, 2, 3, 0, 1, 2, 3], [0, 4, 4, 8, 8]))
+        self.assertEqual(parallel.partition_rows(sm, 2), [(0, 1), (1, 4)])
+        self.assertEqual(parallel.partition_rows(sm, 1), [(0, 4)])
+
+    def test_process_backend_list_storage(self):
+        a = random_matrix(30, 20, 1)
+        b = random_matrix(20, 25, 2)
+        c = random_matrix(30, 20, 3)
+        self.assertSameMatrix(a.multiply_matrix(b, workers=3), a.multiply_matrix(b))
+        self.assertSameMatrix(a.add(c, workers=2), a.add(c))
+        self.assertSameMatrix(a.multiply_scalar(3, workers=2), a.multiply_scalar(3))
+        x = list(range(20))
+        self.assertEqual(a.matvec(x, workers=2), a.matvec(x))
+
+    def test_thread_backend(self):
+        a = random_matrix(12, 12, 4)
+        b = random_matrix(12, 12, 5)
+        result = parallel.multiply_matrix(a, b, 3, backend="thread")
+        self.assertSameMatrix(result, a.multiply_matrix(b))
+        with self.assertRaises(ValueError):
+            parallel.multiply_scalar(a, 2, 2, backend="gpu")
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_storage(self):
+        a = random_matrix(40, 30, 6, storage="array")
+        b = random_matrix(30, 10, 7, storage="array")
+        self.assertSameMatrix(a.multiply_matrix(b, workers=4), a.multiply_matrix(b))
+        self.assertSameMatrix(a.add(a, workers=4), a.add(a))
+        out = np.empty(40)
+        self.assertIs(a.matvec(np.ones(30), out=out, workers=4), out)
+        self.assertEqual(out.tolist(), a.matvec(np.ones(30)).tolist())
+
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_process_backend_shared_memory(self):
+        a = random_matrix(30, 20, 8, storage="array")
+        b = random_matrix(20, 15, 9, storage="array")
+        c = random_matrix(30, 20, 10, storage="array")
+        self.assertSameMatrix(parallel.multiply_matrix(a, b, 3, backend="process"), a.multiply_matrix(b))
+        self.assertSameMatrix(parallel.axpby(a, 2.0, c, -1.0, 2, backend="process"), a.axpby(2.0, c, -1.0))
+        out = np.empty(30)
+        self.assertIs(parallel.matvec(a, np.ones(20), 3, out=out, backend="process"), out)
+        self.assertEqual(out.tolist(), a.matvec(np.ones(20)).tolist())
+
+    def test_pools_reused(self):
+        a = random_matrix(12, 12, 11)
+        parallel.multiply_scalar(a, 2, 2, backend="thread")
+        pool = parallel._pool("thread", 2)
+        self.assertSameMatrix(parallel.multiply_scalar(a, 2, 2, backend="thread"), a.multiply_scalar(2))
+        self.assertIs(parallel._pool("thread", 2), pool)
+        parallel.shutdown()
+        self.assertIsNot(parallel._pool("thread", 2), pool)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import unittest
+from SparseMatrix1 import SparseMatrix
+import profiling
+
+
+def tridiagonal(n):
+    return SparseMatrix(n, n, [[2 if i == j else -1 if abs(i - j) == 1 else 0 for j in range(n)] for i in range(n)])
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_disabled_has_no_wrappers(self):
+        original = SparseMatrix.multiply_matrix
+        with profiling.profile():
+            self.assertIsNot(SparseMatrix.multiply_matrix, original)
+        self.assertIs(SparseMatrix.multiply_matrix, original)
+        self.assertIsNone(profiling.active_profiler())
+
+    def test_records_calls_time_and_nnz(self):
+        a = tridiagonal(10)
+        with profiling.profile() as profiler:
+            product = a.multiply_matrix(a)
+            a.trace()
+            a.trace()
+            SparseMatrix.from_coo(2, 2, [0, 1], [1, 0], [1.0, 2.0])
+            with self.assertRaises(IndexError):
+                a.get_element(11, 1)
+        metrics = profiler.snapshot()
+        json.dumps(metrics)
+        multiply = metrics["SparseMatrix.multiply_matrix"]
+        self.assertEqual(multiply["calls"], 1)
+        self.assertEqual(multiply["nnz_in"], 2 * len(a.data))
+        self.assertEqual(multiply["nnz_out"], len(product.data))
+        self.assertGreater(multiply["total_time"], 0)
+        self.assertAlmostEqual(multiply["fill_ratio"], len(product.data) / (2 * len(a.data)))
+        self.assertEqual(metrics["SparseMatrix.trace"]["calls"], 2)
+        self.assertEqual(metrics["SparseMatrix.from_coo"]["nnz_out"], 2)
+        self.assertEqual(metrics["SparseMatrix.get_element"]["errors"], 1)
+
+    def test_sampling(self):
+        a = tridiagonal(5)
+        with profiling.profile(sample_rate=0.25) as profiler:
+            for _ in range(10):
+                a.get_element(1, 1)
+        metrics = profiler.snapshot()["SparseMatrix.get_element"]
+        self.assertEqual(metrics["calls"], 10)
+        self.assertEqual(metrics["sampled_calls"], 3)  # Вызовы 1, 5 и 9
+        with self.assertRaises(ValueError):
+            profiling.Profiler(sample_rate=0)
+
+    def test_memory_and_nesting(self):
+        a = tridiagonal(50)
+        with profiling.profile(track_memory=True) as profiler:
+            with profiling.profile() as inner:
+                self.assertIs(inner, profiler)
+            a.multiply_matrix(a)
+            self.assertIs(profiling.active_profiler(), profiler)
+            with self.assertRaises(ValueError):
+                profiling.Profiler().enable()
+        self.assertGreater(profiler.snapshot()["SparseMatrix.multiply_matrix"]["alloc_bytes"], 0)
+        profiler.reset()
+        self.assertEqual(profiler.snapshot(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import io
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from SparseMatrix1 import SparseMatrix, run_file_mode
+import sparse_io
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TestBinaryFormat(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".spmx")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip_list(self):
+        sm = SparseMatrix(3, 4, [[1, 0, 0, 2], [0, 0, 0, 0], [0, -3, 0, 0]])
+        sm.save(self.path)
+        header = sparse_io.read_header(self.path)
+        self.assertEqual((header["rows"], header["cols"], header["nnz"]), (3, 4, 3))
+        self.assertEqual(header["value_code"], "q")
+        self.assertTrue(header["sorted"])
+        for mmap in (True, False):
+            loaded = SparseMatrix.load(self.path, mmap=mmap, storage="list")
+            self.assertEqual(list(loaded.data), [1, 2, -3])
+            self.assertEqual(list(loaded.col_indices), [0, 3, 1])
+            self.assertEqual(list(loaded.row_ptr), [0, 2, 2, 3])
+            self.assertEqual(loaded.get_element(3, 2), -3)
+            self.assertEqual(loaded.get_element(1, 4), 2)
+
+    def test_float_values(self):
+        sm = SparseMatrix(2, 2, [[0.5, 0], [0, 2.25]])
+        sm.save(self.path)
+        self.assertEqual(sparse_io.read_header(self.path)["value_code"], "d")
+        loaded = SparseMatrix.load(self.path, mmap=False, storage="list")
+        self.assertEqual(loaded.data, [0.5, 2.25])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_mmap_array_zero_copy(self):
+        sm = SparseMatrix(2, 3, [[0, 1.5, 0], [2, 0, 0]], storage="array")
+        sm.save(self.path)
+        loaded = SparseMatrix.load(self.path)
+        self.assertEqual(loaded.storage, "array")
+        self.assertTrue(isinstance(loaded.data, np.memmap) or isinstance(loaded.data.base, np.memmap))
+        self.assertFalse(loaded.data.flags.writeable)
+        self.assertEqual(loaded.data.tolist(), [1.5, 2.0])
+        self.assertEqual(loaded.matvec([1.0, 1.0, 1.0]).tolist(), [1.5, 2.0])
+
+    @unittest.skipIf(sys.byteorder != "little", "Отображение списков только на little-endian")
+    def test_mmap_default_int_matrix_zero_copy(self):
+        sm = SparseMatrix(2, 3, [[0, 7, 0], [2 ** 60, 0, -1]])
+        sm.save(self.path)
+        loaded = SparseMatrix.load(self.path)
+        self.assertEqual(loaded.storage, "list")
+        self.assertIsInstance(loaded.data, memoryview)
+        self.assertIsInstance(loaded.data.obj, mmap.mmap)
+        self.assertTrue(loaded.data.readonly)
+        self.assertEqual(list(loaded.data), [7, 2 ** 60, -1])
+        self.assertEqual(loaded.matvec([1, 1, 1]), [7, 2 ** 60 - 1])
+
+    def test_mmap_int_matrix_process_backend(self):
+        sm = SparseMatrix(3, 3, [[1, 0, 2], [0, 2 ** 40, 0], [-3, 0, 4]])
+        sm.save(self.path)
+        loaded = SparseMatrix.load(self.path)
+        copy = pickle.loads(pickle.dumps(loaded))
+        self.assertEqual((copy.data, copy.col_indices, copy.row_ptr), (sm.data, sm.col_indices, sm.row_ptr))
+        self.assertEqual(pickle.loads(pickle.dumps(loaded.row_slice(1, 3))).data, [2 ** 40, -3, 4])
+        expected = sm.multiply_matrix(sm)
+        result = loaded.multiply_matrix(loaded, workers=2)  # Хранение "list" - пул процессов
+        self.assertEqual(result.data, expected.data)
+        self.assertEqual(result.row_ptr, expected.row_ptr)
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a matrix")
+        with self.assertRaises(ValueError):
+            SparseMatrix.load(self.path)
+
+
+
+class TestTextFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_read_matrix_market_symmetric(self):
+        path = self.write("a.mtx", "%%MatrixMarket matrix coordinate integer symmetric\n"
+                                   "% комментарий\n"
+                                   "3 3 3\n1 1 4\n3 1 2\n2 2 5\n")
+        for workers in (1, 2):
+            sm = sparse_io.read_matrix_market(path, chunk_size=2, workers=workers)
+            self.assertEqual(sm.data, [4, 2, 5, 2])
+            self.assertEqual(sm.col_indices, [0, 2, 1, 0])
+            self.assertEqual(sm.row_ptr, [0, 2, 3, 4])
+
+    def test_matrix_market_round_trip(self):
+        sm = SparseMatrix(2, 3, [[0, 1.5, 0], [-2.25, 0, 3.0]])
+        path = os.path.join(self.directory.name, "b.mtx")
+        sparse_io.write_matrix_market(sm, path)
+        loaded = sparse_io.read_matrix_market(path)
+        self.assertEqual(loaded.data, sm.data)
+        self.assertEqual(loaded.col_indices, sm.col_indices)
+        self.assertEqual(loaded.row_ptr, sm.row_ptr)
+
+    def test_svmlight_round_trip(self):
+        path = self.write("c.svm", "1 1:0.5 3:2 # комментарий\n-1 qid:3 2:1.5\n0\n")
+        for workers in (1, 2):
+            sm, labels = sparse_io.read_svmlight(path, workers=workers)
+            self.assertEqual(labels, [1.0, -1.0, 0.0])
+            self.assertEqual((sm.rows, sm.cols), (3, 3))
+            self.assertEqual(sm.data, [0.5, 2.0, 1.5])
+            self.assertEqual(sm.row_ptr, [0, 2, 3, 3])
+        out = os.path.join(self.directory.name, "d.svm")
+        sparse_io.write_svmlight(sm, labels, out)
+        again, again_labels = sparse_io.read_svmlight(out, n_features=3)
+        self.assertEqual(again_labels, labels)
+        self.assertEqual(again.data, sm.data)
+        self.assertEqual(again.row_ptr, sm.row_ptr)
+
+    def test_invalid_matrix_market(self):
+        path = self.write("e.mtx", "%%MatrixMarket matrix array real general\n2 2\n")
+        with self.assertRaises(ValueError):
+            sparse_io.read_matrix_market(path)
+
+    def test_file_mode(self):
+        path = self.write("f.mtx", "%%MatrixMarket matrix coordinate integer general\n"
+                                   "2 2 3\n1 1 2\n2 2 3\n1 2 1\n")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            run_file_mode(["--input", path, "--op", "trace"])
+            run_file_mode(["--input", path, "--op", "scalar", "--scalar", "2"])
+        self.assertEqual(output.getvalue().splitlines(),
+                         ["5", "Values: [4.0, 2.0, 6.0]", "Col_index: [0, 1, 1]", "Row_pointers: [0, 2, 3]"])
+        result = os.path.join(self.directory.name, "g.mtx")
+        run_file_mode(["--input", path, "--op", "multiply", "--other", path, "--output", result])
+        self.assertEqual(sparse_io.read_matrix(result).data, [4, 5, 9])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,183 +1,816 @@
-import unittest
-from SparseMatrix1 import SparseMatrix
-
-class TestSparseMatrixCSR(unittest.TestCase):
-
-#Тесты для задачи №1
-
-    def test_trace_square_matrix(self):
-        data = [[1, 0, 0], [0, 2, 0], [0, 0, 3]]
-        sm = SparseMatrix(3, 3, data)
-        self.assertEqual(sm.trace(), 6)
-
-    def test_trace_zero_matrix(self):
-        data = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
-        sm = SparseMatrix(3, 3, data)
-        self.assertEqual(sm.trace(), 0)
-
-    def test_trace_non_square_matrix(self):
-        data = [[1, 2, 3], [4, 5, 6]]
-        sm = SparseMatrix(2, 3, data)
-        with self.assertRaises(ValueError):
-            sm.trace()
-
-    def test_get_element_valid_indices(self):
-        data = [[1, 2], [3, 4]]
-        sm = SparseMatrix(2, 2, data)
-        self.assertEqual(sm.get_element(1, 1), 1)
-        self.assertEqual(sm.get_element(2, 2), 4)
-        self.assertEqual(sm.get_element(1, 2), 2)
-        self.assertEqual(sm.get_element(2, 1), 3)
-
-    def test_get_element_zero_element(self):
-        data = [[1, 0], [0, 4]]
-        sm = SparseMatrix(2, 2, data)
-        self.assertEqual(sm.get_element(1, 2), 0)
-        self.assertEqual(sm.get_element(2, 1), 0)
-
-
-    def test_get_element_invalid_indices(self):
-        data = [[1, 2], [3, 4]]
-        sm = SparseMatrix(2, 2, data)
-        with self.assertRaises(IndexError):
-            sm.get_element(0, 0)  # Индексы вне диапазона
-        with self.assertRaises(IndexError):
-            sm.get_element(3, 3)  # Индексы вне диапазона
-
-    def test_large_sparse_matrix(self):  # Добавлен тест для большой разреженной матрицы
-        rows = 100
-        cols = 100
-        data = [[0] * cols for _ in range(rows)]
-        data[0][0] = 1
-        data[50][50] = 2
-        data[99][99] = 3
-        sm = SparseMatrix(rows, cols, data)
-        self.assertEqual(sm.trace(), 6)
-        self.assertEqual(sm.get_element(1, 1), 1)
-        self.assertEqual(sm.get_element(51, 51), 2)
-        self.assertEqual(sm.get_element(100, 100), 3)
-        self.assertEqual(sm.get_element(2, 2), 0)
-
-    def test_empty_matrix(self):
-        data = []
-        with self.assertRaises(ValueError):  # Ожидается ошибка, так как data пустой
-            sm = SparseMatrix(0, 0, data)
-
-    def test_inconsistent_dimensions(self):
-        data = [[1, 2], [3, 4, 5]]  # Неправильные размерности
-        with self.assertRaises(ValueError):
-            sm = SparseMatrix(2, 2, data)
-    
-#Тесты для задачи №2
-
-    def test_add_matrices(self):
-        data1 = [[1, 0, 0], [0, 2, 0], [0, 0, 3]]
-        data2 = [[0, 1, 0], [3, 0, 4], [0, 0, 0]]
-        sm1 = SparseMatrix(3, 3, data1)
-        sm2 = SparseMatrix(3, 3, data2)
-        
-        sm_sum = sm1.add(sm2)
-        expected_sum = SparseMatrix(3, 3, [[1, 1, 0], [3, 2, 4], [0, 0, 3]]) # Ожидаемый результат
-        self.assertEqual(sm_sum.data, expected_sum.data)
-        self.assertEqual(sm_sum.col_indices, expected_sum.col_indices)
-        self.assertEqual(sm_sum.row_ptr, expected_sum.row_ptr)
-
-    
-    def multiply_scalar(self, scalar: float):
-        result_data = []
-        result_col_indices = []
-        result_row_ptr = [0]
-        for i in range(self.rows):
-            for k in range(self.row_ptr[i], self.row_ptr[i + 1]):
-                result_data.append(self.data[k] * scalar)
-                result_col_indices.append(self.col_indices[k])
-            result_row_ptr.append(len(result_data))
-        return SparseMatrix(self.rows, self.cols, (result_data, result_col_indices, result_row_ptr))
-
-
-    def test_multiply_matrices(self):
-        # Умножение двух матриц
-        data1 = [[1, 0, 2], [0, 3, 0]]
-        data2 = [[0, 1], [4, 0], [5, 0]]
-        sm1 = SparseMatrix(2, 3, data1)
-        sm2 = SparseMatrix(3, 2, data2)
-        
-        sm_mult = sm1.multiply_matrix(sm2)
-        self.assertEqual(sm_mult.data, [10, 1, 12])
-        self.assertEqual(sm_mult.col_indices, [0, 1, 0])  # Исправлено
-        self.assertEqual(sm_mult.row_ptr, [0, 2, 3])
-
-        # Невозможно умножить матрицы (несоответствие размеров)
-        data3 = [[1, 2], [3, 4]]
-        sm3 = SparseMatrix(2, 2, data3)
-        with self.assertRaises(ValueError):
-            sm1.multiply_matrix(sm3)
-
-    
-    def test_edge_cases(self):
-        # Одноэлементные матрицы
-        sm1 = SparseMatrix(1, 1, [[5]])
-        sm2 = SparseMatrix(1, 1, [[3]])
-        
-        sm_sum = sm1.add(sm2)
-        self.assertEqual(sm_sum.data, [8])
-        self.assertEqual(sm_sum.col_indices, [0])
-        self.assertEqual(sm_sum.row_ptr, [0, 1])
-
-        sm_scaled = sm1.multiply_scalar(2)
-        self.assertEqual(sm_scaled.data, [10])
-        self.assertEqual(sm_scaled.col_indices, [0])
-        self.assertEqual(sm_scaled.row_ptr, [0, 1])
-        
-        sm_mult = sm1.multiply_matrix(sm2)
-        self.assertEqual(sm_mult.data, [15])
-        self.assertEqual(sm_mult.col_indices, [0])
-        self.assertEqual(sm_mult.row_ptr, [0, 1])
-
-        # Нулевые матрицы
-        sm_zero1 = SparseMatrix(2, 2, [[0, 0], [0, 0]])
-        sm_zero2 = SparseMatrix(2, 2, [[0, 0], [0, 0]])
-        sm_sum_zero = sm_zero1.add(sm_zero2)
-        self.assertEqual(sm_sum_zero.data, [])
-        self.assertEqual(sm_sum_zero.col_indices, [])
-        self.assertEqual(sm_sum_zero.row_ptr, [0, 0, 0])
-
-# Тесты для задачи №3
-
-    def test_determinant_3x3(self):
-        data = [[2, 0, 0], [0, 3, 0], [0, 0, 1]]
-        sm = SparseMatrix(3, 3, data)
-        self.assertEqual(sm.determinant(), 6)
-
-    def test_determinant_3x3_2(self):  # more complex 3x3
-        data = [[1, 2, 3], [0, 4, 5], [1, 0, 6]]
-        sm = SparseMatrix(3, 3, data)
-        self.assertEqual(sm.determinant(), 22)
-
-    def test_determinant_4x4(self):
-        data = [[1, 0, 0, 0], [0, 2, 0, 0], [0, 0, 3, 0], [0, 0, 0, 4]]
-        sm = SparseMatrix(4, 4, data)
-        self.assertEqual(sm.determinant(), 24)
-
-    def test_determinant_singular_matrix(self):
-        data = [[1, 2], [2, 4]]
-        sm = SparseMatrix(2, 2, data)
-        self.assertEqual(sm.determinant(), 0)
-
-    def test_is_invertible_true(self):
-        data = [[1, 0], [0, 1]]
-        sm = SparseMatrix(2, 2, data)
-        self.assertEqual(sm.is_invertible(), "да")
-
-    def test_is_invertible_false(self):
-        data = [[1, 2], [2, 4]]  # Сингулярная матрица ( вырожденная )
-        sm = SparseMatrix(2, 2, data)
-        self.assertEqual(sm.is_invertible(), "нет")
-
-    def test_determinant_non_square(self):
-        data = [[1, 2, 3], [4, 5, 6]]
-        sm = SparseMatrix(2, 3, data)
-        with self.assertRaises(ValueError):
-            sm.determinant()
-
-
+import math
+import random
+import unittest
+from fractions import Fraction
+from SparseMatrix1 import SparseMatrix
+from sparse_matrix.core import _numeric_rank
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class TestSparseMatrixCSR(unittest.TestCase):
+
+#Тесты для задачи №1
+
+    def test_trace_square_matrix(self):
+        data = [[1, 0, 0], [0, 2, 0], [0, 0, 3]]
+        sm = SparseMatrix(3, 3, data)
+        self.assertEqual(sm.trace(), 6)
+
+    def test_trace_zero_matrix(self):
+        data = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
+        sm = SparseMatrix(3, 3, data)
+        self.assertEqual(sm.trace(), 0)
+
+    def test_trace_non_square_matrix(self):
+        data = [[1, 2, 3], [4, 5, 6]]
+        sm = SparseMatrix(2, 3, data)
+        with self.assertRaises(ValueError):
+            sm.trace()
+
+    def test_get_element_valid_indices(self):
+        data = [[1, 2], [3, 4]]
+        sm = SparseMatrix(2, 2, data)
+        self.assertEqual(sm.get_element(1, 1), 1)
+        self.assertEqual(sm.get_element(2, 2), 4)
+        self.assertEqual(sm.get_element(1, 2), 2)
+        self.assertEqual(sm.get_element(2, 1), 3)
+
+    def test_get_element_zero_element(self):
+        data = [[1, 0], [0, 4]]
+        sm = SparseMatrix(2, 2, data)
+        self.assertEqual(sm.get_element(1, 2), 0)
+        self.assertEqual(sm.get_element(2, 1), 0)
+
+
+    def test_get_element_invalid_indices(self):
+        data = [[1, 2], [3, 4]]
+        sm = SparseMatrix(2, 2, data)
+        with self.assertRaises(IndexError):
+            sm.get_element(0, 0)  # Индексы вне диапазона
+        with self.assertRaises(IndexError):
+            sm.get_element(3, 3)  # Индексы вне диапазона
+
+    def test_large_sparse_matrix(self):  # Добавлен тест для большой разреженной матрицы
+        rows = 100
+        cols = 100
+        data = [[0] * cols for _ in range(rows)]
+        data[0][0] = 1
+        data[50][50] = 2
+        data[99][99] = 3
+        sm = SparseMatrix(rows, cols, data)
+        self.assertEqual(sm.trace(), 6)
+        self.assertEqual(sm.get_element(1, 1), 1)
+        self.assertEqual(sm.get_element(51, 51), 2)
+        self.assertEqual(sm.get_element(100, 100), 3)
+        self.assertEqual(sm.get_element(2, 2), 0)
+
+    def test_sorted_indices_flag_and_lookup(self):
+        sm = SparseMatrix(2, 4, ([1, 2, 3], [3, 0, 2], [0, 2, 3]))
+        self.assertFalse(sm.has_sorted_indices)
+        self.assertEqual(sm.get_element(1, 4), 1)
+        self.assertTrue(sm.has_sorted_indices)  # Матрица приведена к каноническому виду
+        self.assertEqual(sm.col_indices, [0, 3, 2])
+        self.assertEqual(sm.data, [2, 1, 3])
+        self.assertEqual(sm.get_element(1, 2), 0)
+
+    def test_diagonal_and_get_elements(self):
+        sm = SparseMatrix(3, 4, [[5, 0, 0, 1], [0, 0, 2, 0], [0, 0, 7, 0]])
+        self.assertEqual(sm.diagonal(), [5, 0, 7])
+        self.assertEqual(sm.get_elements([1, 2, 3, 3], [4, 3, 1, 3]), [1, 2, 0, 7])
+        with self.assertRaises(ValueError):
+            sm.get_elements([1], [1, 2])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_get_elements_array_storage(self):
+        rng = random.Random(5)
+        dense = [[rng.choice([0, 0, 1.5, -2.0]) for _ in range(30)] for _ in range(20)]
+        sm = SparseMatrix(20, 30, dense, storage="array")
+        rows = [rng.randint(1, 20) for _ in range(200)]
+        cols = [rng.randint(1, 30) for _ in range(200)]
+        self.assertEqual(sm.get_elements(rows, cols).tolist(), [dense[i - 1][j - 1] for i, j in zip(rows, cols)])
+        self.assertEqual(sm.diagonal().tolist(), [dense[i][i] for i in range(20)])
+        unsorted = SparseMatrix(1, 3, (np.array([1.0, 2.0]), np.array([2, 0]), np.array([0, 2])), storage="array")
+        self.assertFalse(unsorted.has_sorted_indices)
+        self.assertEqual(unsorted.get_elements([1, 1, 1], [1, 2, 3]).tolist(), [2.0, 0.0, 1.0])
+        with self.assertRaises(IndexError):
+            sm.get_elements([21], [1])
+
+    def test_empty_matrix(self):
+        data = []
+        with self.assertRaises(ValueError):  # Ожидается ошибка, так как data пустой
+            sm = SparseMatrix(0, 0, data)
+
+    def test_inconsistent_dimensions(self):
+        data = [[1, 2], [3, 4, 5]]  # Неправильные размерности
+        with self.assertRaises(ValueError):
+            sm = SparseMatrix(2, 2, data)
+    
+    def test_from_coo(self):
+        sm = SparseMatrix.from_coo(3, 3, [2, 0, 2, 1, 0], [1, 2, 1, 1, 0], [1, 5, 2, 0, 4])
+        self.assertEqual(sm.data, [4, 5, 3])
+        self.assertEqual(sm.col_indices, [0, 2, 1])
+        self.assertEqual(sm.row_ptr, [0, 2, 2, 3])
+        cancelled = SparseMatrix.from_coo(1, 2, [0, 0], [1, 1], [3, -3])
+        self.assertEqual(cancelled.row_ptr, [0, 0])
+        with self.assertRaises(IndexError):
+            SparseMatrix.from_coo(2, 2, [2], [0], [1])
+
+    def test_from_triplets_generator(self):
+        triplets = ((i, (i * 7) % 50, 1) for i in range(100) for _ in range(2))
+        sm = SparseMatrix.from_triplets(triplets, chunk_size=16)
+        self.assertEqual((sm.rows, sm.cols), (100, 50))
+        self.assertEqual(sm.get_element(4, 22), 2)
+        self.assertEqual(len(sm.data), 100)
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_from_triplets_array_storage(self):
+        sm = SparseMatrix.from_triplets([(0, 1, 2.0), (0, 1, 1.0), (1, 0, 4.0)], rows=2, cols=2, storage="array")
+        self.assertEqual(sm.storage, "array")
+        self.assertEqual(sm.data.tolist(), [3.0, 4.0])
+        self.assertEqual(sm.row_ptr.tolist(), [0, 1, 2])
+
+#Тесты для задачи №2
+
+    def test_add_matrices(self):
+        data1 = [[1, 0, 0], [0, 2, 0], [0, 0, 3]]
+        data2 = [[0, 1, 0], [3, 0, 4], [0, 0, 0]]
+        sm1 = SparseMatrix(3, 3, data1)
+        sm2 = SparseMatrix(3, 3, data2)
+        
+        sm_sum = sm1.add(sm2)
+        expected_sum = SparseMatrix(3, 3, [[1, 1, 0], [3, 2, 4], [0, 0, 3]]) # Ожидаемый результат
+        self.assertEqual(sm_sum.data, expected_sum.data)
+        self.assertEqual(sm_sum.col_indices, expected_sum.col_indices)
+        self.assertEqual(sm_sum.row_ptr, expected_sum.row_ptr)
+
+    
+    def test_add_sorted_output(self):
+        sm1 = SparseMatrix(1, 4, ([1, 2], [3, 0], [0, 2]))  # Неупорядоченная строка
+        sm2 = SparseMatrix(1, 4, [[0, 5, 0, -1]])
+        sm_sum = sm1.add(sm2)
+        self.assertEqual(sm_sum.data, [2, 5])
+        self.assertEqual(sm_sum.col_indices, [0, 1])
+
+    def test_axpby_and_linear_combination(self):
+        a = SparseMatrix(2, 2, [[1, 0], [2, 3]])
+        b = SparseMatrix(2, 2, [[0, 4], [1, 0]])
+        c = SparseMatrix(2, 2, [[1, 1], [1, 1]])
+        result = a.axpby(2, b, -1)
+        self.assertEqual(result.data, [2, -4, 3, 6])
+        self.assertEqual(result.col_indices, [0, 1, 0, 1])
+        combo = SparseMatrix.linear_combination([(1, a), (-2, b), (3, c)])
+        self.assertEqual(combo.data, [4, -5, 3, 6])
+        self.assertEqual(combo.col_indices, [0, 1, 0, 1])
+        self.assertEqual(combo.row_ptr, [0, 2, 4])
+        zero = SparseMatrix.linear_combination([(1, a), (-1, a)])
+        self.assertEqual(zero.row_ptr, [0, 0, 0])
+        with self.assertRaises(ValueError):
+            SparseMatrix.linear_combination([])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_axpby_arrays_sorted_merge_and_unsorted(self):
+        # Упорядоченная строка с повтором столбца и неупорядоченная матрица (сортировка ключей)
+        a = SparseMatrix(2, 3, (np.array([1.0, 2.0, 5.0]), np.array([0, 0, 2]), np.array([0, 2, 3])),
+                         storage="array")
+        b = SparseMatrix(2, 3, [[0, 4, 0], [0, 1, 5]], storage="array")
+        shuffled = SparseMatrix(2, 3, (np.array([4.0, 5.0, 1.0]), np.array([1, 2, 1]), np.array([0, 1, 3])),
+                                storage="array")
+        self.assertTrue(a.has_sorted_indices)
+        self.assertFalse(shuffled.has_sorted_indices)
+        for other in (b, shuffled):
+            result = a.axpby(2.0, other, -1.0)
+            self.assertEqual(result.data.tolist(), [6.0, -4.0, -1.0, 5.0])
+            self.assertEqual(result.col_indices.tolist(), [0, 1, 1, 2])
+            self.assertEqual(result.row_ptr.tolist(), [0, 2, 4])
+            combo = SparseMatrix.linear_combination([(1.0, a), (1.0, other), (-1.0, b)])
+            self.assertEqual(combo.data.tolist(), [3.0, 5.0])
+            self.assertEqual(combo.col_indices.tolist(), [0, 2])
+
+    def multiply_scalar(self, scalar: float):
+        result_data = []
+        result_col_indices = []
+        result_row_ptr = [0]
+        for i in range(self.rows):
+            for k in range(self.row_ptr[i], self.row_ptr[i + 1]):
+                result_data.append(self.data[k] * scalar)
+                result_col_indices.append(self.col_indices[k])
+            result_row_ptr.append(len(result_data))
+        return SparseMatrix(self.rows, self.cols, (result_data, result_col_indices, result_row_ptr))
+
+
+    def test_multiply_matrices(self):
+        # Умножение двух матриц
+        data1 = [[1, 0, 2], [0, 3, 0]]
+        data2 = [[0, 1], [4, 0], [5, 0]]
+        sm1 = SparseMatrix(2, 3, data1)
+        sm2 = SparseMatrix(3, 2, data2)
+        
+        sm_mult = sm1.multiply_matrix(sm2)
+        self.assertEqual(sm_mult.data, [10, 1, 12])
+        self.assertEqual(sm_mult.col_indices, [0, 1, 0])  # Исправлено
+        self.assertEqual(sm_mult.row_ptr, [0, 2, 3])
+
+        # Невозможно умножить матрицы (несоответствие размеров)
+        data3 = [[1, 2], [3, 4]]
+        sm3 = SparseMatrix(2, 2, data3)
+        with self.assertRaises(ValueError):
+            sm1.multiply_matrix(sm3)
+
+    
+    def test_edge_cases(self):
+        # Одноэлементные матрицы
+        sm1 = SparseMatrix(1, 1, [[5]])
+        sm2 = SparseMatrix(1, 1, [[3]])
+        
+        sm_sum = sm1.add(sm2)
+        self.assertEqual(sm_sum.data, [8])
+        self.assertEqual(sm_sum.col_indices, [0])
+        self.assertEqual(sm_sum.row_ptr, [0, 1])
+
+        sm_scaled = sm1.multiply_scalar(2)
+        self.assertEqual(sm_scaled.data, [10])
+        self.assertEqual(sm_scaled.col_indices, [0])
+        self.assertEqual(sm_scaled.row_ptr, [0, 1])
+        
+        sm_mult = sm1.multiply_matrix(sm2)
+        self.assertEqual(sm_mult.data, [15])
+        self.assertEqual(sm_mult.col_indices, [0])
+        self.assertEqual(sm_mult.row_ptr, [0, 1])
+
+        # Нулевые матрицы
+        sm_zero1 = SparseMatrix(2, 2, [[0, 0], [0, 0]])
+        sm_zero2 = SparseMatrix(2, 2, [[0, 0], [0, 0]])
+        sm_sum_zero = sm_zero1.add(sm_zero2)
+        self.assertEqual(sm_sum_zero.data, [])
+        self.assertEqual(sm_sum_zero.col_indices, [])
+        self.assertEqual(sm_sum_zero.row_ptr, [0, 0, 0])
+
+    def test_multiply_matrices_cancellation(self):
+        sm1 = SparseMatrix(2, 2, [[1, 1], [0, 2]])
+        sm2 = SparseMatrix(2, 2, [[1, 3], [-1, 4]])
+        sm_mult = sm1.multiply_matrix(sm2)
+        self.assertEqual(sm_mult.data, [7, -2, 8])
+        self.assertEqual(sm_mult.col_indices, [1, 0, 1])
+        self.assertEqual(sm_mult.row_ptr, [0, 1, 3])
+
+    def test_multiply_matrices_unsorted(self):
+        sm1 = SparseMatrix(1, 2, [[1, 1]])
+        sm2 = SparseMatrix(2, 3, [[0, 0, 1], [1, 0, 0]])
+        sm_mult = sm1.multiply_matrix(sm2, sort_indices=False)
+        self.assertEqual(sm_mult.col_indices, [2, 0])
+        self.assertEqual(sm_mult.data, [1, 1])
+
+    def test_multiply_matrices_merged_and_plain_rows(self):
+        # С sm2 вклады строк B в столбец 2 складываются, у sm2_split столбцы строк B не пересекаются;
+        # последняя строка результата пустая
+        sm1 = SparseMatrix(3, 2, [[2, 3], [1, 1], [0, 0]])
+        sm2 = SparseMatrix(2, 4, [[0, 0, 5, 0], [1, 0, 2, 4]])
+        sm2_split = SparseMatrix(2, 4, [[0, 0, 5, 0], [1, 0, 0, 4]])
+        sm_mult = sm1.multiply_matrix(sm2)
+        self.assertEqual(sm_mult.data, [3, 16, 12, 1, 7, 4])
+        self.assertEqual(sm_mult.col_indices, [0, 2, 3, 0, 2, 3])
+        self.assertEqual(sm_mult.row_ptr, [0, 3, 6, 6])
+        sm_mult = sm1.multiply_matrix(sm2_split)
+        self.assertEqual(sm_mult.data, [3, 10, 12, 1, 5, 4])
+        self.assertEqual(sm_mult.col_indices, [0, 2, 3, 0, 2, 3])
+        unsorted = sm1.multiply_matrix(sm2_split, sort_indices=False)
+        self.assertEqual(unsorted.col_indices, [2, 0, 3, 2, 0, 3])
+        self.assertEqual(unsorted.data, [10, 3, 12, 5, 1, 4])
+
+    def test_transpose_and_csc(self):
+        sm = SparseMatrix(2, 3, [[1, 0, 2], [0, 3, 4]])
+        data, row_indices, col_ptr = sm.to_csc()
+        self.assertEqual(data, [1, 3, 2, 4])
+        self.assertEqual(row_indices, [0, 1, 0, 1])
+        self.assertEqual(col_ptr, [0, 1, 2, 4])
+        self.assertIs(sm.to_csc(), sm.to_csc())  # Кешируется
+        t = sm.transpose()
+        self.assertEqual((t.rows, t.cols), (3, 2))
+        self.assertEqual(t.get_element(3, 2), 4)
+        self.assertEqual(t.transpose().data, sm.data)
+        sm._invalidate_caches()
+        self.assertIsNone(sm._csc)
+
+    def test_multiply_matrix_transposed_orientation(self):
+        rng = random.Random(3)
+        a = SparseMatrix(40, 3, [[rng.choice([0, 1, 2]) for _ in range(3)] for _ in range(40)])
+        b = SparseMatrix(3, 2, [[1, 2], [0, 3], [4, 0]])
+        expected = a.multiply_matrix(b)
+        a.to_csc()
+        b.to_csc()
+        self.assertTrue(a._prefer_transposed_product(b))
+        result = a.multiply_matrix(b)
+        self.assertEqual(result.data, expected.data)
+        self.assertEqual(result.col_indices, expected.col_indices)
+        self.assertEqual(result.row_ptr, expected.row_ptr)
+
+    def test_multiply_matrix_orientation_one_cached_operand(self):
+        rng = random.Random(3)
+        dense = [[rng.choice([0, 1, 2]) for _ in range(3)] for _ in range(40)]
+        b = SparseMatrix(3, 2, [[1, 2], [0, 3], [4, 0]])
+        expected = SparseMatrix(40, 3, dense).multiply_matrix(b)
+        # Кеширован только левый операнд: транспонирование маленькой B дешево
+        a = SparseMatrix(40, 3, dense)
+        a.to_csc()
+        self.assertIsNone(b._csc)
+        self.assertTrue(a._prefer_transposed_product(b))
+        result = a.multiply_matrix(b)
+        self.assertIsNotNone(b._csc)  # B транспонирована в ходе умножения
+        self.assertEqual(result.data, expected.data)
+        self.assertEqual(result.col_indices, expected.col_indices)
+        self.assertEqual(result.row_ptr, expected.row_ptr)
+        # Кеширован только правый операнд: транспонирование A дороже выигрыша
+        a = SparseMatrix(40, 3, dense)
+        self.assertFalse(a._prefer_transposed_product(b))
+        a.multiply_matrix(b)
+        self.assertIsNone(a._csc)
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_transpose_array_storage(self):
+        sm = SparseMatrix(2, 3, [[1, 0, 2], [0, 3, 4]], storage="array")
+        t = sm.transpose()
+        self.assertEqual(t.data.tolist(), [1, 3, 2, 4])
+        self.assertEqual(t.col_indices.tolist(), [0, 1, 0, 1])
+        self.assertEqual(t.row_ptr.tolist(), [0, 1, 2, 4])
+
+    def test_double_transpose_unsorted(self):
+        for storage in ("list", "array") if np is not None else ("list",):
+            sm = SparseMatrix(2, 3, ([1., 2., 3.], [2, 0, 1], [0, 2, 3]), storage=storage)
+            twice = sm.transpose().transpose()
+            self.assertEqual([[twice.get_element(i, j) for j in (1, 2, 3)] for i in (1, 2)],
+                             [[2.0, 0, 1.0], [0, 3.0, 0]])
+            self.assertTrue(twice.has_sorted_indices)
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_to_csc_array_wide(self):
+        # Больше 2**16 столбцов: порядок строится по двум разрядам
+        rng = np.random.default_rng(5)
+        cols = 70000
+        col_indices = rng.integers(0, cols, 300)
+        sm = SparseMatrix(3, cols, (np.ones(300), col_indices, np.array([0, 100, 200, 300])),
+                          storage="array")
+        data, row_indices, col_ptr = sm.to_csc()
+        order = np.argsort(col_indices, kind="stable")
+        self.assertEqual(row_indices.tolist(), (order // 100).tolist())
+        self.assertEqual(col_ptr[-1], 300)
+        self.assertTrue(np.all(np.diff(col_ptr) >= 0))
+
+    def test_getitem_rows_and_elements(self):
+        sm = SparseMatrix(4, 3, [[1, 0, 2], [0, 3, 0], [4, 0, 0], [0, 5, 6]])
+        self.assertEqual(sm[0, 2], 2)
+        self.assertEqual(sm[-1, -1], 6)
+        block = sm[1:3]
+        self.assertEqual((block.rows, block.cols), (2, 3))
+        self.assertEqual(block.data, [3, 4])
+        self.assertEqual(block.row_ptr, [0, 1, 2])
+        picked = sm[[3, 0, 3]]
+        self.assertEqual(picked.data, [5, 6, 1, 2, 5, 6])
+        self.assertEqual(picked.row_ptr, [0, 2, 4, 6])
+        masked = sm[[True, False, True, False]]
+        self.assertEqual(masked.data, [1, 2, 4])
+        with self.assertRaises(IndexError):
+            sm[4, 0]
+        with self.assertRaises(ValueError):
+            sm[2:2]
+
+    def test_getitem_columns(self):
+        sm = SparseMatrix(3, 4, [[1, 0, 2, 3], [0, 4, 0, 0], [5, 0, 0, 6]])
+        sub = sm[:, 1:3]
+        self.assertEqual((sub.rows, sub.cols), (3, 2))
+        self.assertEqual(sub.data, [2, 4])
+        self.assertEqual(sub.col_indices, [1, 0])
+        fancy = sm[0:3:2, [3, 0, 3]]
+        self.assertEqual(fancy.data, [3, 1, 3, 6, 5, 6])
+        self.assertEqual(fancy.col_indices, [0, 1, 2, 0, 1, 2])
+        self.assertEqual(fancy.row_ptr, [0, 3, 6])
+        self.assertTrue(fancy.has_sorted_indices)
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_getitem_array_storage(self):
+        dense = [[1, 0, 2, 3], [0, 4, 0, 0], [5, 0, 0, 6]]
+        sm = SparseMatrix(3, 4, dense, storage="array")
+        block = sm[1:]
+        self.assertTrue(np.shares_memory(block.data, sm.data))  # Срез строк - представление
+        self.assertEqual(block.data.tolist(), [4, 5, 6])
+        fancy = sm[np.array([2, 0]), [3, 0, 3]]
+        self.assertEqual(fancy.data.tolist(), [6, 5, 6, 3, 1, 3])
+        self.assertEqual(fancy.col_indices.tolist(), [0, 1, 2, 0, 1, 2])
+        self.assertEqual(fancy.row_ptr.tolist(), [0, 3, 6])
+        masked = sm[np.array([True, False, True]), 2:]
+        self.assertEqual(masked.data.tolist(), [2, 3, 6])
+        self.assertEqual(masked.col_indices.tolist(), [0, 1, 1])
+
+    def test_set_element_buffered(self):
+        dense = [[1, 0, 2], [0, 3, 0], [4, 0, 5]]
+        sm = SparseMatrix(3, 3, dense)
+        sm.set_element(1, 2, 7)
+        sm.set_element(2, 2, 0)
+        sm.set_element(3, 3, 9)
+        # Чтение видит буфер без слияния
+        self.assertEqual(len(sm._delta), 3)
+        self.assertEqual(sm.get_element(1, 2), 7)
+        self.assertEqual(sm.get_element(2, 2), 0)
+        self.assertEqual(sm.get_element(3, 1), 4)
+        self.assertEqual(sm.trace(), 10)
+        self.assertEqual(sm.diagonal(), [1, 0, 9])
+        self.assertEqual(len(sm._delta), 3)
+        # Произведение читает CSR-массивы, поэтому буфер сливается
+        product = sm.multiply_matrix(SparseMatrix(3, 1, [[1], [1], [1]]))
+        self.assertEqual(product.data, [10, 13])
+        self.assertEqual(sm._delta, {})
+        self.assertEqual(sm.data, [1, 7, 2, 4, 9])
+        self.assertEqual(sm.col_indices, [0, 1, 2, 0, 2])
+        self.assertEqual(sm.row_ptr, [0, 3, 3, 5])
+        with self.assertRaises(IndexError):
+            sm.set_element(4, 1, 1)
+
+    def test_update_many_threshold(self):
+        n = 20
+        sm = SparseMatrix(n, n, [[1 if i == j else 0 for j in range(n)] for i in range(n)])
+        sm.compact_threshold = 10
+        self.assertEqual(sm.determinant(), 1)
+        sm.update_many(range(1, 10), range(1, 10), [2] * 9)
+        self.assertEqual(len(sm._delta), 9)
+        sm.set_element(1, 20, 5)  # Десятая запись достигает порога
+        self.assertEqual(sm._delta, {})
+        self.assertEqual(sm.determinant(), 2 ** 9)  # Кеш разложения сброшен
+        sm.update_many([20, 20], [1, 19], [6, 4])
+        sm.set_element(20, 1, 0)
+        self.assertEqual(len(sm._delta), 2)
+        self.assertEqual(sm.trace(), 2 * 9 + 11)
+        self.assertEqual(sm.get_element(20, 1), 0)
+        sm.compact()
+        self.assertEqual(sm.get_element(1, 20), 5)
+        self.assertEqual(sm.get_element(20, 19), 4)
+        self.assertEqual(sm.row_ptr[-1], n + 2)
+        with self.assertRaises(ValueError):
+            sm.update_many([1], [1, 2], [1])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_set_element_array_storage(self):
+        dense = [[1, 0, 2], [0, 3, 0], [4, 0, 5]]
+        sm = SparseMatrix(3, 3, dense, storage="array")
+        sm.update_many(np.array([1, 2, 3]), np.array([2, 1, 1]), np.array([7.0, 8.0, 0.0]))
+        self.assertEqual(sm.trace(), 9)
+        self.assertEqual(sm.diagonal().tolist(), [1, 3, 5])
+        self.assertEqual(sm.get_elements([1, 2, 3], [2, 1, 1]).tolist(), [7, 8, 0])
+        self.assertEqual(sm.data.tolist(), [1, 7, 2, 8, 3, 5])
+        self.assertEqual(sm.col_indices.tolist(), [0, 1, 2, 0, 1, 2])
+        self.assertEqual(sm.row_ptr.tolist(), [0, 3, 5, 6])
+        self.assertEqual(sm.data.dtype, np.float64)
+
+# Тесты для задачи №3
+
+    def test_determinant_3x3(self):
+        data = [[2, 0, 0], [0, 3, 0], [0, 0, 1]]
+        sm = SparseMatrix(3, 3, data)
+        self.assertEqual(sm.determinant(), 6)
+
+    def test_determinant_3x3_2(self):  # more complex 3x3
+        data = [[1, 2, 3], [0, 4, 5], [1, 0, 6]]
+        sm = SparseMatrix(3, 3, data)
+        self.assertEqual(sm.determinant(), 22)
+
+    def test_determinant_4x4(self):
+        data = [[1, 0, 0, 0], [0, 2, 0, 0], [0, 0, 3, 0], [0, 0, 0, 4]]
+        sm = SparseMatrix(4, 4, data)
+        self.assertEqual(sm.determinant(), 24)
+
+    def test_determinant_singular_matrix(self):
+        data = [[1, 2], [2, 4]]
+        sm = SparseMatrix(2, 2, data)
+        self.assertEqual(sm.determinant(), 0)
+
+    def test_is_invertible_true(self):
+        data = [[1, 0], [0, 1]]
+        sm = SparseMatrix(2, 2, data)
+        self.assertTrue(sm.is_invertible())
+
+    def test_is_invertible_false(self):
+        data = [[1, 2], [2, 4]]  # Сингулярная матрица ( вырожденная )
+        sm = SparseMatrix(2, 2, data)
+        self.assertFalse(sm.is_invertible())
+
+    def test_is_invertible_float_rounding(self):
+        # 0.1 + 0.2 != 0.3 в двоичной арифметике: определитель - остаток округления, а не ноль
+        data = [[0.1, 0.2, 0.3], [1.0, 1.0, 2.0], [0.0, 1.0, 1.0]]
+        sm = SparseMatrix(3, 3, data)
+        self.assertNotEqual(sm.determinant(), 0)
+        self.assertFalse(sm.is_invertible())
+        self.assertTrue(sm.is_invertible(tol=0))
+        self.assertEqual(sm.rank(), 2)
+
+    def test_structurally_singular(self):
+        sm = SparseMatrix(3, 3, [[1, 2, 3], [4, 0, 0], [5, 0, 0]])  # Строки 2 и 3 - только в столбце 1
+        self.assertEqual(sm.structural_rank(), 2)
+        self.assertFalse(sm.is_invertible())
+        self.assertEqual(SparseMatrix(2, 2, [[1, 0], [0, 0]]).structural_rank(), 1)
+
+    def test_is_invertible_integer_float_path(self):
+        # Целые элементы: исключение в float с допуском, без точного разложения в дробях
+        sm = SparseMatrix(3, 3, [[2, -1, 0], [-1, 2, -1], [0, -1, 2]])
+        self.assertTrue(sm.is_invertible())
+        self.assertFalse(any(exact for _, exact in sm._factorizations))
+        self.assertFalse(SparseMatrix(3, 3, [[1, 2, 3], [2, 4, 6], [1, 0, 1]]).is_invertible())
+        # Структурно вырожденная матрица отвергается до численного исключения
+        singular = SparseMatrix(3, 3, [[1, 2, 3], [4, 0, 0], [5, 0, 0]])
+        self.assertEqual(singular.is_invertible(return_condition=True), (False, float("inf")))
+        self.assertEqual(singular._factorizations, {})
+
+    def test_rank_rectangular(self):
+        sm = SparseMatrix(3, 4, [[1, 2, 0, 1], [2, 4, 0, 2], [0, 0, 3, 0]])
+        self.assertEqual(sm.rank(), 2)
+        self.assertEqual(SparseMatrix(2, 2, [[0, 0], [0, 0]]).rank(), 0)
+
+    def test_rank_structural_bound(self):
+        # Все элементы в двух столбцах: структурный ранг 2 ограничивает исключение
+        rng = random.Random(4)
+        sm = SparseMatrix(30, 30, [[rng.randint(1, 9) if j < 2 else 0 for j in range(30)] for _ in range(30)])
+        self.assertEqual(sm.rank(), 2)
+        self.assertEqual(SparseMatrix(2, 2, [[1, 2], [2, 4]]).rank(), 1)  # Численный ранг меньше структурного
+        self.assertEqual(_numeric_rank(SparseMatrix(3, 3, [[2, 1, 0], [1, 2, 1], [0, 1, 2]]), 0, True, limit=1), 1)
+
+    def test_condition_estimate(self):
+        sm = SparseMatrix(2, 2, [[1, 0], [0, 1e-6]])
+        invertible, condition = sm.is_invertible(return_condition=True)
+        self.assertTrue(invertible)
+        self.assertAlmostEqual(condition, 1e6, delta=1)
+        tridiagonal = SparseMatrix(3, 3, [[2, -1, 0], [-1, 2, -1], [0, -1, 2]])
+        self.assertAlmostEqual(tridiagonal.condition_estimate(), 8.0)  # ||A||_1 = 4, ||A^-1||_1 = 2
+        self.assertEqual(SparseMatrix(2, 2, [[1, 2], [2, 4]]).is_invertible(return_condition=True),
+                         (False, float("inf")))
+
+    def test_determinant_non_square(self):
+        data = [[1, 2, 3], [4, 5, 6]]
+        sm = SparseMatrix(2, 3, data)
+        with self.assertRaises(ValueError):
+            sm.determinant()
+
+    def test_determinant_lu_matches_cofactor(self):
+        rng = random.Random(1)
+        for n in range(1, 7):
+            data = [[rng.choice([0, 0, 0, 1, -2, 3]) for _ in range(n)] for _ in range(n)]
+            sm = SparseMatrix(n, n, data)
+            self.assertEqual(sm.determinant(), sm.determinant(method="cofactor"))
+
+    def test_determinant_lu_float(self):
+        data = [[0.0, 2.5, 0.0], [1.5, 0.0, 0.0], [0.0, 0.0, 4.0]]
+        sm = SparseMatrix(3, 3, data)
+        self.assertAlmostEqual(sm.determinant(), -15.0)
+        self.assertEqual(sm.determinant(exact=True), Fraction(-15))
+
+    def test_determinant_large_integer_not_exact(self):
+        # Произведение целых ведущих элементов выходит за пределы float
+        n = 400
+        data = [[10 if i == j else 0 for j in range(n)] for i in range(n)]
+        data[0][1], data[1][0] = 1, 2
+        sm = SparseMatrix(n, n, data)
+        self.assertEqual(sm.determinant(exact=True), 98 * 10 ** 398)
+        det = sm.determinant(exact=False)
+        self.assertIsInstance(det, float)
+        self.assertEqual(det, math.inf)
+        sm = SparseMatrix(300, 300, [row[:300] for row in data[:300]])
+        self.assertAlmostEqual(sm.determinant(exact=False) / 9.8e299, 1.0)
+
+    def test_determinant_exact_fractions(self):
+        data = [[Fraction(1, 2), Fraction(1, 3)], [Fraction(1, 4), Fraction(1, 5)]]
+        sm = SparseMatrix(2, 2, data)
+        self.assertEqual(sm.determinant(), Fraction(1, 60))
+
+    def test_determinant_large_tridiagonal(self):
+        n = 2000
+        data = []
+        for i in range(n):
+            row = [0] * n
+            row[i] = 2
+            if i > 0:
+                row[i - 1] = -1
+            if i < n - 1:
+                row[i + 1] = -1
+            data.append(row)
+        sm = SparseMatrix(n, n, data)
+        self.assertEqual(sm.determinant(), n + 1)
+
+    def test_determinant_unknown_method(self):
+        sm = SparseMatrix(2, 2, [[1, 0], [0, 1]])
+        with self.assertRaises(ValueError):
+            sm.determinant(method="qr")
+
+    def test_factorize_solve_vector_and_batch(self):
+        data = [[4, 1, 0], [1, 3, 0], [0, 0, 2]]
+        sm = SparseMatrix(3, 3, data)
+        factor = sm.factorize(exact=True)
+        self.assertEqual(factor.kind, "cholesky")
+        self.assertEqual(factor.determinant(), 22)
+        self.assertEqual(factor.solve([5, 4, 2]), [1, 1, 1])
+        self.assertEqual(factor.solve([[5, 4, 2], [4, 1, 0]]), [[1, 1, 1], [1, 0, 0]])
+        self.assertIs(sm.factorize(exact=True), factor)  # Разложение кешируется
+        # По умолчанию множители вещественные и для целочисленной матрицы
+        approximate = sm.factorize()
+        self.assertFalse(approximate.exact)
+        self.assertTrue(all(isinstance(value, float) for value in approximate.solve([5, 4, 2])))
+        for value in approximate.solve([5, 4, 2]):
+            self.assertAlmostEqual(value, 1.0)
+        self.assertEqual(sm.determinant(), 22)  # Определитель целой матрицы по-прежнему точный
+
+    def test_factorize_cholesky_ldlt(self):
+        # Двумерная задача Пуассона на сетке 6x6
+        size = 6
+        n = size * size
+        data = [[0] * n for _ in range(n)]
+        for i in range(n):
+            data[i][i] = 4
+            for j in (i - 1, i + 1, i - size, i + size):
+                if 0 <= j < n and (abs(i - j) == size or i // size == j // size):
+                    data[i][j] = -1
+        sm = SparseMatrix(n, n, data)
+        factor = sm.factorize(method="cholesky", exact=True)
+        lu = sm.factorize(method="lu", exact=True)
+        self.assertEqual(factor.kind, "cholesky")
+        self.assertFalse(hasattr(factor, "u_rows"))  # Хранится только L и D
+        self.assertEqual(len(factor.diagonal), n)
+        self.assertTrue(all(step < factor.order.index(row)
+                            for row in range(n) for step, _ in factor.l_entries[row]))
+        self.assertEqual(factor.determinant(), lu.determinant())
+        b = list(range(n))
+        self.assertEqual(factor.solve(b), lu.solve(b))
+        self.assertEqual(factor._solve_transposed_vector(b), factor.solve(b))
+        approximate = sm.factorize(method="cholesky", exact=False).solve(b)
+        for value, expected in zip(approximate, lu.solve(b)):
+            self.assertAlmostEqual(value, float(expected))
+        # Симметричная, но не положительно определенная матрица раскладывается через LU
+        indefinite = SparseMatrix(2, 2, [[1, 2], [2, 1]])
+        self.assertEqual(indefinite.factorize().kind, "lu")
+        self.assertEqual(indefinite.determinant(), -3)
+
+    def test_factorize_lu_nonsymmetric(self):
+        data = [[0.0, 2.0, 1.0], [1.0, 0.0, 0.0], [3.0, 1.0, 4.0]]
+        sm = SparseMatrix(3, 3, data)
+        factor = sm.factorize()
+        self.assertEqual(factor.kind, "lu")
+        x = factor.solve([3.0, 1.0, 8.0])
+        for value, expected in zip(x, [1.0, 1.0, 1.0]):
+            self.assertAlmostEqual(value, expected)
+        with self.assertRaises(ValueError):
+            sm.factorize(method="cholesky")
+
+    def test_inverse(self):
+        data = [[2, 1], [1, 1]]
+        sm = SparseMatrix(2, 2, data)
+        inv = sm.factorize(exact=True).inverse()
+        self.assertEqual(inv.data, [1, -1, -1, 2])
+        self.assertEqual(inv.col_indices, [0, 1, 0, 1])
+        product = sm.multiply_matrix(inv)
+        self.assertEqual(product.data, [1, 1])
+        self.assertEqual(product.col_indices, [0, 1])
+
+    def test_solve_sparse_rhs(self):
+        sm = SparseMatrix(2, 2, [[2, 0], [0, 4]])
+        rhs = SparseMatrix(2, 2, [[2, 0], [0, 8]])
+        x = sm.factorize().solve(rhs)
+        self.assertEqual(x.data, [1, 2])
+        self.assertEqual(x.col_indices, [0, 1])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_solve_ndarray_columns(self):
+        sm = SparseMatrix(3, 3, [[4, 1, 0], [1, 3, 0], [0, 0, 2]])
+        rhs = np.array([[5.0, 4.0], [4.0, 1.0], [2.0, 0.0]])
+        for method in ("cholesky", "lu"):
+            x = sm.factorize(method=method).solve(rhs)
+            self.assertEqual(x.shape, (3, 2))
+            self.assertTrue(np.allclose(x, [[1.0, 1.0], [1.0, 0.0], [1.0, 0.0]]))
+        with self.assertRaises(ValueError):
+            sm.factorize().solve(np.ones((2, 3)))
+
+    def test_factorize_singular(self):
+        sm = SparseMatrix(2, 2, [[1, 2], [2, 4]])
+        factor = sm.factorize()
+        self.assertTrue(factor.singular)
+        self.assertEqual(factor.determinant(), 0)
+        with self.assertRaises(ValueError):
+            factor.solve([1, 1])
+
+    def test_matvec_and_rmatvec(self):
+        sm = SparseMatrix(3, 2, [[1, 2], [0, 0], [3, 0]])
+        self.assertEqual(sm.matvec([1, 1]), [3, 0, 3])
+        self.assertEqual(sm.rmatvec([1, 1, 1]), [4, 2])
+        out = [7, 7, 7]
+        self.assertIs(sm.matvec([2, 0], out=out), out)
+        self.assertEqual(out, [2, 0, 6])
+        with self.assertRaises(ValueError):
+            sm.matvec([1, 2, 3])
+
+    def test_matmat(self):
+        sm = SparseMatrix(2, 3, [[1, 0, 2], [0, 3, 0]])
+        self.assertEqual(sm.matmat([[1, 0], [0, 1], [1, 1]]), [[3, 2], [0, 3]])
+
+# Тесты хранения в массивах NumPy
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_storage_basic_operations(self):
+        data1 = [[1, 0, 2], [0, 3, 0], [4, 0, 5]]
+        data2 = [[0, 1, 0], [3, 0, 4], [0, 0, -5]]
+        a = SparseMatrix(3, 3, data1, storage="array")
+        b = SparseMatrix(3, 3, data2, storage="array")
+        self.assertEqual(a.data.dtype, np.float64)
+        self.assertEqual(a.trace(), 9)
+        self.assertEqual(a.get_element(3, 1), 4)
+        self.assertEqual(a.get_element(1, 2), 0)
+
+        a_list = SparseMatrix(3, 3, data1)
+        b_list = SparseMatrix(3, 3, data2)
+        for result, expected in ((a.add(b), a_list.add(b_list)),
+                                 (a.multiply_scalar(3), a_list.multiply_scalar(3)),
+                                 (a.multiply_matrix(b), a_list.multiply_matrix(b_list))):
+            self.assertEqual(result.storage, "array")
+            self.assertEqual(result.data.tolist(), expected.data)
+            self.assertEqual(result.col_indices.tolist(), expected.col_indices)
+            self.assertEqual(result.row_ptr.tolist(), expected.row_ptr)
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_multiply_accumulator_and_sorted_keys(self):
+        # Те же данные, что в test_multiply_matrices_merged_and_plain_rows: совпадающие столбцы,
+        # пустая строка; плюс сокращение до нуля
+        a = SparseMatrix(3, 2, [[2, 3], [1, 1], [0, 0]], storage="array")
+        b = SparseMatrix(2, 4, [[0, 0, 5, 0], [1, 0, 2, 4]], storage="array")
+        c = SparseMatrix(2, 2, [[1, 3], [-1, 4]], storage="array")
+        d = SparseMatrix(2, 2, [[1, 1], [0, 2]], storage="array")
+        for blocks in (SparseMatrix._ACCUMULATOR_BLOCKS, 0):  # 0 - суммирование сортировкой ключей
+            a._ACCUMULATOR_BLOCKS = d._ACCUMULATOR_BLOCKS = blocks
+            product = a.multiply_matrix(b)
+            self.assertEqual(product.data.tolist(), [3, 16, 12, 1, 7, 4])
+            self.assertEqual(product.col_indices.tolist(), [0, 2, 3, 0, 2, 3])
+            self.assertEqual(product.row_ptr.tolist(), [0, 3, 6, 6])
+            unsorted = a.multiply_matrix(b, sort_indices=False)
+            self.assertEqual(unsorted.row_ptr.tolist(), [0, 3, 6, 6])
+            self.assertEqual(sorted(zip(unsorted.col_indices[:3].tolist(), unsorted.data[:3].tolist())),
+                             [(0, 3), (2, 16), (3, 12)])
+            cancelled = d.multiply_matrix(c)
+            self.assertEqual(cancelled.data.tolist(), [7, -2, 8])
+            self.assertEqual(cancelled.row_ptr.tolist(), [0, 1, 3])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_storage_mixed_and_convert(self):
+        a = SparseMatrix(2, 2, [[1, 0], [0, 2]])
+        b = SparseMatrix(2, 2, [[0, 1], [0, -2]], storage="array")
+        result = a.add(b)
+        self.assertEqual(result.storage, "array")
+        self.assertEqual(result.data.tolist(), [1, 1])
+        back = result.convert_storage("list")
+        self.assertEqual(back.row_ptr, [0, 2, 2])
+        self.assertEqual(SparseMatrix(2, 2, np.array([[0.0, 3.0], [0.0, 0.0]])).data, [3.0])
+        self.assertLess(b.memory_usage(), SparseMatrix(2, 2, [[0, 1], [0, -2]]).memory_usage())
+
+    def test_invalid_storage(self):
+        with self.assertRaises(ValueError):
+            SparseMatrix(1, 1, [[1]], storage="dict")
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_storage_spmv(self):
+        sm = SparseMatrix(3, 2, [[1, 2], [0, 0], [3, 0]], storage="array")
+        out = np.empty(3)
+        result = sm.matvec(np.array([1.0, 1.0]), out=out)
+        self.assertIs(result, out)
+        self.assertEqual(out.tolist(), [3, 0, 3])
+        self.assertEqual(sm.rmatvec([1, 1, 1]).tolist(), [4, 2])
+        block = sm.matmat(np.array([[1.0, 0.0], [0.0, 1.0]]))
+        self.assertEqual(block.tolist(), [[1, 2], [0, 0], [3, 0]])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_vector_products_without_elements(self):
+        # Пустые списки индексов не должны превращаться в массивы float64
+        sm = SparseMatrix(3, 2, [[0, 0], [0, 0], [0, 0]])
+        self.assertEqual(sm.matvec(np.ones(2)).tolist(), [0, 0, 0])
+        rmatvec = sm.rmatvec(np.ones(3))
+        self.assertEqual(rmatvec.dtype, np.float64)
+        self.assertEqual(rmatvec.tolist(), [0, 0])
+        self.assertEqual(sm.matmat(np.ones((2, 2))).tolist(), [[0, 0], [0, 0], [0, 0]])
+
+    @unittest.skipIf(np is None, "NumPy не установлен")
+    def test_array_storage_out_buffers(self):
+        sm = SparseMatrix(3, 2, [[1, 2], [0, 0], [3, 0]], storage="array")
+        out = np.full(3, 7.0)
+        for _ in range(2):
+            self.assertIs(sm.matvec(np.array([1.0, 2.0]), out=out), out)
+            self.assertEqual(out.tolist(), [5, 0, 3])
+        workspace = sm._product_workspace()
+        rout = np.full(2, 7.0)
+        self.assertIs(sm.rmatvec([1, 1, 2], out=rout), rout)
+        self.assertEqual(rout.tolist(), [7, 2])
+        self.assertIs(sm._product_workspace(), workspace)  # Буферы переиспользуются
+        block_out = np.empty((3, 2))
+        sm.matmat(np.array([[1.0, 0.0], [0.0, 1.0]]), out=block_out)
+        self.assertEqual(block_out.tolist(), [[1, 2], [0, 0], [3, 0]])
+        # Списки в качестве out для хранения "array"
+        out_list = [0, 0, 0]
+        self.assertIs(sm.matvec([1.0, 2.0], out=out_list), out_list)
+        self.assertEqual(out_list, [5, 0, 3])
+        rout_list = [0, 0]
+        sm.rmatvec([1, 1, 2], out=rout_list)
+        self.assertEqual(rout_list, [7, 2])
+        block_list = [[0, 0], [0, 0], [0, 0]]
+        sm.matmat([[1, 0], [0, 1]], out=block_list)
+        self.assertEqual(block_list, [[1, 2], [0, 0], [3, 0]])